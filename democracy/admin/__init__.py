@@ -157,7 +157,7 @@ class HearingAdmin(NestedModelAdminMixin, HearingGeoAdmin, TranslatableAdmin):
         js = ("admin/ckeditor-nested-inline-fix.js",)
 
     inlines = [SectionInline]
-    list_display = ("slug", "published", "title", "open_at", "close_at", "force_closed")
+    list_display = ("slug", "published", "translated_title", "open_at", "close_at", "force_closed")
     list_filter = ("published",)
     search_fields = ("slug", "translations__title")
     readonly_fields = ("preview_url",)
@@ -191,6 +191,10 @@ class HearingAdmin(NestedModelAdminMixin, HearingGeoAdmin, TranslatableAdmin):
         return obj.preview_url
     preview_url.short_description = _('Preview URL')
 
+    def translated_title(self, obj):
+        return obj.get_cached_translation("title")
+    translated_title.short_description = _('title')
+
     def formfield_for_manytomany(self, db_field, request=None, **kwargs):
         if db_field.name == "labels":
             kwargs["widget"] = Select2SelectMultiple
@@ -240,9 +244,13 @@ class OrganizationAdmin(admin.ModelAdmin):
 
 
 class ContactPersonAdmin(TranslatableAdmin, admin.ModelAdmin):
-    list_display = ('name', 'title', 'organization', 'phone', 'email')
+    list_display = ('name', 'translated_title', 'organization', 'phone', 'email')
     exclude = ('published',)
 
+    def translated_title(self, obj):
+        return obj.get_cached_translation('title')
+    translated_title.short_description = _('title')
+
 
 # Wire it up!
 
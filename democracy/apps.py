@@ -6,3 +6,8 @@ from django.utils.translation import ugettext_lazy as _
 class DemocracyAppConfig(AppConfig):
     name = 'democracy'
     verbose_name = _("Participatory Democracy")
+
+    def ready(self):
+        # Connect the snapshot and visibility context signal handlers
+        import democracy.snapshots  # noqa
+        import democracy.visibility  # noqa
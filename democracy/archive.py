@@ -0,0 +1,168 @@
+"""
+Archive of soft-deleted rows.
+
+`democracy_archive_deleted` moves comments, comment images, section images and sections that were
+deleted a while ago from their tables into archive tables named `<table>_archive`. Their translations
+and many-to-many rows move with them, and so do the images of comments, which are not deleted with
+their comment. This keeps them out of the indexes and scans of the hot tables. The archive tables have
+the columns of the live tables, but no constraints and no indexes besides the primary key. They are
+created by the migration `0039_archive_tables`. A migration that adds a column to an archived table must
+add it to the archive table too; the command refuses to run while an archive table lacks columns.
+
+A row is archived only when no row left in the live tables refers to it. For example, a section is
+archived once its comments and images have been archived.
+
+`Model.objects.archived()`, or `Model.objects.deleted(archived=True)`, queries the archive instead of
+the live table. It returns instances of the archive model, an `ArchivedRow`, in which relations are
+plain columns, e.g. `section_id`. `Model.objects.everything(archived=True)` iterates over the live rows
+and then the archived ones. Archived rows cannot be undeleted, and incremental sync does not report them
+as tombstones.
+"""
+from django.apps.registry import Apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, models, transaction
+
+from democracy.models import Section, SectionComment, SectionImage
+from democracy.models.section import CommentImage
+
+# In dependency order, so that a row's dependents have been archived before it
+ARCHIVED_MODELS = (CommentImage, SectionComment, SectionImage, Section)
+ARCHIVE_TABLE_SUFFIX = '_archive'
+# Rows that belong to a row of another model and are archived with it, whether deleted themselves or not
+OWNED_RELATIONS = {
+    SectionComment: ((CommentImage, 'comment'),),
+}
+
+archive_apps = Apps()
+_archive_models = {}
+
+
+class ArchivedRow(models.Model):
+    """
+    Base class of the archive models, which tells archived rows apart from live ones.
+    """
+
+    class Meta:
+        abstract = True
+
+
+def get_owned_tables(model):
+    """
+    Get the models of the rows that are archived together with a row of `model`, and their lookups to it.
+    """
+    owned = list(OWNED_RELATIONS.get(model, ()))
+    if hasattr(model, '_parler_meta'):
+        owned.append((model._parler_meta.root_model, 'master'))
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            owned.append((through, field.m2m_field_name()))
+    return owned
+
+
+def clone_field(field):
+    if field.is_relation:
+        field = field.target_field
+        if isinstance(field, models.AutoField):
+            return models.IntegerField(null=True)
+    if isinstance(field, models.FileField):
+        return models.CharField(max_length=field.max_length, null=True)
+    name, path, args, kwargs = field.deconstruct()
+    for option in ('primary_key', 'unique', 'db_index', 'db_column', 'validators'):
+        kwargs.pop(option, None)
+    kwargs['null'] = True
+    return field.__class__(*args, **kwargs)
+
+
+def get_archive_model(model):
+    """
+    Get the unmigrated model of the archive table of `model`.
+    """
+    if model not in _archive_models:
+        meta = type('Meta', (), {
+            'apps': archive_apps,
+            'app_label': model._meta.app_label,
+            'db_table': model._meta.db_table + ARCHIVE_TABLE_SUFFIX,
+        })
+        attrs = {'__module__': __name__, 'Meta': meta}
+        for field in model._meta.concrete_fields:
+            archive_field = clone_field(field)
+            if field.primary_key:
+                archive_field.primary_key = True
+                archive_field.null = False
+            archive_field.db_column = field.column
+            attrs[field.attname] = archive_field
+        _archive_models[model] = type(str('Archived%s' % model.__name__), (ArchivedRow,), attrs)
+    return _archive_models[model]
+
+
+def check_archive_table(model, using):
+    """
+    Make sure that the archive table of `model` has a column for every field of the model.
+
+    :raises ImproperlyConfigured: if a migration has not created the table or its columns
+    """
+    archive_model = get_archive_model(model)
+    connection = connections[using]
+    table = archive_model._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            raise ImproperlyConfigured('The archive table %s does not exist in database %s' % (table, using))
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+    missing = [field.column for field in archive_model._meta.local_fields if field.column not in columns]
+    if missing:
+        raise ImproperlyConfigured('The archive table %s in database %s lacks the columns %s' % (
+            table, using, ', '.join(missing)
+        ))
+
+
+def move_rows(model, queryset, using):
+    archive_model = get_archive_model(model)
+    names = [field.attname for field in model._meta.concrete_fields]
+    archive_model.objects.using(using).bulk_create([
+        archive_model(**dict(zip(names, row))) for row in queryset.values_list(*names)
+    ])
+    queryset._raw_delete(using)
+
+
+def get_archivable(model, cutoff, using):
+    """
+    Get the rows of `model` deleted before `cutoff` that no live row refers to.
+    """
+    queryset = model.objects.deleted(modified_at__lt=cutoff).using(using)
+    owned = {owned_model for (owned_model, lookup) in get_owned_tables(model)}
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            referring_model = relation.through
+            column = next(
+                field.attname for field in referring_model._meta.concrete_fields
+                if field.is_relation and field.related_model is model
+            )
+        else:
+            referring_model = relation.related_model
+            column = relation.field.attname
+        if referring_model in owned:
+            continue
+        references = referring_model._base_manager.using(using).filter(**{'%s__isnull' % column: False})
+        queryset = queryset.exclude(pk__in=references.values(column))
+    return queryset
+
+
+def archive_deleted(model, cutoff, using='default', batch_size=500):
+    """
+    Move the archivable rows of `model` into its archive table in batches.
+
+    :return: number of rows archived
+    """
+    for table_model in [model] + [owned_model for (owned_model, lookup) in get_owned_tables(model)]:
+        check_archive_table(table_model, using)
+    n_archived = 0
+    while True:
+        pks = list(get_archivable(model, cutoff, using).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return n_archived
+        with transaction.atomic(using=using):
+            for owned_model, lookup in get_owned_tables(model):
+                move_rows(owned_model, owned_model._base_manager.using(using).filter(**{'%s__in' % lookup: pks}), using)
+            move_rows(model, model._base_manager.using(using).filter(pk__in=pks), using)
+        n_archived += len(pks)
@@ -0,0 +1,143 @@
+"""
+JWT authentication with a per-process cache of authentication results.
+
+A token that has been verified once is remembered, keyed by its hash, together with a snapshot of the
+user's row, until the token expires or `DEMOCRACY_JWT_CACHE_MAX_AGE` seconds have passed. Requests with
+a remembered token skip the signature verification and the user query.
+
+Every user has a version in the shared cache, which is replaced whenever the user is saved or deleted.
+A remembered token is only accepted while the user's version is the one it was remembered with, so a
+deactivated user is rejected by every process; a hit costs a single cache lookup.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from helusers.jwt import JWTAuthentication
+
+from democracy.utils.metrics import REGISTRY
+
+JWT_CACHE_REQUESTS = REGISTRY.counter(
+    "democracy_jwt_cache_requests_total", "JWT authentications by cache result", ("result",))
+
+CacheEntry = namedtuple('CacheEntry', ('user_id', 'user_version', 'user_db', 'user_fields', 'expires_at'))
+
+
+class TokenCache(object):
+    """
+    A bounded, thread-safe LRU mapping of token hashes to `CacheEntry`s.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        max_size = getattr(settings, 'DEMOCRACY_JWT_CACHE_SIZE', 1024)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_size:
+                self.entries.popitem(last=False)
+
+    def forget_user(self, user_id):
+        with self.lock:
+            for key in [key for (key, entry) in self.entries.items() if entry.user_id == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def get_token_key(jwt_value):
+    if isinstance(jwt_value, str):
+        jwt_value = jwt_value.encode('utf-8')
+    return hashlib.sha256(jwt_value).hexdigest()
+
+
+def get_user_version_key(user_id):
+    return 'democracy:jwt-user-version:%s' % user_id
+
+
+def get_user_version(user_id):
+    # A random version, rather than a counter, so that a version evicted from the cache is never reissued
+    return cache.get_or_set(get_user_version_key(user_id), lambda: uuid.uuid4().hex, None)
+
+
+def bump_user_version(user_id):
+    cache.set(get_user_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def get_user_fields(user):
+    return {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields}
+
+
+def build_user(user_fields, db):
+    """
+    Build a user from a snapshot of its row, as if it had been loaded from the database `db`.
+    """
+    user = get_user_model()(**user_fields)
+    user._state.adding = False
+    user._state.db = db
+    return user
+
+
+def get_expiry(jwt_value):
+    max_age = getattr(settings, 'DEMOCRACY_JWT_CACHE_MAX_AGE', 300)
+    expires_at = time.time() + max_age
+    # The token has just been verified, so its claims can be read without checking the signature again
+    exp = jwt.decode(jwt_value, verify=False).get('exp')
+    if exp is not None:
+        expires_at = min(expires_at, exp)
+    return expires_at
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        jwt_value = self.get_jwt_value(request)
+        if jwt_value is None or not getattr(settings, 'DEMOCRACY_JWT_CACHE_SIZE', 1024):
+            return super().authenticate(request)
+        key = get_token_key(jwt_value)
+        entry = token_cache.get(key)
+        if entry is not None and entry.user_version == get_user_version(entry.user_id):
+            JWT_CACHE_REQUESTS.inc(result='hit')
+            return (build_user(entry.user_fields, entry.user_db), jwt_value)
+        JWT_CACHE_REQUESTS.inc(result='miss')
+        result = super().authenticate(request)
+        if result is not None and result[0].is_active:
+            user = result[0]
+            token_cache.set(key, CacheEntry(
+                user.pk, get_user_version(user.pk), user._state.db, get_user_fields(user), get_expiry(jwt_value)
+            ))
+        return result
+
+
+def forget_user_tokens(sender, instance, **kwargs):
+    bump_user_version(instance.pk)
+    token_cache.forget_user(instance.pk)
+
+
+post_save.connect(forget_user_tokens, sender=get_user_model())
+post_delete.connect(forget_user_tokens, sender=get_user_model())
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk synthetic data generation for load and benchmark testing.
+
+Unlike the factory_boy factories, which create rows one at a time with all model logic,
+`SyntheticDataGenerator` writes through `bulk_create` and direct many-to-many through-table
+inserts, so production-sized data sets can be loaded in minutes. All randomness (including
+primary keys) comes from a single seeded `random.Random`, dates are offsets from a fixed epoch,
+and integer primary keys are allocated from a block of `ID_BLOCK_SIZE` keys derived from the seed,
+so a given seed and size always produce the same data, whenever and into whichever database.
+"""
+import io
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils.timezone import utc
+
+from democracy.enums import Commenting, InitialSectionType
+from democracy.models import ContactPerson, Hearing, Label, Organization, Section, SectionImage, SectionType
+from democracy.models.section import SectionComment
+
+LOG = logging.getLogger(__name__)
+
+PRESETS = {
+    'small': {
+        'hearings': 20, 'sections': 3, 'comments': 20, 'votes': 2, 'images': 1, 'located': 0.2, 'users': 100,
+    },
+    'medium': {
+        'hearings': 200, 'sections': 4, 'comments': 200, 'votes': 3, 'images': 2, 'located': 0.2, 'users': 5000,
+    },
+    'large': {
+        'hearings': 1000, 'sections': 5, 'comments': 400, 'votes': 4, 'images': 2, 'located': 0.3, 'users': 50000,
+    },
+    'production': {
+        'hearings': 2500, 'sections': 6, 'comments': 300, 'votes': 5, 'images': 3, 'located': 0.3, 'users': 200000,
+    },
+}
+
+WORDS = (
+    'kaupunki puisto katu asema tori silta ranta koulu kirjasto pyörätie bussi raitiovaunu metro kortteli '
+    'city park street station square bridge shore school library cycleway bus tram subway block '
+    'stad park gata station torg bro strand skola bibliotek cykelväg buss spårvagn tunnelbana kvarter '
+    'new old green quiet busy safe better more less plan proposal change area housing traffic'
+).split()
+
+# Rough bounding box of Helsinki, used for located comments
+LOCATION_BOUNDS = ((24.83, 25.25), (60.13, 60.30))
+
+SYNTHETIC_IMAGE_PATH = 'images/synthetic/placeholder.jpg'
+SYNTHETIC_IMAGE_SIZE = (640, 480)
+
+# The default moment all generated dates are relative to
+SYNTHETIC_EPOCH = datetime(2017, 1, 1, tzinfo=utc)
+
+# Integer primary keys of seed `n` are allocated from `(n + 1) * ID_BLOCK_SIZE` on, which leaves the keys below
+# the first block to the real rows. The blocks fit the largest preset and 32-bit integer keys up to `MAX_SEED`.
+ID_BLOCK_SIZE = 10 ** 7
+MAX_SEED = 2 ** 31 // ID_BLOCK_SIZE - 2
+
+
+class SyntheticDataGenerator(object):
+    """
+    Generate hearings, sections, images, comments and votes in bulk.
+
+    :param seed: Seed for all random choices, including primary keys
+    :param hearings: Number of hearings
+    :param sections: Number of sections per hearing (the first one is always the main section)
+    :param comments: Average number of comments per section
+    :param votes: Average number of registered votes per comment
+    :param images: Number of images per section
+    :param located: Fraction of comments that have a GeoJSON location
+    :param users: Number of users to vote and comment with
+    :param languages: Language codes to write translations for
+    :param batch_size: Maximum number of rows per INSERT
+    :param epoch: The moment the hearings' dates are generated around
+    """
+
+    def __init__(self, seed=0, hearings=20, sections=3, comments=20, votes=2, images=1, located=0.2, users=100,
+                 languages=None, batch_size=5000, stdout=None, epoch=SYNTHETIC_EPOCH):
+        self.seed = seed
+        self.epoch = epoch
+        self.random = random.Random(seed)
+        self.n_hearings = hearings
+        self.n_sections = max(sections, 1)
+        self.n_comments = comments
+        self.n_votes = votes
+        self.n_images = images
+        self.located = located
+        self.n_users = users
+        self.languages = languages or [lang['code'] for lang in settings.PARLER_LANGUAGES[None]]
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self._buffers = {}
+
+    def log(self, message, *args):
+        LOG.info(message, *args)
+        if self.stdout:
+            self.stdout.write(message % args)
+
+    def generate_id(self):
+        return '%032x' % self.random.getrandbits(128)
+
+    def text(self, min_words, max_words):
+        return ' '.join(self.random.choice(WORDS) for x in range(self.random.randint(min_words, max_words)))
+
+    def translations(self, master, **fields):
+        """
+        Build parler translation rows for `master`, one per language, and fill its `translations_cache`.
+
+        Field values are callables, so every language gets its own text.
+        """
+        translation_model = master._parler_meta.root_model
+        rows = [
+            translation_model(master_id=master.pk, language_code=language_code,
+                              **{field: factory() for (field, factory) in fields.items()})
+            for language_code in self.languages
+        ]
+        master.translations_cache = {
+            field: {row.language_code: getattr(row, field) for row in rows} for field in fields
+        }
+        return rows
+
+    def add(self, model, objects):
+        self._buffers.setdefault(model, []).extend(objects)
+
+    @property
+    def n_buffered(self):
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def flush(self):
+        # Insert in dependency order so that foreign keys always point to existing rows
+        ordered = [
+            Hearing, Hearing._parler_meta.root_model, Hearing.labels.through, Hearing.contact_persons.through,
+            Section, Section._parler_meta.root_model, SectionImage, SectionImage._parler_meta.root_model,
+            SectionComment, SectionComment.voters.through,
+        ]
+        for model in ordered + [model for model in self._buffers if model not in ordered]:
+            buffer = self._buffers.pop(model, [])
+            if buffer:
+                model._base_manager.bulk_create(buffer, batch_size=self.batch_size)
+
+    @property
+    def first_auto_id(self):
+        return (self.seed + 1) * ID_BLOCK_SIZE
+
+    def ensure_image(self):
+        if not default_storage.exists(SYNTHETIC_IMAGE_PATH):
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.new('RGB', SYNTHETIC_IMAGE_SIZE, (128, 160, 128)).save(buffer, format='JPEG')
+            default_storage.save(SYNTHETIC_IMAGE_PATH, ContentFile(buffer.getvalue()))
+        return SYNTHETIC_IMAGE_PATH
+
+    def create_users(self):
+        User = get_user_model()
+        prefix = 'synthetic-%d-' % self.seed
+        existing = set(User.objects.filter(username__startswith=prefix).values_list('username', flat=True))
+        users = []
+        for n in range(self.n_users):
+            user_uuid = uuid.UUID(int=self.random.getrandbits(128), version=4)
+            username = '%s%d' % (prefix, n)
+            if username in existing:
+                continue
+            users.append(User(
+                id=self.first_auto_id + n, username=username, uuid=user_uuid, password='!', date_joined=self.epoch,
+                first_name=self.random.choice(WORDS).title(), last_name=self.random.choice(WORDS).title(),
+            ))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.user_ids = list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+        self.log('%d users available', len(self.user_ids))
+
+    def create_organization(self):
+        organization_id = self.generate_id()
+        name = 'Synthetic organization %d' % self.seed
+        self.organization = Organization.objects.filter(name=name).first()
+        if self.organization is None:
+            self.organization = Organization(
+                id=organization_id, name=name, created_at=self.epoch, modified_at=self.epoch
+            )
+            Organization.objects.bulk_create([self.organization])
+        contact_persons = []
+        for n in range(3):
+            contact_person = ContactPerson(
+                id=self.generate_id(), organization=self.organization, created_at=self.epoch, modified_at=self.epoch,
+                name=self.text(2, 2).title(), phone='555-%04d' % n, email='contact%d@example.com' % n,
+            )
+            contact_persons.append(contact_person)
+            self.add(ContactPerson._parler_meta.root_model, self.translations(
+                contact_person, title=lambda: self.text(1, 3)
+            ))
+        ContactPerson.objects.bulk_create(contact_persons)
+        self.contact_person_ids = [contact_person.pk for contact_person in contact_persons]
+
+    def create_labels(self):
+        labels = [
+            Label(id=self.first_auto_id + n, created_at=self.epoch, modified_at=self.epoch) for n in range(10)
+        ]
+        for label in labels:
+            self.add(Label._parler_meta.root_model, self.translations(label, label=lambda: self.text(1, 2)))
+        Label.objects.bulk_create(labels)
+        self.label_ids = [label.pk for label in labels]
+
+    def create_hearing(self, number, section_types):
+        hearing_id = self.generate_id()
+        open_at = self.epoch - timedelta(days=self.random.randint(0, 720))
+        close_at = open_at + timedelta(days=self.random.randint(14, 90))
+        hearing = Hearing(
+            id=hearing_id, slug='synthetic-%d-%d' % (self.seed, number),
+            open_at=open_at, close_at=close_at, created_at=open_at, modified_at=open_at,
+            organization=self.organization,
+        )
+        self.add(Hearing, [hearing])
+        self.add(Hearing._parler_meta.root_model, self.translations(
+            hearing, title=lambda: self.text(3, 8), borough=lambda: self.random.choice(WORDS).title()
+        ))
+        self.add(Hearing.labels.through, [
+            Hearing.labels.through(hearing_id=hearing_id, label_id=label_id)
+            for label_id in self.random.sample(self.label_ids, self.random.randint(0, 3))
+        ])
+        self.add(Hearing.contact_persons.through, [
+            Hearing.contact_persons.through(hearing_id=hearing_id, contactperson_id=self.random.choice(
+                self.contact_person_ids
+            ))
+        ])
+        for ordering in range(self.n_sections):
+            section_type = section_types[InitialSectionType.MAIN] if ordering == 0 else self.random.choice(
+                [section_types[InitialSectionType.SCENARIO], section_types[InitialSectionType.PART]]
+            )
+            self.create_section(hearing, section_type, ordering + 1)
+        return hearing
+
+    def create_section(self, hearing, section_type, ordering):
+        section_id = self.generate_id()
+        section = Section(
+            id=section_id, hearing_id=hearing.pk, type_id=section_type.pk, ordering=ordering,
+            created_at=hearing.created_at, modified_at=hearing.created_at,
+            commenting=Commenting.OPEN, voting=Commenting.OPEN,
+        )
+        self.add(Section, [section])
+        self.add(Section._parler_meta.root_model, self.translations(
+            section, title=lambda: self.text(2, 6), abstract=lambda: self.text(20, 60),
+            content=lambda: '<p>%s</p>' % self.text(200, 800),
+        ))
+        for image_ordering in range(self.n_images):
+            image_id = self.next_image_id
+            self.next_image_id += 1
+            image = SectionImage(
+                id=image_id, section_id=section_id, image=self.image_path, ordering=image_ordering,
+                width=SYNTHETIC_IMAGE_SIZE[0], height=SYNTHETIC_IMAGE_SIZE[1],
+                created_at=hearing.created_at, modified_at=hearing.created_at,
+            )
+            self.add(SectionImage, [image])
+            self.add(SectionImage._parler_meta.root_model, self.translations(
+                image, title=lambda: self.text(1, 4), caption=lambda: self.text(5, 15)
+            ))
+        n_comments = self.random.randint(0, 2 * self.n_comments)
+        for n in range(n_comments):
+            self.create_comment(hearing, section_id)
+
+    def create_comment(self, hearing, section_id):
+        comment_id = self.next_comment_id
+        self.next_comment_id += 1
+        created_at = hearing.open_at + (hearing.close_at - hearing.open_at) * self.random.random()
+        voter_ids = self.random.sample(self.user_ids, min(
+            len(self.user_ids), int(self.random.expovariate(1.0 / self.n_votes)) if self.n_votes else 0
+        ))
+        n_unregistered_votes = self.random.randint(0, 2)
+        registered = self.random.random() < 0.7
+        geojson = None
+        if self.random.random() < self.located:
+            geojson = {
+                'type': 'Feature',
+                'properties': {},
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [
+                        round(self.random.uniform(*LOCATION_BOUNDS[0]), 6),
+                        round(self.random.uniform(*LOCATION_BOUNDS[1]), 6),
+                    ],
+                },
+            }
+        self.add(SectionComment, [SectionComment(
+            id=comment_id, section_id=section_id, content=self.text(5, 120), title='',
+            created_by_id=self.random.choice(self.user_ids) if registered else None,
+            author_name=None if registered else self.text(1, 2).title(),
+            language_code=self.random.choice(self.languages), geojson=geojson,
+            label_id=self.random.choice(self.label_ids) if self.random.random() < 0.05 else None,
+            n_votes=len(voter_ids) + n_unregistered_votes, n_unregistered_votes=n_unregistered_votes,
+            created_at=created_at, modified_at=created_at,
+        )])
+        self.add(SectionComment.voters.through, [
+            SectionComment.voters.through(sectioncomment_id=comment_id, user_id=user_id) for user_id in voter_ids
+        ])
+
+    def reset_sequences(self):
+        sql = connection.ops.sequence_reset_sql(no_style(), [get_user_model(), Label, SectionImage, SectionComment])
+        if sql:
+            with connection.cursor() as cursor:
+                for statement in sql:
+                    cursor.execute(statement)
+
+    def recompute_counters(self, hearing_ids):
+        """
+        Recompute `n_comments` of the generated sections and hearings with grouped UPDATEs.
+
+        Comment vote counts are written exactly on insert, so they need no recomputation.
+        """
+        sections = Section.objects.filter(hearing_id__in=hearing_ids)
+        counts = {}
+        comments = SectionComment.objects.filter(section__in=sections)
+        for row in comments.values('section_id').annotate(n=Count('id')).order_by():
+            counts.setdefault(row['n'], []).append(row['section_id'])
+        for n_comments, section_ids in counts.items():
+            for start in range(0, len(section_ids), self.batch_size):
+                Section.objects.filter(pk__in=section_ids[start:start + self.batch_size]).update(
+                    n_comments=n_comments
+                )
+        hearing_counts = {}
+        for row in sections.values('hearing_id').annotate(n=Sum('n_comments')).order_by():
+            hearing_counts.setdefault(row['n'] or 0, []).append(row['hearing_id'])
+        for n_comments, ids in hearing_counts.items():
+            Hearing.objects.filter(pk__in=ids).update(n_comments=n_comments)
+
+    def generate(self):
+        if not 0 <= self.seed <= MAX_SEED:
+            raise ValueError('The seed must be between 0 and %d' % MAX_SEED)
+        if Hearing.objects.everything(slug='synthetic-%d-0' % self.seed).exists():
+            raise ValueError('Synthetic data for seed %d has already been generated' % self.seed)
+        section_types = {section_type.identifier: section_type for section_type in SectionType.objects.initial()}
+        self.image_path = self.ensure_image()
+        self.create_users()
+        with transaction.atomic():
+            self.create_organization()
+            self.create_labels()
+            self.flush()
+        self.next_image_id = self.next_comment_id = self.first_auto_id
+        hearing_ids = []
+        number = 0
+        while number < self.n_hearings:
+            # Every transaction writes whole hearings and roughly `batch_size` rows
+            with transaction.atomic():
+                while number < self.n_hearings and self.n_buffered < self.batch_size:
+                    hearing_ids.append(self.create_hearing(number, section_types).pk)
+                    number += 1
+                self.flush()
+            self.log('%d/%d hearings written', number, self.n_hearings)
+        self.reset_sequences()
+        self.recompute_counters(hearing_ids)
+        self.log('Comment counters recomputed')
+        return hearing_ids
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP load testing harness.
+
+Replays weighted request scenarios against the whole stack (JWT authentication, middleware, DRF
+and serializers) with a number of concurrent clients, and reports latency percentiles, requests
+per second and database queries per request.
+
+Requests can be driven
+
+* in-process, by calling the WSGI application from `kerrokantasi.wsgi` directly from client threads,
+* against a local pre-forked multi-worker server started by the harness, or
+* against an already running server given by URL.
+
+In the first two modes the application is wrapped in `QueryCountingApplication`, which reports the
+number of database queries of every request in the `X-Query-Count` response header.
+"""
+import io
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime, timedelta
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from democracy.enums import Commenting
+from democracy.models import Hearing, Section, SectionComment
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+# Scenarios skipped in a row before a client gives up
+MAX_SKIPPED_SCENARIOS = 100
+
+Scenario = namedtuple('Scenario', ('name', 'weight', 'build'))
+Result = namedtuple('Result', ('scenario', 'authenticated', 'status', 'seconds', 'queries'))
+
+
+class QueryCountingApplication(object):
+    """
+    WSGI middleware that reports the number of database queries in a response header.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        # Per call, as the instance is shared by the client threads
+        response = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+
+        with CaptureQueriesContext(connection) as context:
+            body = b''.join(self.application(environ, capture_start_response))
+        start_response(response['status'], response['headers'] + [
+            (QUERY_COUNT_HEADER, str(len(context.captured_queries)))
+        ])
+        return [body]
+
+
+def get_jwt_token(user, lifetime=timedelta(hours=2)):
+    """
+    Build a JWT that `helusers.jwt.JWTAuthentication` accepts for `user`.
+    """
+    from rest_framework_jwt.settings import api_settings
+    payload = {
+        'sub': str(user.uuid),
+        'username': user.username,
+        'exp': datetime.utcnow() + lifetime,
+    }
+    if api_settings.JWT_AUDIENCE is not None:
+        payload['aud'] = api_settings.JWT_AUDIENCE
+    if api_settings.JWT_ISSUER is not None:
+        payload['iss'] = api_settings.JWT_ISSUER
+    return api_settings.JWT_ENCODE_HANDLER(payload)
+
+
+class Targets(object):
+    """
+    Sample of existing objects the scenarios pick their URLs from.
+    """
+
+    def __init__(self, rng, sample_size=200):
+        visible = Hearing.objects.public(open_at__lte=now())
+        self.hearing_ids = list(visible.order_by('-created_at').values_list('pk', flat=True)[:sample_size])
+        open_sections = Section.objects.filter(
+            hearing__in=visible.filter(close_at__gt=now(), force_closed=False),
+        ).exclude(commenting=Commenting.NONE)
+        self.sections = list(open_sections.values_list('hearing_id', 'pk', 'commenting')[:sample_size])
+        self.comments = list(
+            SectionComment.objects.filter(section__in=open_sections).exclude(
+                section__voting=Commenting.NONE
+            ).values_list('section__hearing_id', 'section_id', 'pk')[:sample_size]
+        )
+        self.rng = rng
+
+    def hearing_id(self):
+        return self.rng.choice(self.hearing_ids)
+
+
+def hearing_list(targets, authenticated):
+    return 'GET', '/v1/hearing/?limit=20', None
+
+
+def hearing_detail(targets, authenticated):
+    if not targets.hearing_ids:
+        return None
+    return 'GET', '/v1/hearing/%s/' % targets.hearing_id(), None
+
+
+def hearing_map(targets, authenticated):
+    return 'GET', '/v1/hearing/map/', None
+
+
+def comment_post(targets, authenticated):
+    sections = [
+        section for section in targets.sections
+        if authenticated or Commenting(section[2]) == Commenting.OPEN
+    ]
+    if not sections:
+        return None
+    hearing_id, section_id, commenting = targets.rng.choice(sections)
+    data = {'content': 'Load test comment %d' % targets.rng.randint(0, 10 ** 9), 'section': section_id}
+    return 'POST', '/v1/hearing/%s/sections/%s/comments/' % (hearing_id, section_id), data
+
+
+def comment_vote(targets, authenticated):
+    if not targets.comments:
+        return None
+    hearing_id, section_id, comment_id = targets.rng.choice(targets.comments)
+    return 'POST', '/v1/hearing/%s/sections/%s/comments/%s/vote/' % (hearing_id, section_id, comment_id), {}
+
+
+DEFAULT_SCENARIOS = [
+    Scenario('hearing-list', 40, hearing_list),
+    Scenario('hearing-detail', 30, hearing_detail),
+    Scenario('map', 15, hearing_map),
+    Scenario('comment-post', 8, comment_post),
+    Scenario('vote', 7, comment_vote),
+]
+
+
+def build_environ(method, path, body, headers):
+    path, _, query_string = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        if name == 'Content-Type':
+            environ['CONTENT_TYPE'] = value
+        else:
+            environ['HTTP_%s' % name.upper().replace('-', '_')] = value
+    return environ
+
+
+class InProcessTransport(object):
+    """
+    Call the WSGI application directly from the client thread.
+    """
+
+    def __init__(self, application):
+        self.application = QueryCountingApplication(application)
+
+    def request(self, method, path, body, headers):
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = dict(response_headers)
+
+        try:
+            b''.join(self.application(build_environ(method, path, body, headers), start_response))
+        finally:
+            connection.close()  # Each client thread has its own connection; don't leak them
+        return response['status'], response['headers'].get(QUERY_COUNT_HEADER)
+
+    def close(self):
+        pass
+
+
+class HTTPTransport(object):
+    """
+    Send requests over HTTP with one keep-alive connection per client thread.
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, path, body, headers):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.local.connection.request(method, self.prefix + path, body=body or None, headers=headers)
+            response = self.local.connection.getresponse()
+            response.read()
+        except (OSError, IOError):
+            self.local.connection.close()
+            del self.local.connection
+            raise
+        return response.status, response.getheader(QUERY_COUNT_HEADER)
+
+    def close(self):
+        pass
+
+
+class ReusePortWSGIServer(WSGIServer):
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host, port, ready):
+    from kerrokantasi.wsgi import application
+    server = ReusePortWSGIServer((host, port), QuietWSGIRequestHandler)
+    server.set_app(QueryCountingApplication(application))
+    ready.set()
+    server.serve_forever()
+
+
+class LocalServer(object):
+    """
+    A pre-forked pool of single-threaded WSGI workers sharing a port through SO_REUSEPORT (Linux).
+    """
+
+    def __init__(self, workers, host='127.0.0.1', port=8765):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.processes = []
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % (self.host, self.port)
+
+    def start(self):
+        connections.close_all()  # Forked workers must not share the parent's database connections
+        for x in range(self.workers):
+            ready = multiprocessing.Event()
+            process = multiprocessing.Process(target=serve, args=(self.host, self.port, ready), daemon=True)
+            process.start()
+            self.processes.append(process)
+            if not ready.wait(30):
+                self.stop()
+                raise RuntimeError('Server worker %d did not start in 30 seconds' % (x + 1))
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(results, elapsed):
+    def stats(subset):
+        latencies = sorted(result.seconds for result in subset)
+        queries = [result.queries for result in subset if result.queries is not None]
+        return OrderedDict([
+            ('requests', len(subset)),
+            ('errors', len([result for result in subset if result.status is None or result.status >= 500])),
+            ('rps', round(len(subset) / elapsed, 2) if elapsed else None),
+            ('p50_ms', round(percentile(latencies, 0.50) * 1000, 2) if latencies else None),
+            ('p90_ms', round(percentile(latencies, 0.90) * 1000, 2) if latencies else None),
+            ('p95_ms', round(percentile(latencies, 0.95) * 1000, 2) if latencies else None),
+            ('p99_ms', round(percentile(latencies, 0.99) * 1000, 2) if latencies else None),
+            ('max_ms', round(latencies[-1] * 1000, 2) if latencies else None),
+            ('queries_per_request', round(sum(queries) / len(queries), 2) if queries else None),
+        ])
+
+    groups = defaultdict(list)
+    for result in results:
+        groups['%s (%s)' % (result.scenario, 'jwt' if result.authenticated else 'anonymous')].append(result)
+    return OrderedDict([
+        ('elapsed_seconds', round(elapsed, 3)),
+        ('total', stats(results)),
+        ('scenarios', OrderedDict((name, stats(groups[name])) for name in sorted(groups))),
+    ])
+
+
+class LoadTest(object):
+    """
+    Run weighted scenarios with `concurrency` client threads for `duration` seconds or `requests` requests.
+
+    :param transport: `InProcessTransport` or `HTTPTransport`
+    :param authenticated_fraction: Fraction of requests sent with a JWT of a random user
+    """
+
+    def __init__(self, transport, scenarios=None, concurrency=8, duration=30, requests=None,
+                 authenticated_fraction=0.3, users=50, seed=0):
+        self.transport = transport
+        self.scenarios = scenarios or DEFAULT_SCENARIOS
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = requests
+        self.authenticated_fraction = authenticated_fraction
+        self.rng = random.Random(seed)
+        self.targets = Targets(self.rng)
+        self.tokens = [
+            get_jwt_token(user) for user in get_user_model().objects.filter(is_active=True).order_by('pk')[:users]
+        ]
+        self.results = []
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def pick_scenario(self):
+        point = self.rng.uniform(0, sum(scenario.weight for scenario in self.scenarios))
+        for scenario in self.scenarios:
+            point -= scenario.weight
+            if point <= 0:
+                return scenario
+        return self.scenarios[-1]
+
+    def next_request(self):
+        """
+        Pick the next request, skipping scenarios that have nothing to do with the current data.
+
+        :return: (scenario, authenticated, (method, path, data), token), or None when the run is done
+        """
+        with self.lock:
+            for attempt in range(MAX_SKIPPED_SCENARIOS):
+                if self.max_requests is not None and self.sent >= self.max_requests:
+                    return None
+                scenario = self.pick_scenario()
+                authenticated = bool(self.tokens) and self.rng.random() < self.authenticated_fraction
+                request = scenario.build(self.targets, authenticated)
+                if request is None:
+                    continue
+                self.sent += 1
+                return scenario, authenticated, request, self.rng.choice(self.tokens) if authenticated else None
+        return None  # None of the scenarios has anything to do
+
+    def client(self, deadline):
+        while time.perf_counter() < deadline:
+            item = self.next_request()
+            if item is None:
+                return
+            scenario, authenticated, (method, path, data), token = item
+            headers = {'Accept': 'application/json'}
+            body = b''
+            if data is not None:
+                body = json.dumps(data).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            if token:
+                headers['Authorization'] = 'JWT %s' % token
+            start = time.perf_counter()
+            try:
+                status, queries = self.transport.request(method, path, body, headers)
+            except Exception:
+                status, queries = None, None
+            seconds = time.perf_counter() - start
+            with self.lock:
+                self.results.append(Result(
+                    scenario.name, authenticated, status, seconds, int(queries) if queries is not None else None
+                ))
+
+    def run(self):
+        start = time.perf_counter()
+        deadline = start + (self.duration if self.duration else float('inf'))
+        threads = [threading.Thread(target=self.client, args=(deadline,)) for x in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.transport.close()
+        return summarize(self.results, time.perf_counter() - start)
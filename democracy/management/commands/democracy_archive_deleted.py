@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from democracy.archive import ARCHIVED_MODELS, archive_deleted
+from democracy.tenants import get_databases
+
+
+class Command(BaseCommand):
+    help = "Move rows soft-deleted more than the given number of days ago into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "DEMOCRACY_ARCHIVE_AFTER_DAYS", 90),
+            help="keep rows deleted this many days ago or later"
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="rows to move per transaction")
+        parser.add_argument(
+            "--database", action="append", dest="databases",
+            help="database alias to archive rows in; every database with hearing data by default"
+        )
+
+    def handle(self, **options):
+        cutoff = now() - timedelta(days=options["days"])
+        for alias in options["databases"] or get_databases():
+            for model in ARCHIVED_MODELS:
+                n_archived = archive_deleted(model, cutoff, using=alias, batch_size=options["batch_size"])
+                self.stdout.write("Archived %d %s in %s" % (n_archived, model._meta.verbose_name_plural, alias))
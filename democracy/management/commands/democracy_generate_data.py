@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from democracy.factories.synthetic import MAX_SEED, PRESETS, SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic, production-sized synthetic data set for load and benchmark testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed (0-%d); the same seed and sizes always generate the same data' % MAX_SEED)
+        parser.add_argument('--hearings', type=int, help='Number of hearings')
+        parser.add_argument('--sections', type=int, help='Sections per hearing')
+        parser.add_argument('--comments', type=int, help='Average comments per section')
+        parser.add_argument('--votes', type=int, help='Average registered votes per comment')
+        parser.add_argument('--images', type=int, help='Images per section')
+        parser.add_argument('--located', type=float, help='Fraction of comments with a location')
+        parser.add_argument('--users', type=int, help='Number of voting and commenting users')
+        parser.add_argument('--languages', help='Comma-separated translation languages (default: all)')
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sizes = dict(PRESETS[options['preset']])
+        for key in sizes:
+            if options.get(key) is not None:
+                sizes[key] = options[key]
+        languages = options['languages'].split(',') if options['languages'] else None
+        generator = SyntheticDataGenerator(
+            seed=options['seed'], languages=languages, batch_size=options['batch_size'], stdout=self.stdout,
+            **sizes
+        )
+        start = time.time()
+        try:
+            hearing_ids = generator.generate()
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write('Generated %d hearings in %.1f seconds' % (len(hearing_ids), time.time() - start))
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from democracy.loadtest import HTTPTransport, InProcessTransport, LoadTest, LocalServer
+
+
+class Command(BaseCommand):
+    help = "Replay weighted API scenarios with concurrent clients and report latency and query statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8, help="number of concurrent clients")
+        parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+        parser.add_argument("--requests", type=int, help="stop after this many requests")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="serve the application with this many pre-forked workers instead of in-process")
+        parser.add_argument("--port", type=int, default=8765, help="port for --workers")
+        parser.add_argument("--target", help="base URL of an already running server")
+        parser.add_argument("--authenticated-fraction", type=float, default=0.3,
+                            help="fraction of requests sent with a JWT")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", dest="json_file", help="write the report as JSON to this file")
+
+    def handle(self, **options):
+        if options["target"] and options["workers"]:
+            raise CommandError("--target and --workers are mutually exclusive")
+        server = None
+        if options["target"]:
+            transport = HTTPTransport(options["target"])
+        elif options["workers"]:
+            server = LocalServer(options["workers"], port=options["port"])
+            server.start()
+            transport = HTTPTransport(server.url)
+        else:
+            from kerrokantasi.wsgi import application
+            transport = InProcessTransport(application)
+
+        try:
+            report = LoadTest(
+                transport,
+                concurrency=options["concurrency"],
+                duration=options["duration"] if not options["requests"] else None,
+                requests=options["requests"],
+                authenticated_fraction=options["authenticated_fraction"],
+                seed=options["seed"],
+            ).run()
+        finally:
+            if server:
+                server.stop()
+
+        if options["json_file"]:
+            with open(options["json_file"], "w") as outf:
+                json.dump(report, outf, indent=2)
+        self.print_report(report)
+
+    def print_report(self, report):
+        columns = ("requests", "errors", "rps", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "queries_per_request")
+        self.stdout.write("%-32s %s" % ("scenario", " ".join("%9s" % column[:9] for column in columns)))
+        rows = list(report["scenarios"].items()) + [("total", report["total"])]
+        for name, stats in rows:
+            self.stdout.write("%-32s %s" % (name, " ".join(
+                "%9s" % ("-" if stats[column] is None else stats[column]) for column in columns
+            )))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from democracy.models import CommentEvent
+from democracy.tenants import get_databases
+
+
+class Command(BaseCommand):
+    help = "Delete comment stream events older than the given number of days"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="keep events this many days old or newer")
+
+    def handle(self, **options):
+        cutoff = now() - timedelta(days=options["days"])
+        n_deleted = 0
+        for alias in get_databases():
+            n_deleted += CommentEvent.objects.using(alias).filter(created_at__lt=cutoff).delete()[0]
+        self.stdout.write("Deleted %d comment events" % n_deleted)
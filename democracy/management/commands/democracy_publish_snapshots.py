@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from democracy.routers import reading_from_replicas
+from democracy.tenants import get_databases, using_tenant
+from democracy.snapshots import (
+    SnapshotError, get_closed_hearings, get_stale_hearing_ids, has_snapshot, is_stale, publish_snapshot,
+    remove_snapshot
+)
+
+
+class Command(BaseCommand):
+    help = "Publish static snapshots of closed hearings and republish stale ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("hearings", nargs="*", help="hearings to publish; all closed ones by default")
+        parser.add_argument("--force", action="store_true", help="republish up-to-date snapshots too")
+
+    def handle(self, **options):
+        if not getattr(settings, "DEMOCRACY_SNAPSHOT_BASE_URL", None):
+            raise CommandError("DEMOCRACY_SNAPSHOT_BASE_URL is not set")
+        with reading_from_replicas():  # Closed hearings hardly change, so replica lag does not matter
+            self.publish(options)
+
+    def get_hearings(self, options):
+        hearings = []
+        for alias in get_databases():
+            with using_tenant(alias):
+                queryset = get_closed_hearings()
+                if options["hearings"]:
+                    queryset = queryset.filter(pk__in=options["hearings"])
+                hearings.extend(queryset.order_by("pk"))
+        return hearings
+
+    def publish(self, options):
+        n_published = 0
+        closed_ids = set()
+        for hearing in self.get_hearings(options):
+            closed_ids.add(hearing.pk)
+            up_to_date = has_snapshot(hearing.pk) and not is_stale(hearing.pk)
+            if up_to_date and not (options["force"] or options["hearings"]):
+                continue
+            try:
+                files = publish_snapshot(hearing)
+            except SnapshotError as error:
+                self.stderr.write("Hearing %s: %s" % (hearing.pk, error))
+                continue
+            n_published += 1
+            self.stdout.write("Hearing %s: %d files" % (hearing.pk, len(files)))
+        self.stdout.write("Published %d snapshots" % n_published)
+        if not options["hearings"]:
+            # The stale snapshots of hearings that have been reopened, unpublished or deleted
+            for hearing_id in set(get_stale_hearing_ids()) - closed_ids:
+                remove_snapshot(hearing_id)
+                self.stdout.write("Hearing %s: removed" % hearing_id)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from democracy.models import ContactPerson, Hearing, Label, Section, SectionImage
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized translations cache of all translatable objects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing", action="store_true", help="only objects that have no cache yet")
+
+    def handle(self, **options):
+        for model in (Hearing, Section, SectionImage, Label, ContactPerson):
+            queryset = model._base_manager.all()
+            if options["missing"]:
+                queryset = queryset.filter(translations_cache__isnull=True)
+            n_objects = 0
+            for obj in queryset.iterator():
+                obj.update_translations_cache()
+                n_objects += 1
+            self.stdout.write("%s: rebuilt %d" % (model._meta.verbose_name_plural, n_objects))
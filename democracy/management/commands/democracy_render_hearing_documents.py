@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from democracy.views.hearing_document import find_inconsistent_documents, render_stale_documents
+
+
+class Command(BaseCommand):
+    help = "Render the queued and outdated pre-rendered hearing documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="keep rendering the queue as it fills")
+        parser.add_argument("--interval", type=float, default=2, help="seconds to wait when the queue is empty")
+        parser.add_argument("--limit", type=int, help="render at most this many documents per round")
+        parser.add_argument("--check", action="store_true",
+                            help="compare the stored documents with live renders and re-queue the ones that differ")
+
+    def handle(self, **options):
+        if options["check"]:
+            return self.check_documents()
+        while True:
+            n_rendered = render_stale_documents(options["limit"])
+            if n_rendered or not options["loop"]:
+                self.stdout.write("Rendered %d hearing documents" % n_rendered)
+            if not options["loop"]:
+                break
+            if not n_rendered:
+                time.sleep(options["interval"])
+
+    def check_documents(self):
+        inconsistent = list(find_inconsistent_documents())
+        for document in inconsistent:
+            self.stderr.write("Hearing %s document for %s differs from a live render" % (
+                document.hearing_id, document.base_url
+            ))
+            type(document).objects.using(document._state.db).filter(pk=document.pk).invalidate()
+        if inconsistent:
+            raise CommandError("%d inconsistent hearing documents" % len(inconsistent))
+        self.stdout.write("All hearing documents are consistent")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils.timezone import now
+
+from democracy.models import Hearing, Section, SectionComment, SectionImage
+from democracy.tenants import get_databases
+
+# The models synced with `modified_since`, and their lookups to their hearing
+SYNCED_MODELS = (
+    (SectionComment, 'section__hearing__'),
+    (SectionImage, 'section__hearing__'),
+    (Section, 'hearing__'),
+    (Hearing, ''),
+)
+
+
+class Command(BaseCommand):
+    help = "Mark the rows of hearings that have opened since they were last modified as modified"
+
+    def handle(self, **options):
+        # Rows become visible to anonymous users when their hearing opens, so incremental sync must send them
+        # again. Touching `modified_at` keeps the sync queries on its index. Run this every few minutes.
+        timestamp = now()
+        for alias in get_databases():
+            for model, hearing_lookup in SYNCED_MODELS:
+                n_touched = model._base_manager.using(alias).filter(**{
+                    '%sopen_at__lte' % hearing_lookup: timestamp,
+                    '%sopen_at__gt' % hearing_lookup: F('modified_at'),
+                }).update(modified_at=timestamp)
+                self.stdout.write("Touched %d %s in %s" % (n_touched, model._meta.verbose_name_plural, alias))
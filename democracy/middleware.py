@@ -0,0 +1,267 @@
+import json
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException
+
+from democracy.profiling import get_requested_mode, is_profiling_allowed, profile_view, should_sample
+from democracy.utils.metrics import BYTES_BUCKETS, COUNT_BUCKETS, REGISTRY
+from democracy.utils.sql import QueryStats
+
+performance_logger = logging.getLogger("democracy.performance")
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "democracy_request_duration_seconds", "Wall time of the request", ("view", "method"))
+DB_QUERIES = REGISTRY.histogram(
+    "democracy_request_db_queries", "Database queries per request", ("view", "method"), COUNT_BUCKETS)
+DB_SECONDS = REGISTRY.histogram(
+    "democracy_request_db_seconds", "Database time of the request", ("view", "method"))
+SERIALIZER_SECONDS = REGISTRY.histogram(
+    "democracy_request_serializer_seconds",
+    "Non-database time spent in the view, i.e. mostly in serializers", ("view", "method"))
+RENDER_SECONDS = REGISTRY.histogram(
+    "democracy_request_render_seconds", "Response rendering time", ("view", "method"))
+RESPONSE_BYTES = REGISTRY.histogram(
+    "democracy_response_size_bytes", "Response body size", ("view", "method"), BYTES_BUCKETS)
+
+
+def get_view_name(view_func, method):
+    """
+    Name a resolved view the way the metrics report it, e.g. `HearingViewSet.list`.
+    """
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return "%s.%s" % (view_func.__module__, view_func.__name__)
+    actions = getattr(view_func, "actions", None)
+    if actions is not None:
+        action = actions.get(method.lower(), method.lower())
+    else:
+        action = method.lower()
+    return "%s.%s" % (cls.__name__, action)
+
+
+def is_sampled(request):
+    """
+    Decide once per request whether it is sampled for profiling.
+    """
+    if not hasattr(request, "_profile_sampled"):
+        request._profile_sampled = should_sample()
+    return request._profile_sampled
+
+
+class RequestStats(object):
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_name = "unresolved"
+        self.view_start = self.view_end = None
+        self.view_db_start = self.view_db_end = None
+        self.queries = QueryStats()
+        self.queries.activate()
+
+    def restore(self):
+        self.queries.deactivate()
+
+
+class PerformanceMiddleware(object):
+    """
+    Record per-view wall time, database queries and time, serializer time, rendering time and
+    response size into the metrics registry, and log slow requests with their most repeated SQL.
+
+    Should be the first middleware so that the others are included in the wall time. Queries are counted
+    and timed per SQL template, so the slow request log of every request shows its most repeated SQL.
+    """
+
+    def process_request(self, request):
+        request._performance_stats = RequestStats()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = getattr(request, "_performance_stats", None)
+        if stats:
+            stats.view_name = get_view_name(view_func, request.method)
+            stats.view_start = time.perf_counter()
+            stats.view_db_start = stats.queries.seconds
+
+    def process_template_response(self, request, response):
+        stats = getattr(request, "_performance_stats", None)
+        if stats:
+            stats.view_end = time.perf_counter()
+            stats.view_db_end = stats.queries.seconds
+        return response
+
+    def process_response(self, request, response):
+        stats = getattr(request, "_performance_stats", None)
+        if not stats:
+            return response
+        try:
+            self.record(request, response, stats)
+        finally:
+            stats.restore()
+        return response
+
+    def record(self, request, response, stats):
+        end = time.perf_counter()
+        queries = stats.queries
+        labels = {"view": stats.view_name, "method": request.method}
+
+        serializer_seconds = render_seconds = 0
+        if stats.view_start is not None:
+            view_end = stats.view_end if stats.view_end is not None else end
+            view_db_end = stats.view_db_end if stats.view_end is not None else queries.seconds
+            view_db_seconds = view_db_end - stats.view_db_start
+            serializer_seconds = max(0, view_end - stats.view_start - view_db_seconds)
+            render_seconds = end - view_end
+        size = None if response.streaming else len(response.content)
+
+        REQUEST_SECONDS.observe(end - stats.start, **labels)
+        DB_QUERIES.observe(queries.count, **labels)
+        DB_SECONDS.observe(queries.seconds, **labels)
+        SERIALIZER_SECONDS.observe(serializer_seconds, **labels)
+        RENDER_SECONDS.observe(render_seconds, **labels)
+        if size is not None:
+            RESPONSE_BYTES.observe(size, **labels)
+
+        threshold = getattr(settings, "DEMOCRACY_SLOW_REQUEST_SECONDS", None)
+        if threshold is not None and end - stats.start >= threshold:
+            performance_logger.warning(json.dumps({
+                "event": "slow_request",
+                "view": stats.view_name,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "seconds": round(end - stats.start, 6),
+                "db_queries": queries.count,
+                "db_seconds": round(queries.seconds, 6),
+                "serializer_seconds": round(serializer_seconds, 6),
+                "render_seconds": round(render_seconds, 6),
+                "response_bytes": size,
+                "top_queries": queries.top_repeated(),
+            }, sort_keys=True))
+
+
+class ProfilingMiddleware(object):
+    """
+    Run views under a profiler on superuser request or for a sampled fraction of requests.
+
+    See `democracy.profiling`. Should come after the authentication middleware.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = get_requested_mode(request)
+        if mode:
+            if not is_profiling_allowed(request):
+                return None
+        elif is_sampled(request):
+            mode = "aggregate"
+        else:
+            return None
+        return profile_view(mode, get_view_name(view_func, request.method), request, view_func, view_args, view_kwargs)
+
+
+class MiddlewareChain(object):
+    """
+    The hooks of a list of old-style middleware, in the order Django's handler calls them.
+    """
+
+    def __init__(self, middleware_classes):
+        self.request_middleware = []
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.response_middleware = []
+        self.exception_middleware = []
+        for middleware_path in middleware_classes:
+            try:
+                middleware = import_string(middleware_path)()
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, 'process_request'):
+                self.request_middleware.append(middleware.process_request)
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.append(middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_middleware.insert(0, middleware.process_template_response)
+            if hasattr(middleware, 'process_response'):
+                self.response_middleware.insert(0, middleware.process_response)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_middleware.insert(0, middleware.process_exception)
+
+
+class MiddlewareDispatcher(object):
+    """
+    Run `DEMOCRACY_API_MIDDLEWARE_CLASSES` for API requests (paths matching `CORS_URLS_REGEX`) and
+    `DEMOCRACY_SITE_MIDDLEWARE_CLASSES` for everything else, e.g. the admin and the ckeditor views.
+
+    The JWT-authenticated API needs no sessions, CSRF protection, messages or frame options, so its
+    chain is much shorter. With `DEMOCRACY_API_MIDDLEWARE_CLASSES` set to None, API requests run the
+    site chain too.
+    """
+
+    def __init__(self):
+        self.api_path_re = re.compile(settings.CORS_URLS_REGEX)
+        self.site_chain = MiddlewareChain(getattr(settings, 'DEMOCRACY_SITE_MIDDLEWARE_CLASSES', ()))
+        api_middleware_classes = getattr(settings, 'DEMOCRACY_API_MIDDLEWARE_CLASSES', None)
+        self.api_chain = (
+            self.site_chain if api_middleware_classes is None else MiddlewareChain(api_middleware_classes)
+        )
+
+    def get_chain(self, request):
+        chain = getattr(request, '_middleware_chain', None)
+        if chain is None:
+            chain = self.api_chain if self.api_path_re.match(request.path_info) else self.site_chain
+            request._middleware_chain = chain
+        return chain
+
+    def process_request(self, request):
+        for process_request in self.get_chain(request).request_middleware:
+            response = process_request(request)
+            if response:
+                return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.get_chain(request).view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+
+    def process_template_response(self, request, response):
+        for process_template_response in self.get_chain(request).template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in self.get_chain(request).exception_middleware:
+            response = process_exception(request, exception)
+            if response:
+                return response
+
+    def process_response(self, request, response):
+        for process_response in self.get_chain(request).response_middleware:
+            response = process_response(request, response)
+        return response
+
+
+def get_jwt_user(request):
+    from democracy.authentication import CachedJWTAuthentication
+
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except APIException:
+        result = None
+    return result[0] if result else AnonymousUser()
+
+
+class JWTAuthenticationMiddleware(object):
+    """
+    Set `request.user` lazily from the JWT of the request, for code running outside the API views.
+
+    The replacement of the session authentication middleware in the API middleware chain.
+    """
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_jwt_user(request))
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('democracy', '0032_add_language_code_to_comment'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='hearing',
+            index_together=set([('modified_at', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='section',
+            index_together=set([('modified_at', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='sectioncomment',
+            index_together=set([('modified_at', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='sectionimage',
+            index_together=set([('modified_at', 'id')]),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('democracy', '0033_modified_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('comment_created', 'comment created'), ('comment_edited', 'comment edited'), ('comment_deleted', 'comment deleted'), ('comment_votes', 'vote count changed')], max_length=32, verbose_name='type')),
+                ('comment_id', models.IntegerField(verbose_name='comment')),
+                ('published', models.BooleanField(default=True, verbose_name='public')),
+                ('payload', models.TextField(verbose_name='payload')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='time of creation')),
+                ('hearing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_events', to='democracy.Hearing', verbose_name='hearing')),
+            ],
+            options={
+                'verbose_name': 'comment event',
+                'verbose_name_plural': 'comment events',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='commentevent',
+            index_together=set([('hearing', 'id')]),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('democracy', '0034_commentevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactperson',
+            name='translations_cache',
+            field=jsonfield.fields.JSONField(blank=True, editable=False, null=True, verbose_name='translations cache'),
+        ),
+        migrations.AddField(
+            model_name='hearing',
+            name='translations_cache',
+            field=jsonfield.fields.JSONField(blank=True, editable=False, null=True, verbose_name='translations cache'),
+        ),
+        migrations.AddField(
+            model_name='label',
+            name='translations_cache',
+            field=jsonfield.fields.JSONField(blank=True, editable=False, null=True, verbose_name='translations cache'),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='translations_cache',
+            field=jsonfield.fields.JSONField(blank=True, editable=False, null=True, verbose_name='translations cache'),
+        ),
+        migrations.AddField(
+            model_name='sectionimage',
+            name='translations_cache',
+            field=jsonfield.fields.JSONField(blank=True, editable=False, null=True, verbose_name='translations cache'),
+        ),
+    ]
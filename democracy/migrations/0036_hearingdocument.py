@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('democracy', '0035_translations_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HearingDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visibility', models.CharField(choices=[('anonymous', 'anonymous users')], default='anonymous', max_length=16, verbose_name='visibility')),
+                ('base_url', models.CharField(max_length=255, verbose_name='base URL')),
+                ('content', models.TextField(blank=True, verbose_name='content')),
+                ('generation', models.PositiveIntegerField(default=1, verbose_name='generation')),
+                ('rendered_generation', models.PositiveIntegerField(default=0, verbose_name='rendered generation')),
+                ('rendered_at', models.DateTimeField(blank=True, null=True, verbose_name='time of rendering')),
+                ('valid_until', models.DateTimeField(blank=True, null=True, verbose_name='valid until')),
+                ('hearing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='democracy.Hearing', verbose_name='hearing')),
+            ],
+            options={
+                'verbose_name': 'hearing document',
+                'verbose_name_plural': 'hearing documents',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='hearingdocument',
+            unique_together=set([('hearing', 'visibility', 'base_url')]),
+        ),
+    ]
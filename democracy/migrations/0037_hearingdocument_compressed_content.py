@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('democracy', '0036_hearingdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hearingdocument',
+            name='content_br',
+            field=models.BinaryField(null=True, verbose_name='brotli compressed content'),
+        ),
+        migrations.AddField(
+            model_name='hearingdocument',
+            name='content_gzip',
+            field=models.BinaryField(null=True, verbose_name='gzip compressed content'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# (table, index name, columns) of the composite indexes for the hot queries, see `test_indexes`
+INDEXES = [
+    # Hearings visible to everyone: `filter_by_hearing_visible`
+    ('democracy_hearing', 'democracy_hearing_live_visible', ('published', 'open_at')),
+    # Sections of a hearing by type, e.g. the main section
+    ('democracy_section', 'democracy_section_live_hearing_type', ('hearing_id', 'type_id')),
+    # Comment lists of a section, newest or most voted first
+    ('democracy_sectioncomment', 'democracy_sectioncomment_live_section_created', ('section_id', 'created_at')),
+    ('democracy_sectioncomment', 'democracy_sectioncomment_live_section_votes', ('section_id', 'n_votes')),
+    # `BaseCommentFilter`
+    ('democracy_sectioncomment', 'democracy_sectioncomment_live_authorization_code', ('authorization_code',)),
+]
+
+# Almost all queries only concern rows that have not been deleted, so the indexes leave the rest out.
+# Other databases get `deleted` as the first column instead: SQLite supports partial indexes too, but does
+# not use them for the `deleted = ?` of parametrized queries.
+LIVE_CONDITIONS = {
+    'postgresql': 'NOT deleted',
+}
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    quote_name = connection.ops.quote_name
+    condition = LIVE_CONDITIONS.get(connection.vendor)
+    for table, name, columns in INDEXES:
+        if not condition:
+            columns = ('deleted',) + columns
+        sql = 'CREATE INDEX %s ON %s (%s)' % (
+            quote_name(name), quote_name(table), ', '.join(quote_name(column) for column in columns)
+        )
+        if condition:
+            sql += ' WHERE %s' % condition
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    quote_name = connection.ops.quote_name
+    for table, name, columns in INDEXES:
+        if connection.vendor == 'mysql':
+            schema_editor.execute('DROP INDEX %s ON %s' % (quote_name(name), quote_name(table)))
+        else:
+            schema_editor.execute('DROP INDEX %s' % quote_name(name))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('democracy', '0037_hearingdocument_compressed_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.apps.registry import Apps
+from django.db import migrations, models
+
+# The tables that `democracy_archive_deleted` moves rows out of, see `democracy.archive`
+ARCHIVED_MODELS = [
+    'CommentImage', 'SectionComment', 'SectionComment_voters',
+    'SectionImage', 'SectionImageTranslation', 'Section', 'SectionTranslation',
+]
+ARCHIVE_TABLE_SUFFIX = '_archive'
+
+
+def clone_field(field):
+    if field.is_relation:
+        field = field.target_field
+        if isinstance(field, models.AutoField):
+            return models.IntegerField(null=True)
+    if isinstance(field, models.FileField):
+        return models.CharField(max_length=field.max_length, null=True)
+    name, path, args, kwargs = field.deconstruct()
+    for option in ('primary_key', 'unique', 'db_index', 'db_column', 'validators'):
+        kwargs.pop(option, None)
+    kwargs['null'] = True
+    return field.__class__(*args, **kwargs)
+
+
+def get_archive_models(apps):
+    """
+    Build models of the archive tables from the models as they are at this migration.
+    """
+    archive_apps = Apps()
+    for model_name in ARCHIVED_MODELS:
+        model = apps.get_model('democracy', model_name)
+        meta = type('Meta', (), {
+            'apps': archive_apps,
+            'app_label': 'democracy',
+            'db_table': model._meta.db_table + ARCHIVE_TABLE_SUFFIX,
+        })
+        attrs = {'__module__': __name__, 'Meta': meta}
+        for field in model._meta.concrete_fields:
+            archive_field = clone_field(field)
+            if field.primary_key:
+                archive_field.primary_key = True
+                archive_field.null = False
+            archive_field.db_column = field.column
+            attrs[field.attname] = archive_field
+        yield type(str('Archived%s' % model.__name__), (models.Model,), attrs)
+
+
+def create_archive_tables(apps, schema_editor):
+    for archive_model in get_archive_models(apps):
+        schema_editor.create_model(archive_model)
+
+
+def drop_archive_tables(apps, schema_editor):
+    for archive_model in get_archive_models(apps):
+        schema_editor.delete_model(archive_model)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('democracy', '0038_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_archive_tables, drop_archive_tables),
+    ]
@@ -1,11 +1,15 @@
+from .documents import HearingDocument
+from .events import CommentEvent
 from .hearing import Hearing
 from .label import Label
 from .section import Section, SectionComment, SectionImage, SectionType
 from .organization import ContactPerson, Organization
 
 __all__ = [
+    "CommentEvent",
     "ContactPerson",
     "Hearing",
+    "HearingDocument",
     "Label",
     "Section",
     "SectionComment",
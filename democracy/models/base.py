@@ -1,39 +1,73 @@
 from functools import lru_cache
+from itertools import chain
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models import ManyToOneRel
 from django.utils import timezone
 from django.utils.crypto import get_random_string
-from django.utils.translation import ugettext_lazy as _
+from django.utils.translation import get_language, ugettext_lazy as _
 from enumfields.fields import EnumIntegerField
+from jsonfield import JSONField
+from parler import appsettings as parler_settings
 
 from democracy.enums import Commenting
 
 ORDERING_HELP = _("The ordering position for this object. Objects with smaller numbers appear first.")
+# Denormalized counts that are recached whenever comments or votes come in
+COUNTER_FIELDS = frozenset(("n_comments", "n_votes", "n_unregistered_votes"))
 
 
 def generate_id():
     return get_random_string(32)
 
 
+def is_counter_update(update_fields):
+    """
+    Tell whether a save with the given `update_fields` (as passed to `post_save`) only recached counters.
+    """
+    return update_fields is not None and set(update_fields) <= COUNTER_FIELDS
+
+
 class BaseModelManager(models.Manager):
 
     def get_queryset(self):
-        return super().get_queryset().exclude(deleted=True)
+        # `filter` rather than `exclude`, so that the queries match the partial indexes over live rows
+        return super().get_queryset().filter(deleted=False)
 
     def public(self, *args, **kwargs):
-        return self.get_queryset().exclude(published=False).filter(*args, **kwargs)
+        return self.get_queryset().filter(published=True).filter(*args, **kwargs)
 
     def with_unpublished(self, *args, **kwargs):
         return self.get_queryset().filter(*args, **kwargs)
 
-    def deleted(self, *args, **kwargs):
+    def deleted(self, *args, archived=False, **kwargs):
+        """
+        Query the soft-deleted rows, or with `archived=True` the deleted rows moved into the archive.
+        """
+        if archived:
+            return self.archived(*args, **kwargs)
         return super().get_queryset().filter(deleted=True).filter(*args, **kwargs)
 
-    def everything(self, *args, **kwargs):
-        return super().get_queryset().filter(*args, **kwargs)
+    def everything(self, *args, archived=False, **kwargs):
+        """
+        Query all rows, deleted or not.
+
+        With `archived=True`, iterate over the matching live rows and then the matching archived rows,
+        which are `democracy.archive.ArchivedRow`s. Lookups must then work on both, e.g. `section_id=...`.
+        """
+        queryset = super().get_queryset().filter(*args, **kwargs)
+        if archived:
+            return chain(queryset, self.archived(*args, **kwargs))
+        return queryset
+
+    def archived(self, *args, **kwargs):
+        """
+        Query the rows moved into the archive table of the model, see `democracy.archive`.
+        """
+        from democracy.archive import get_archive_model
+        return get_archive_model(self.model).objects.using(self.db).filter(*args, **kwargs)
 
 
 class BaseModel(models.Model):
@@ -72,12 +106,13 @@ class BaseModel(models.Model):
         super().save(*args, **kwargs)
 
     def soft_delete(self, using=None):
+        # `modified_at` too, so that incremental sync reports the row as deleted
         self.deleted = True
-        self.save(update_fields=("deleted",), using=using, force_update=True)
+        self.save(update_fields=("deleted", "modified_at"), using=using, force_update=True)
 
     def undelete(self, using=None):
         self.deleted = False
-        self.save(update_fields=("deleted",), using=using, force_update=True)
+        self.save(update_fields=("deleted", "modified_at"), using=using, force_update=True)
 
     def delete(self, using=None):
         raise NotImplementedError("This model does not support hard deletion")
@@ -115,6 +150,55 @@ class StringIdBaseModel(BaseModel):
         abstract = True
 
 
+class TranslationsCacheMixin(models.Model):
+    """
+    Keep a denormalized copy of all translations in `translations_cache`, as `{field: {language: value}}`.
+
+    The copy is rewritten whenever the translations are saved, so that translated fields can be read
+    without joining the translation table. Must come before `TranslatableModel` in the bases.
+    """
+    translations_cache = JSONField(verbose_name=_('translations cache'), null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def build_translations_cache(self):
+        fields = list(self._parler_meta._fields_to_model)
+        cache = {field: {} for field in fields}
+        # Not through `self.translations`, which may hold stale prefetched rows
+        for translation in self._parler_meta.root_model.objects.filter(master_id=self.pk):
+            for field in fields:
+                cache[field][translation.language_code] = getattr(translation, field)
+        return cache
+
+    def update_translations_cache(self):
+        self.translations_cache = self.build_translations_cache()
+        type(self)._base_manager.filter(pk=self.pk).update(translations_cache=self.translations_cache)
+
+    def save_translations(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save_translations(*args, **kwargs)
+            self.update_translations_cache()
+
+    def delete_translation(self, language_code, related_name=None):
+        with transaction.atomic():
+            num_deleted = super().delete_translation(language_code, related_name)
+            self.update_translations_cache()
+        return num_deleted
+
+    def get_cached_translation(self, field, language=None):
+        """
+        Get the value of a translated field in the active (or given) language or its fallbacks.
+        """
+        if self.translations_cache is None:
+            return getattr(self, field)
+        values = self.translations_cache.get(field, {})
+        for language_code in parler_settings.PARLER_LANGUAGES.get_active_choices(language or get_language()):
+            if values.get(language_code):
+                return values[language_code]
+        return ''
+
+
 class Commentable(models.Model):
     """
     Mixin for models which can be commented.
@@ -8,6 +8,7 @@ from langdetect import detect_langs
 from langdetect.lang_detect_exception import LangDetectException
 
 from .base import BaseModel
+from .events import record_comment_event
 
 
 class BaseComment(BaseModel):
@@ -103,10 +104,11 @@ class BaseComment(BaseModel):
         return False
 
 
-def comment_recache(sender, instance, using, created, **kwargs):
+def comment_recache(sender, instance, using, created, update_fields=None, **kwargs):
     """
     :type instance: BaseComment
     """
+    record_comment_event(instance, created, update_fields)
     if created or instance.deleted:
         instance.recache_parent_n_comments()
     else:
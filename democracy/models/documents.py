@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.timezone import now
+from django.utils.translation import ugettext_lazy as _
+
+from .base import is_counter_update
+from .hearing import Hearing
+from .label import Label
+from .organization import ContactPerson, Organization
+from .section import Section, SectionImage, SectionType
+
+
+class HearingDocumentQuerySet(models.QuerySet):
+    def fresh(self):
+        return self.filter(rendered_generation=F('generation')).filter(
+            Q(valid_until__isnull=True) | Q(valid_until__gt=now())
+        )
+
+    def stale(self):
+        return self.filter(
+            Q(rendered_generation__lt=F('generation')) | Q(valid_until__lte=now())
+        )
+
+    def invalidate(self):
+        return self.update(generation=F('generation') + 1)
+
+    def expire(self, seconds):
+        """
+        Make the documents stale in `seconds` at the latest.
+        """
+        valid_until = now() + timedelta(seconds=seconds)
+        return self.filter(Q(valid_until__isnull=True) | Q(valid_until__gt=valid_until)).update(
+            valid_until=valid_until
+        )
+
+
+class HearingDocument(models.Model):
+    """
+    A pre-rendered hearing detail response.
+
+    Every change to a row the document is built from bumps `generation`; the document may only be
+    served while `rendered_generation` matches it. Stale documents form the render queue of
+    `democracy_render_hearing_documents`. Comment counts change with every comment, so they only
+    make the document expire within `DEMOCRACY_HEARING_DOCUMENT_COUNTER_DELAY` seconds.
+    """
+    ANONYMOUS = 'anonymous'
+    VISIBILITY_CHOICES = (
+        (ANONYMOUS, _('anonymous users')),
+    )
+
+    hearing = models.ForeignKey(Hearing, related_name='documents', verbose_name=_('hearing'))
+    visibility = models.CharField(
+        verbose_name=_('visibility'), max_length=16, choices=VISIBILITY_CHOICES, default=ANONYMOUS
+    )
+    base_url = models.CharField(verbose_name=_('base URL'), max_length=255)
+    content = models.TextField(verbose_name=_('content'), blank=True)
+    # Precompressed variants of `content`, filled when the document is rendered
+    content_gzip = models.BinaryField(verbose_name=_('gzip compressed content'), null=True)
+    content_br = models.BinaryField(verbose_name=_('brotli compressed content'), null=True)
+    generation = models.PositiveIntegerField(verbose_name=_('generation'), default=1)
+    rendered_generation = models.PositiveIntegerField(verbose_name=_('rendered generation'), default=0)
+    rendered_at = models.DateTimeField(verbose_name=_('time of rendering'), null=True, blank=True)
+    valid_until = models.DateTimeField(verbose_name=_('valid until'), null=True, blank=True)
+
+    objects = HearingDocumentQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('hearing document')
+        verbose_name_plural = _('hearing documents')
+        unique_together = (('hearing', 'visibility', 'base_url'),)
+
+
+# Lookups from a hearing document to the rows it is rendered from
+DOCUMENT_SOURCES = {
+    Hearing: 'hearing',
+    Section: 'hearing__sections',
+    SectionImage: 'hearing__sections__images',
+    Label: 'hearing__labels',
+    ContactPerson: 'hearing__contact_persons',
+    Organization: 'hearing__organization',
+}
+
+
+TRANSLATION_SOURCES = {
+    source._parler_meta.root_model: lookup
+    for (source, lookup) in DOCUMENT_SOURCES.items() if hasattr(source, '_parler_meta')
+}
+
+
+def get_counter_delay():
+    return getattr(settings, 'DEMOCRACY_HEARING_DOCUMENT_COUNTER_DELAY', 60)
+
+
+def get_document_managers(instance):
+    """
+    Get the managers of the databases whose documents may be rendered from `instance`.
+    """
+    from democracy.tenants import get_databases, is_tenant_model
+
+    if is_tenant_model(type(instance)) and instance._state.db:
+        return [HearingDocument.objects.db_manager(instance._state.db)]
+    # The shared tables are a part of the documents of every database
+    return [HearingDocument.objects.db_manager(alias) for alias in get_databases()]
+
+
+def invalidate_documents(sender, instance, update_fields=None, **kwargs):
+    lookup = DOCUMENT_SOURCES.get(sender)
+    if lookup:
+        for manager in get_document_managers(instance):
+            documents = manager.filter(**{lookup: instance.pk})
+            if is_counter_update(update_fields):
+                documents.expire(get_counter_delay())
+            else:
+                documents.invalidate()
+
+
+def invalidate_documents_on_translation(sender, instance, **kwargs):
+    for manager in get_document_managers(instance):
+        manager.filter(**{TRANSLATION_SOURCES[sender]: instance.master_id}).invalidate()
+
+
+def invalidate_documents_on_m2m(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, Hearing) or pk_set is None:
+        invalidate_documents(type(instance), instance)
+    else:
+        for manager in get_document_managers(instance):
+            manager.filter(hearing__in=pk_set).invalidate()
+
+
+def invalidate_all_documents(sender, **kwargs):
+    from democracy.tenants import get_databases
+
+    for alias in get_databases():
+        HearingDocument.objects.using(alias).invalidate()
+
+
+for source in DOCUMENT_SOURCES:
+    post_save.connect(invalidate_documents, sender=source)
+for translation_model in TRANSLATION_SOURCES:
+    post_save.connect(invalidate_documents_on_translation, sender=translation_model)
+    post_delete.connect(invalidate_documents_on_translation, sender=translation_model)
+for through in (Hearing.labels.through, Hearing.contact_persons.through):
+    m2m_changed.connect(invalidate_documents_on_m2m, sender=through)
+post_save.connect(invalidate_all_documents, sender=SectionType)
@@ -0,0 +1,88 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+VOTE_FIELDS = frozenset(("n_votes", "n_unregistered_votes"))
+
+
+class CommentEvent(models.Model):
+    """
+    Append-only log of comment changes, read by the hearing event streams.
+    """
+    CREATED = "comment_created"
+    EDITED = "comment_edited"
+    DELETED = "comment_deleted"
+    VOTES = "comment_votes"
+    TYPE_CHOICES = (
+        (CREATED, _("comment created")),
+        (EDITED, _("comment edited")),
+        (DELETED, _("comment deleted")),
+        (VOTES, _("vote count changed")),
+    )
+
+    hearing = models.ForeignKey("Hearing", related_name="comment_events", verbose_name=_("hearing"))
+    type = models.CharField(verbose_name=_("type"), max_length=32, choices=TYPE_CHOICES)
+    comment_id = models.IntegerField(verbose_name=_("comment"))
+    published = models.BooleanField(verbose_name=_("public"), default=True)
+    payload = models.TextField(verbose_name=_("payload"))
+    created_at = models.DateTimeField(verbose_name=_("time of creation"), default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("comment event")
+        verbose_name_plural = _("comment events")
+        ordering = ("id",)
+        index_together = [("hearing", "id")]
+
+
+def get_comment_payload(comment, event_type=None):
+    if event_type == CommentEvent.DELETED:
+        # The content of deleted comments is not shown anymore, so it must not be streamed either
+        return {"id": comment.pk, "section": comment.parent_id, "deleted": True}
+    return {
+        "id": comment.pk,
+        "section": comment.parent_id,
+        "content": getattr(comment, "content", ""),
+        "author_name": comment.author_name,
+        "n_votes": comment.n_votes,
+        "created_at": comment.created_at,
+        "is_registered": comment.created_by_id is not None,
+        "label": comment.label_id,
+        "language_code": comment.language_code,
+    }
+
+
+def get_comment_event_type(comment, created, update_fields):
+    if created:
+        return CommentEvent.CREATED
+    if comment.deleted:
+        # Saves of already deleted comments (e.g. counter updates) are not news
+        return CommentEvent.DELETED if update_fields is None or "deleted" in update_fields else None
+    if update_fields is not None and set(update_fields) <= VOTE_FIELDS:
+        return CommentEvent.VOTES
+    return CommentEvent.EDITED
+
+
+def record_comment_event(comment, created, update_fields):
+    """
+    Append the change a comment save represents to the change log and hand it to the stream broker.
+
+    :type comment: democracy.models.comment.BaseComment
+    """
+    event_type = get_comment_event_type(comment, created, update_fields)
+    parent = comment.parent
+    hearing_id = getattr(parent, "hearing_id", None)
+    if not event_type or not hearing_id:
+        return None
+    event = CommentEvent.objects.create(
+        hearing_id=hearing_id,
+        type=event_type,
+        comment_id=comment.pk,
+        published=comment.published,
+        payload=json.dumps(get_comment_payload(comment, event_type), cls=DjangoJSONEncoder),
+    )
+    from democracy.streaming import get_broker
+    get_broker().publish(event)
+    return event
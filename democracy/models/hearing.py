@@ -17,7 +17,7 @@ from parler.managers import TranslatableQuerySet
 from democracy.enums import InitialSectionType
 from democracy.utils.hmac_hash import get_hmac_b64_encoded
 
-from .base import BaseModelManager, StringIdBaseModel
+from .base import BaseModelManager, StringIdBaseModel, TranslationsCacheMixin
 from .organization import ContactPerson, Organization
 
 
@@ -29,7 +29,7 @@ class HearingQueryset(TranslatableQuerySet):
         return self.filter(models.Q(pk=id_or_slug) | models.Q(slug=id_or_slug))
 
 
-class Hearing(StringIdBaseModel, TranslatableModel):
+class Hearing(TranslationsCacheMixin, StringIdBaseModel, TranslatableModel):
     open_at = models.DateTimeField(verbose_name=_('opening time'), default=timezone.now)
     close_at = models.DateTimeField(verbose_name=_('closing time'), default=timezone.now)
     force_closed = models.BooleanField(verbose_name=_('force hearing closed'), default=False)
@@ -62,6 +62,7 @@ class Hearing(StringIdBaseModel, TranslatableModel):
     class Meta:
         verbose_name = _('hearing')
         verbose_name_plural = _('hearings')
+        index_together = [('modified_at', 'id')]
 
     def __str__(self):
         return (self.title or self.id)
@@ -109,8 +110,9 @@ class Hearing(StringIdBaseModel, TranslatableModel):
             self.save(update_fields=("n_comments",))
 
     def get_main_section(self):
+        from .section import get_section_type_id
         try:
-            return self.sections.get(type__identifier=InitialSectionType.MAIN)
+            return self.sections.get(type_id=get_section_type_id(InitialSectionType.MAIN))
         except ObjectDoesNotExist:
             return None
 
@@ -119,9 +121,11 @@ class Hearing(StringIdBaseModel, TranslatableModel):
             return True
         if not user.is_authenticated():
             return False
-        if user.is_superuser:
+        from democracy.visibility import get_visibility_context
+
+        context = get_visibility_context(user)
+        if context.is_superuser:
             return True
-        user_organization = user.get_default_organization()
-        if not (user_organization and self.organization):
+        if not (context.organization_id and self.organization_id):
             return False
-        return user_organization == self.organization
+        return context.organization_id == self.organization_id
@@ -2,10 +2,10 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _
 from parler.models import TranslatedFields, TranslatableModel
 
-from .base import BaseModel
+from .base import BaseModel, TranslationsCacheMixin
 
 
-class Label(BaseModel, TranslatableModel):
+class Label(TranslationsCacheMixin, BaseModel, TranslatableModel):
     translations = TranslatedFields(
         label=models.CharField(verbose_name=_('label'), default='', max_length=200),
     )
@@ -1,4 +1,4 @@
-from .base import StringIdBaseModel
+from .base import StringIdBaseModel, TranslationsCacheMixin
 from django.db import models
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
@@ -19,7 +19,7 @@ class Organization(StringIdBaseModel):
         return self.name
 
 
-class ContactPerson(StringIdBaseModel, TranslatableModel):
+class ContactPerson(TranslationsCacheMixin, StringIdBaseModel, TranslatableModel):
     organization = models.ForeignKey(Organization, verbose_name=_('organization'), related_name='contact_persons',
                                      blank=True, null=True)
     translations = TranslatedFields(
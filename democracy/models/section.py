@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.utils.translation import ugettext_lazy as _
 from reversion import revisions
 from autoslug import AutoSlugField
@@ -10,7 +11,7 @@ from democracy.models.images import BaseImage
 from democracy.plugins import get_implementation
 
 from democracy.enums import InitialSectionType
-from .base import ORDERING_HELP, Commentable, StringIdBaseModel, BaseModel, BaseModelManager
+from .base import ORDERING_HELP, Commentable, StringIdBaseModel, BaseModel, BaseModelManager, TranslationsCacheMixin
 from .hearing import Hearing
 
 CLOSURE_INFO_ORDERING = -10000
@@ -42,7 +43,42 @@ class SectionType(BaseModel):
         return super().save(*args, **kwargs)
 
 
-class Section(Commentable, StringIdBaseModel, TranslatableModel):
+class SectionTypeRegistry(object):
+    """
+    An in-process mapping of the initial section type identifiers to their primary keys.
+
+    Lets the hot queries filter sections on `type_id` instead of joining `SectionType`.
+    """
+
+    def __init__(self):
+        self.ids = None
+
+    def get_id(self, identifier):
+        ids = self.ids
+        if ids is None or identifier not in ids:
+            ids = self.ids = dict(SectionType.objects.initial().values_list('identifier', 'pk'))
+        if identifier not in ids:
+            raise SectionType.DoesNotExist("Section type %r does not exist." % identifier)
+        return ids[identifier]
+
+    def clear(self, **kwargs):
+        self.ids = None
+
+
+section_types = SectionTypeRegistry()
+
+
+def get_section_type_id(identifier):
+    return section_types.get_id(identifier)
+
+
+# Migrations and flushes may create the initial types anew, with new primary keys
+post_save.connect(section_types.clear, sender=SectionType, dispatch_uid='section_types_clear_on_save')
+post_delete.connect(section_types.clear, sender=SectionType, dispatch_uid='section_types_clear_on_delete')
+post_migrate.connect(section_types.clear, dispatch_uid='section_types_clear_on_migrate')
+
+
+class Section(Commentable, TranslationsCacheMixin, StringIdBaseModel, TranslatableModel):
     hearing = models.ForeignKey(Hearing, related_name='sections', on_delete=models.PROTECT)
     ordering = models.IntegerField(verbose_name=_('ordering'), default=1, db_index=True, help_text=ORDERING_HELP)
     type = models.ForeignKey(SectionType, related_name='sections', on_delete=models.PROTECT)
@@ -61,6 +97,7 @@ class Section(Commentable, StringIdBaseModel, TranslatableModel):
         ordering = ["ordering"]
         verbose_name = _('section')
         verbose_name_plural = _('sections')
+        index_together = [('modified_at', 'id')]
 
     def __str__(self):
         return "%s: %s" % (self.hearing, self.title)
@@ -68,7 +105,7 @@ class Section(Commentable, StringIdBaseModel, TranslatableModel):
     def save(self, *args, **kwargs):
         if self.hearing_id:
             # Closure info should be the first
-            if self.type == SectionType.objects.get(identifier=InitialSectionType.CLOSURE_INFO):
+            if self.type_id == get_section_type_id(InitialSectionType.CLOSURE_INFO):
                 self.ordering = CLOSURE_INFO_ORDERING
             elif (not self.pk and self.ordering == 1) or self.ordering == CLOSURE_INFO_ORDERING:
                 # This is a new section or changing type from closure info,
@@ -95,7 +132,7 @@ class SectionImageManager(TranslatableManager, BaseModelManager):
         return super(SectionImageManager, self).get_queryset().order_by('pk')
 
 
-class SectionImage(BaseImage, TranslatableModel):
+class SectionImage(TranslationsCacheMixin, BaseImage, TranslatableModel):
     parent_field = "section"
     section = models.ForeignKey(Section, related_name="images")
     translations = TranslatedFields(
@@ -108,6 +145,7 @@ class SectionImage(BaseImage, TranslatableModel):
         verbose_name = _('section image')
         verbose_name_plural = _('section images')
         ordering = ("ordering", "translations__title")
+        index_together = [('modified_at', 'id')]
 
 
 @revisions.register
@@ -123,6 +161,7 @@ class SectionComment(BaseComment):
         verbose_name = _('section comment')
         verbose_name_plural = _('section comments')
         ordering = ('-created_at',)
+        index_together = [('modified_at', 'id')]
 
 
 class CommentImage(BaseImage):
@@ -3,7 +3,7 @@ from copy import deepcopy
 from django.db import transaction
 
 from democracy.enums import InitialSectionType
-from democracy.models import SectionType
+from democracy.models.section import get_section_type_id
 
 
 def _copy_translations(new_obj, old_obj):
@@ -12,6 +12,7 @@ def _copy_translations(new_obj, old_obj):
         translation.pk = None
         translation.master_id = new_obj.pk
         translation.save()
+    new_obj.update_translations_cache()
 
 
 @transaction.atomic
@@ -45,8 +46,8 @@ def copy_hearing(old_hearing, **kwargs):
     _copy_translations(new_hearing, old_hearing)
 
     # create new sections and section images
-    closure_info = SectionType.objects.get(identifier=InitialSectionType.CLOSURE_INFO)
-    for old_section in old_hearing.sections.exclude(type=closure_info):
+    closure_info_id = get_section_type_id(InitialSectionType.CLOSURE_INFO)
+    for old_section in old_hearing.sections.exclude(type_id=closure_info_id):
         old_images = old_section.images.all()
         section = deepcopy(old_section)
         section.pk = None
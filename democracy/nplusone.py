@@ -0,0 +1,248 @@
+"""
+Runtime N+1 query detection.
+
+`NPlusOneDetector` replaces the debug cursor of the database connections of the current thread
+for its lifetime and groups the executed SQL by statement template and call site. A template that
+runs more than `threshold` times with different parameters from the same call site is reported
+as an N+1 pattern, attributed to the serializer field or method that triggered it (for example
+`SectionSerializer.images` or `BaseCommentSerializer.get_can_edit`) along with a fix hint.
+
+It can be used as a context manager, through `NPlusOneMiddleware` (see the `DEMOCRACY_NPLUSONE`
+setting) or with the `n_plus_one_detector` test fixture.
+"""
+import logging
+import os
+import sys
+import warnings
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from rest_framework.fields import Field
+from rest_framework.serializers import Serializer, SerializerMethodField
+
+from democracy.utils.sql import StatsCursorDebugWrapper, normalize_sql
+
+logger = logging.getLogger("democracy.nplusone")
+
+DEFAULT_THRESHOLD = 5
+STACK_DEPTH = 6
+# The project directory, which contains `democracy`. `settings.BASE_DIR` is the `kerrokantasi` directory in it.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class QuerySite(object):
+    """
+    Executions of one SQL template from one call site.
+    """
+
+    def __init__(self, sql, stack, source):
+        self.sql = sql
+        self.stack = stack
+        self.source = source
+        self.count = 0
+        self.params = set()
+
+    @property
+    def hint(self):
+        if self.source is None:
+            if not self.stack:
+                return "Fetch the related objects before the loop with select_related()/prefetch_related()."
+            return "Fetch the related objects before the loop at %s with select_related()/prefetch_related()." % (
+                self.stack[0],
+            )
+        return self.source.hint
+
+    def __str__(self):
+        lines = [
+            "%d queries (%d distinct parameter sets) from %s" % (
+                self.count, len(self.params), self.source.name if self.source else "<no serializer>"
+            ),
+            "  SQL: %s" % self.sql,
+            "  Hint: %s" % self.hint,
+        ]
+        lines.extend("    at %s" % frame for frame in self.stack)
+        return "\n".join(lines)
+
+
+class SerializerSource(object):
+    """
+    The serializer field that was being serialized when a query ran.
+    """
+
+    def __init__(self, serializer, field, parent_sources):
+        self.serializer = serializer
+        self.field = field
+        self.parent_sources = parent_sources
+
+    @property
+    def name(self):
+        if isinstance(self.field, SerializerMethodField):
+            method_name = self.field.method_name
+            owner = next((cls for cls in type(self.serializer).__mro__ if method_name in vars(cls)), None)
+            return "%s.%s" % ((owner or type(self.serializer)).__name__, method_name)
+        return "%s.%s" % (type(self.serializer).__name__, self.field.field_name)
+
+    @property
+    def hint(self):
+        if isinstance(self.field, SerializerMethodField):
+            return (
+                "%s runs queries for every object; annotate the queryset or prefetch what it uses, "
+                "and read the prefetched data in the method." % self.name
+            )
+        model = getattr(getattr(self.serializer, "Meta", None), "model", None)
+        source = self.field.source.split(".")[0] if self.field.source != "*" else None
+        try:
+            model_field = model._meta.get_field(source) if model and source else None
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is None or not model_field.is_relation:
+            return "%s runs queries for every object; precompute it for the whole queryset." % self.name
+        path = "__".join(self.parent_sources + [model_field.name])
+        to_many = model_field.many_to_many or model_field.one_to_many
+        if to_many or self.parent_sources:
+            return "Add .prefetch_related(%r) to the queryset." % path
+        return "Add .select_related(%r) to the queryset." % path
+
+
+def _project_stack(frame):
+    base_dir = PROJECT_DIR
+    this_file = os.path.splitext(os.path.abspath(__file__))[0]
+    stack = []
+    while frame is not None and len(stack) < STACK_DEPTH:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (
+            filename.startswith(base_dir) and
+            os.path.splitext(filename)[0] != this_file and
+            "site-packages" not in filename
+        ):
+            stack.append("%s:%d in %s" % (os.path.relpath(filename, base_dir), frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return tuple(stack)
+
+
+def _serializer_source(frame):
+    """
+    Find the innermost serializer field being serialized in the call stack.
+    """
+    innermost = None
+    sources = []
+    while frame is not None:
+        if frame.f_code.co_name == "to_representation":
+            serializer = frame.f_locals.get("self")
+            field = frame.f_locals.get("field")
+            if isinstance(serializer, Serializer) and isinstance(field, Field):
+                if innermost is None:
+                    innermost = (serializer, field)
+                elif field.source != "*":
+                    sources.append(field.source.replace(".", "__"))
+        frame = frame.f_back
+    if innermost is None:
+        return None
+    return SerializerSource(innermost[0], innermost[1], list(reversed(sources)))
+
+
+class DetectingCursorWrapper(StatsCursorDebugWrapper):
+    def __init__(self, cursor, db, detector):
+        super().__init__(cursor, db)
+        self.detector = detector
+
+    def execute(self, sql, params=None):
+        self.detector.record(sql, params)
+        return super().execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.detector.record(sql, None)
+        return super().executemany(sql, param_list)
+
+
+class NPlusOneDetector(object):
+    """
+    Collect the queries executed on this thread and report N+1 patterns among them.
+
+    :param threshold: number of executions of a template from one call site above which it is reported
+    """
+
+    def __init__(self, threshold=None):
+        if threshold is None:
+            threshold = getattr(settings, "DEMOCRACY_NPLUSONE_THRESHOLD", DEFAULT_THRESHOLD)
+        self.threshold = threshold
+        self.sites = OrderedDict()
+        self._saved = []
+
+    def __enter__(self):
+        for conn in connections.all():
+            self._saved.append((conn, conn.__dict__.get("make_debug_cursor"), conn.force_debug_cursor))
+            conn.make_debug_cursor = lambda cursor, conn=conn: DetectingCursorWrapper(cursor, conn, self)
+            conn.force_debug_cursor = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for conn, make_debug_cursor, force_debug_cursor in reversed(self._saved):
+            if make_debug_cursor is None:
+                del conn.make_debug_cursor
+            else:
+                conn.make_debug_cursor = make_debug_cursor
+            conn.force_debug_cursor = force_debug_cursor
+        self._saved = []
+
+    def record(self, sql, params):
+        frame = sys._getframe(2)
+        stack = _project_stack(frame)
+        template = normalize_sql(sql)
+        key = (template, stack)
+        site = self.sites.get(key)
+        if site is None:
+            site = self.sites[key] = QuerySite(template, stack, _serializer_source(frame))
+        site.count += 1
+        site.params.add(repr(params))
+
+    @property
+    def findings(self):
+        return [
+            site for site in self.sites.values()
+            if site.count > self.threshold and len(site.params) > 1
+        ]
+
+    def report(self):
+        return "\n\n".join(str(site) for site in self.findings)
+
+    def check(self, mode="raise"):
+        """
+        Raise `NPlusOneError` (mode `raise`) or emit `NPlusOneWarning` and log (mode `warn`) on findings.
+        """
+        if not self.findings:
+            return
+        message = "N+1 queries detected:\n\n%s" % self.report()
+        if mode == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+        warnings.warn(message, NPlusOneWarning)
+
+
+class NPlusOneMiddleware(object):
+    """
+    Run every request under `NPlusOneDetector` when `DEMOCRACY_NPLUSONE` is `warn` or `raise`.
+
+    Meant for development and CI; leave the setting empty in production.
+    """
+
+    def process_request(self, request):
+        if getattr(settings, "DEMOCRACY_NPLUSONE", None):
+            request._nplusone_detector = NPlusOneDetector().__enter__()
+
+    def process_response(self, request, response):
+        detector = getattr(request, "_nplusone_detector", None)
+        if detector:
+            detector.__exit__(None, None, None)
+            detector.check(settings.DEMOCRACY_NPLUSONE)
+        return response
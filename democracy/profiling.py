@@ -0,0 +1,206 @@
+"""
+On-demand and sampled profiling of API views.
+
+A superuser may add `?profile=<mode>` or an `X-Democracy-Profile: <mode>` header to a request:
+
+* `1` or `cprofile`: run the view under cProfile and store the profile as a downloadable artifact
+* `inline`: run the view under cProfile and return the statistics as text instead of the response
+* `sample`: run the view under a low-overhead stack sampler and store the collapsed stacks
+
+Queries executed by the view are stored alongside the profile. Additionally, a random
+`DEMOCRACY_PROFILE_SAMPLE_RATE` fraction of all requests is stack-sampled and aggregated per view,
+in the collapsed ("folded") format understood by flame graph tools.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import slugify
+from django.utils.timezone import now
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from democracy.utils.sql import top_repeated_queries
+
+PROFILE_MODES = {
+    "1": "cprofile",
+    "true": "cprofile",
+    "cprofile": "cprofile",
+    "inline": "inline",
+    "sample": "sample",
+}
+MAX_AGGREGATE_STACKS = 5000
+
+_aggregate_lock = threading.Lock()
+AGGREGATE_STACKS = defaultdict(Counter)
+
+
+def get_profile_dir():
+    return getattr(settings, "DEMOCRACY_PROFILE_DIR", os.path.join(settings.BASE_DIR, "var", "profiles"))
+
+
+def get_requested_mode(request):
+    value = request.GET.get("profile") or request.META.get("HTTP_X_DEMOCRACY_PROFILE")
+    return PROFILE_MODES.get(value.lower()) if value else None
+
+
+def is_profiling_allowed(request):
+    """
+    Check that the requester is a superuser, authenticated either by session or by the API authenticators.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated() and user.is_superuser:
+        return True
+    drf_request = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    for authenticator in drf_request.authenticators:
+        try:
+            result = authenticator.authenticate(drf_request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_superuser
+    return False
+
+
+def should_sample():
+    rate = getattr(settings, "DEMOCRACY_PROFILE_SAMPLE_RATE", 0)
+    return bool(rate) and random.random() < rate
+
+
+class StackSampler(object):
+    """
+    Periodically sample the call stack of the current thread from a background thread.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, "DEMOCRACY_PROFILE_SAMPLE_INTERVAL", 0.005)
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = code.co_filename.rsplit("site-packages" + os.sep, 1)[-1]
+                stack.append("%s (%s:%d)" % (code.co_name, filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def runcall(self, func, *args, **kwargs):
+        self._thread.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._stop.set()
+            self._thread.join()
+
+    def folded(self):
+        return "".join("%s %d\n" % (stack, count) for (stack, count) in self.stacks.most_common())
+
+
+def aggregate_stacks(view_name, stacks):
+    with _aggregate_lock:
+        counter = AGGREGATE_STACKS[view_name]
+        for stack, count in stacks.items():
+            if stack not in counter and len(counter) >= MAX_AGGREGATE_STACKS:
+                stack = "[other]"
+            counter[stack] += count
+
+
+def get_aggregate_folded(view_name):
+    with _aggregate_lock:
+        counter = AGGREGATE_STACKS.get(view_name)
+        if counter is None:
+            return None
+        return "".join("%s %d\n" % (stack, count) for (stack, count) in counter.most_common())
+
+
+def format_stats(profiler, limit=60):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def format_queries(queries):
+    return {
+        "count": len(queries),
+        "time": round(sum(float(query["time"]) for query in queries), 6),
+        "repeated": top_repeated_queries(queries, limit=20),
+        "queries": queries,
+    }
+
+
+def store_artifact(view_name, extension, write):
+    """
+    Store a profiling artifact in the profile directory.
+
+    :param write: callable that writes the artifact to the path it is given
+    :return: the artifact's file name
+    """
+    directory = get_profile_dir()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    profile_id = "%s-%s-%s" % (now().strftime("%Y%m%dT%H%M%S"), slugify(view_name), uuid.uuid4().hex[:8])
+    write(os.path.join(directory, profile_id + extension))
+    return profile_id
+
+
+def profile_view(mode, view_name, request, view_func, view_args, view_kwargs):
+    """
+    Run and render a view under the profiler requested by `mode`.
+
+    :return: the view's response, or for `inline` mode the profile report
+    """
+    profiler = StackSampler() if mode in ("sample", "aggregate") else cProfile.Profile()
+
+    def call():
+        response = view_func(request, *view_args, **view_kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            response = response.render()
+        return response
+
+    with CaptureQueriesContext(connection) as context:
+        response = profiler.runcall(call)
+
+    if mode == "aggregate":
+        aggregate_stacks(view_name, profiler.stacks)
+        return response
+    queries = format_queries(context.captured_queries)
+    if mode == "inline":
+        return HttpResponse(
+            "%s\n\n%d queries in %.3f s\n\n%s" % (
+                format_stats(profiler), queries["count"], queries["time"],
+                json.dumps(queries["repeated"], indent=2),
+            ),
+            content_type="text/plain; charset=utf-8",
+        )
+
+    if mode == "sample":
+        def write(path):
+            with open(path, "w") as outf:
+                outf.write(profiler.folded())
+        profile_id = store_artifact(view_name, ".folded", write)
+    else:
+        profile_id = store_artifact(view_name, ".prof", profiler.dump_stats)
+    with open(os.path.join(get_profile_dir(), profile_id + ".queries.json"), "w") as outf:
+        json.dump(queries, outf, indent=2)
+    response["X-Profile-Id"] = profile_id
+    return response
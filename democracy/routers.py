@@ -0,0 +1,171 @@
+"""
+Read replica routing.
+
+With `DEMOCRACY_REPLICA_DATABASES` set to a list of database aliases, reads of safe-method requests
+(and of jobs run within `reading_from_replicas()`) go to one of the replicas; everything else reads
+and writes the `default` database.
+
+* After a successful write, the writer's requests stay on the primary for
+  `DEMOCRACY_REPLICA_STICKY_SECONDS`: by a cookie, and for authenticated users (e.g. by JWT) also by
+  a cache entry keyed by the user, so that API clients without cookies read their own writes too.
+* Replicas are checked at most every `DEMOCRACY_REPLICA_CHECK_INTERVAL` seconds. Unreachable ones and
+  those lagging more than `DEMOCRACY_REPLICA_MAX_LAG` seconds behind are skipped until the next check.
+  With no usable replica, reads go to the primary.
+
+To try it out locally, add a second alias for the same SQLite file (or PostgreSQL database) to
+`DATABASES` and list it in `DEMOCRACY_REPLICA_DATABASES`.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'democracy_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+_health = {}
+_health_lock = threading.Lock()
+
+
+def get_replicas():
+    return list(getattr(settings, 'DEMOCRACY_REPLICA_DATABASES', ()))
+
+
+def get_replication_lag(connection):
+    """
+    Get the replication lag of a database connection in seconds.
+    """
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        # NULL when the database is not a replica
+        cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def check_replica(alias):
+    try:
+        connection = connections[alias]
+        connection.ensure_connection()
+        lag = get_replication_lag(connection)
+    except Exception:
+        logger.warning('Replica database %s is not available', alias, exc_info=True)
+        return False
+    if lag > getattr(settings, 'DEMOCRACY_REPLICA_MAX_LAG', 5):
+        logger.warning('Replica database %s lags %.1f seconds behind', alias, lag)
+        return False
+    return True
+
+
+def is_usable(alias):
+    interval = getattr(settings, 'DEMOCRACY_REPLICA_CHECK_INTERVAL', 10)
+    with _health_lock:
+        checked_at, usable = _health.get(alias, (None, False))
+    if checked_at is None or time.time() - checked_at >= interval:
+        usable = check_replica(alias)
+        with _health_lock:
+            _health[alias] = (time.time(), usable)
+    return usable
+
+
+def reset_health():
+    with _health_lock:
+        _health.clear()
+
+
+def get_read_alias():
+    """
+    Get the replica the current request or job reads from, or None to read from the primary.
+
+    A replica is chosen once per request so that all of its reads see the same state.
+    """
+    if not getattr(_state, 'use_replicas', False):
+        return None
+    if not hasattr(_state, 'alias'):
+        usable = [alias for alias in get_replicas() if is_usable(alias)]
+        _state.alias = random.choice(usable) if usable else None
+    return _state.alias
+
+
+def set_use_replicas(use_replicas):
+    _state.use_replicas = use_replicas
+    if hasattr(_state, 'alias'):
+        del _state.alias
+
+
+@contextmanager
+def reading_from_replicas():
+    """
+    Read from the replicas within the block, e.g. in reporting and export jobs.
+    """
+    previous = getattr(_state, 'use_replicas', False)
+    set_use_replicas(True)
+    try:
+        yield
+    finally:
+        set_use_replicas(previous)
+
+
+class ReplicaRouter(object):
+    def db_for_read(self, model, **hints):
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas have the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+def get_sticky_cache_key(user_id):
+    return 'democracy:primary:%s' % user_id
+
+
+def get_authenticated_user(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated() else None
+
+
+def is_sticky(request):
+    if request.COOKIES.get(STICKY_COOKIE):
+        return True
+    user = get_authenticated_user(request)
+    return bool(user and cache.get(get_sticky_cache_key(user.pk)))
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Let safe-method requests read from the replicas, unless the requester has just written something.
+
+    Should come after the authentication middleware.
+    """
+
+    def process_request(self, request):
+        if not get_replicas():
+            return
+        set_use_replicas(request.method in SAFE_METHODS and not is_sticky(request))
+
+    def process_response(self, request, response):
+        set_use_replicas(False)
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not get_replicas():
+            return response
+        sticky_seconds = getattr(settings, 'DEMOCRACY_REPLICA_STICKY_SECONDS', 10)
+        response.set_cookie(STICKY_COOKIE, '1', max_age=sticky_seconds, httponly=True)
+        user = get_authenticated_user(request)
+        if user:
+            cache.set(get_sticky_cache_key(user.pk), True, sticky_seconds)
+        return response
@@ -0,0 +1,321 @@
+"""
+Static snapshots of closed hearings.
+
+A snapshot is a directory `MEDIA_ROOT/snapshots/<hearing id>/` with the anonymous API responses of a
+closed hearing, each with brotli and gzip precompressed variants next to it:
+
+* `hearing.json`: the hearing detail
+* `sections.json`: the hearing's section list
+* `sections/<section id>/comments.json`: the comment list of a section
+* `sections/<section id>/comments/<offset>.json`: the same in pages of `SNAPSHOT_PAGE_SIZE`
+* `report.xlsx`: the hearing report
+
+Snapshots are published by `democracy_publish_snapshots`, which should run periodically. Anonymous
+requests for these resources are redirected to the files, which the web server serves without touching
+the application. Any change to a hearing with a snapshot marks the snapshot stale: requests are served
+live again until the command has republished it.
+
+Everything is disabled unless `DEMOCRACY_SNAPSHOT_BASE_URL`, the public base URL of the API used for
+links in the snapshots, is set.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpResponseRedirect
+from django.utils.timezone import now
+
+from democracy.models import Hearing, Section, SectionComment, SectionImage
+from democracy.models.documents import DOCUMENT_SOURCES, TRANSLATION_SOURCES
+from democracy.utils.compression import ENCODING_SUFFIXES, compress_variants
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_PAGE_SIZE = 50
+COMPRESSED_SUFFIXES = ('.json',)
+SAFE_KEY_RE = re.compile(r'^[\w-]+$')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def is_enabled():
+    return bool(getattr(settings, 'DEMOCRACY_SNAPSHOT_BASE_URL', None))
+
+
+def get_snapshot_root():
+    return os.path.join(settings.MEDIA_ROOT, SNAPSHOT_DIR)
+
+
+def get_slug_path(slug):
+    return os.path.join(get_snapshot_root(), 'slugs', slug)
+
+
+def get_stale_path(hearing_id):
+    return os.path.join(get_snapshot_root(), 'stale', hearing_id)
+
+
+def has_snapshot(hearing_id):
+    return os.path.isdir(os.path.join(get_snapshot_root(), hearing_id))
+
+
+def is_stale(hearing_id):
+    return os.path.exists(get_stale_path(hearing_id))
+
+
+def get_stale_hearing_ids():
+    try:
+        return sorted(os.listdir(os.path.join(get_snapshot_root(), 'stale')))
+    except OSError:
+        return []
+
+
+def mark_stale(hearing_id):
+    """
+    Stop redirecting to the snapshot of a hearing until it has been republished.
+    """
+    if not has_snapshot(hearing_id) or is_stale(hearing_id):
+        return
+    os.makedirs(os.path.dirname(get_stale_path(hearing_id)), exist_ok=True)
+    open(get_stale_path(hearing_id), 'w').close()
+
+
+def resolve_hearing_id(id_or_slug):
+    """
+    Get the id of the hearing with a snapshot by its id or slug, or None if it has no snapshot.
+    """
+    if not SAFE_KEY_RE.match(id_or_slug):
+        return None
+    if has_snapshot(id_or_slug):
+        hearing_id = id_or_slug
+    else:
+        try:
+            with open(get_slug_path(id_or_slug)) as slug_file:
+                hearing_id = slug_file.read().strip()
+        except OSError:
+            return None
+        if not (SAFE_KEY_RE.match(hearing_id) and has_snapshot(hearing_id)):
+            return None
+    return None if is_stale(hearing_id) else hearing_id
+
+
+def get_closed_hearings():
+    return Hearing.objects.public(open_at__lte=now()).filter(Q(force_closed=True) | Q(close_at__lt=now()))
+
+
+def get_comment_page_name(section_id, query_params):
+    """
+    Get the snapshot file name of a section comment list request, or None if there is no such file.
+    """
+    if not SAFE_KEY_RE.match(section_id):
+        return None
+    if not query_params:
+        return 'sections/%s/comments.json' % section_id
+    if set(query_params) - {'limit', 'offset'} or query_params.get('limit') != str(SNAPSHOT_PAGE_SIZE):
+        return None
+    offset = query_params.get('offset', '0')
+    if not offset.isdigit() or int(offset) % SNAPSHOT_PAGE_SIZE:
+        return None
+    return 'sections/%s/comments/%d.json' % (section_id, int(offset))
+
+
+def get_snapshot_redirect(request, id_or_slug, name):
+    """
+    Get a redirect to a snapshot file for an anonymous request, or None if it should be served live.
+    """
+    if not (is_enabled() and name and request.method == 'GET' and not request.user.is_authenticated()):
+        return None
+    if name.endswith('.json') and request.accepted_renderer.format != 'json':
+        return None
+    hearing_id = resolve_hearing_id(id_or_slug)
+    if not hearing_id or not os.path.isfile(os.path.join(get_snapshot_root(), hearing_id, name)):
+        return None
+    return HttpResponseRedirect(request.build_absolute_uri(
+        urljoin(settings.MEDIA_URL, '%s/%s/%s' % (SNAPSHOT_DIR, hearing_id, name))
+    ))
+
+
+def render_snapshot(hearing, base_url):
+    """
+    Render the files of a hearing snapshot.
+
+    :return: OrderedDict of file name to content
+    """
+    from democracy.views import HearingViewSet, SectionCommentViewSet, SectionViewSet
+    from democracy.views.utils import render_anonymous_request
+
+    def render(view, path, data=None, **kwargs):
+        response = render_anonymous_request(view, base_url, path, data, **kwargs)
+        if response.status_code != 200:
+            raise SnapshotError('%s returned status %d' % (path, response.status_code))
+        return response.content
+
+    hearing_url = '/v1/hearing/%s/' % hearing.pk
+    files = OrderedDict()
+    files['hearing.json'] = render(
+        HearingViewSet.as_view({'get': 'retrieve'}, use_hearing_documents=False, use_snapshots=False),
+        hearing_url, pk=hearing.pk
+    )
+    files['report.xlsx'] = render(
+        HearingViewSet.as_view({'get': 'report'}, use_snapshots=False), hearing_url + 'report/', pk=hearing.pk
+    )
+    files['sections.json'] = render(
+        SectionViewSet.as_view({'get': 'list'}, use_snapshots=False), hearing_url + 'sections/', hearing_pk=hearing.pk
+    )
+    comments_view = SectionCommentViewSet.as_view({'get': 'list'}, use_snapshots=False)
+    for section in json.loads(files['sections.json'].decode('utf-8')):
+        comments_url = '%ssections/%s/comments/' % (hearing_url, section['id'])
+        kwargs = {'hearing_pk': hearing.pk, 'comment_parent_pk': section['id']}
+        files['sections/%s/comments.json' % section['id']] = render(comments_view, comments_url, **kwargs)
+        offset = 0
+        while True:
+            page = render(comments_view, comments_url, {'limit': SNAPSHOT_PAGE_SIZE, 'offset': offset}, **kwargs)
+            files['sections/%s/comments/%d.json' % (section['id'], offset)] = page
+            if not json.loads(page.decode('utf-8'))['next']:
+                break
+            offset += SNAPSHOT_PAGE_SIZE
+    return files
+
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output:
+        output.write(content)
+    if name.endswith(COMPRESSED_SUFFIXES):
+        for encoding, compressed in compress_variants(content).items():
+            with open(path + ENCODING_SUFFIXES[encoding], 'wb') as output:
+                output.write(compressed)
+
+
+def publish_snapshot(hearing):
+    """
+    Render a snapshot of a closed hearing and replace its current snapshot with it.
+    """
+    # Changes made while rendering mark the new snapshot stale again
+    clear_stale(hearing.pk)
+    files = render_snapshot(hearing, settings.DEMOCRACY_SNAPSHOT_BASE_URL)
+    root = get_snapshot_root()
+    os.makedirs(os.path.join(root, 'slugs'), exist_ok=True)
+    directory = tempfile.mkdtemp(prefix='.%s-' % hearing.pk, dir=root)
+    try:
+        for name, content in files.items():
+            write_file(directory, name, content)
+        os.chmod(directory, 0o755)
+        replace_directory(directory, os.path.join(root, hearing.pk))
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    if hearing.slug and SAFE_KEY_RE.match(hearing.slug):
+        with open(get_slug_path(hearing.slug), 'w') as slug_file:
+            slug_file.write(hearing.pk)
+    remove_slugs(hearing.pk, keep=hearing.slug)
+    return files
+
+
+def replace_directory(new, current):
+    """
+    Swap a directory in with renames, so that readers see either the old or the new files.
+    """
+    old = None
+    if os.path.isdir(current):
+        old = tempfile.mkdtemp(prefix='.old-', dir=os.path.dirname(current))
+        old = os.path.join(old, 'snapshot')
+        os.rename(current, old)
+    os.rename(new, current)
+    if old:
+        shutil.rmtree(os.path.dirname(old), ignore_errors=True)
+
+
+def remove_slugs(hearing_id, keep=None):
+    """
+    Remove the slug files of a hearing, other than its current slug.
+    """
+    slug_dir = os.path.join(get_snapshot_root(), 'slugs')
+    for slug in os.listdir(slug_dir) if os.path.isdir(slug_dir) else ():
+        if slug == keep:
+            continue
+        try:
+            with open(os.path.join(slug_dir, slug)) as slug_file:
+                if slug_file.read().strip() != hearing_id:
+                    continue
+            os.remove(os.path.join(slug_dir, slug))
+        except OSError:
+            continue
+
+
+def clear_stale(hearing_id):
+    try:
+        os.remove(get_stale_path(hearing_id))
+    except OSError:
+        pass
+
+
+def remove_snapshot(hearing_id):
+    shutil.rmtree(os.path.join(get_snapshot_root(), hearing_id), ignore_errors=True)
+    remove_slugs(hearing_id)
+    clear_stale(hearing_id)
+
+
+SNAPSHOT_SOURCES = dict(DOCUMENT_SOURCES)
+SNAPSHOT_SOURCES[SectionComment] = 'hearing__sections__comments'
+
+
+def get_hearing_ids(lookup, value):
+    if lookup == 'hearing':
+        return [value]
+    return Hearing.objects.everything().filter(**{lookup[len('hearing__'):]: value}).values_list('pk', flat=True)
+
+
+def get_instance_hearing_ids(sender, instance):
+    # Sections, images and comments usually have their parents cached, so that no query is needed
+    if sender is Section:
+        return [instance.hearing_id]
+    if sender in (SectionImage, SectionComment):
+        return [instance.section.hearing_id]
+    return get_hearing_ids(SNAPSHOT_SOURCES[sender], instance.pk)
+
+
+def refresh_snapshots(hearing_ids):
+    for hearing_id in hearing_ids:
+        mark_stale(hearing_id)
+
+
+def refresh_snapshots_on_save(sender, instance, **kwargs):
+    if is_enabled():
+        refresh_snapshots(get_instance_hearing_ids(sender, instance))
+
+
+def refresh_snapshots_on_translation(sender, instance, **kwargs):
+    if is_enabled():
+        refresh_snapshots(get_hearing_ids(TRANSLATION_SOURCES[sender], instance.master_id))
+
+
+def refresh_snapshots_on_m2m(sender, instance, action, pk_set, **kwargs):
+    if not (is_enabled() and action in ('post_add', 'post_remove', 'pre_clear')):
+        return
+    if isinstance(instance, Hearing):
+        refresh_snapshots([instance.pk])
+    elif pk_set is None:
+        refresh_snapshots(get_hearing_ids(SNAPSHOT_SOURCES[type(instance)], instance.pk))
+    else:
+        refresh_snapshots(pk_set)
+
+
+for source in SNAPSHOT_SOURCES:
+    post_save.connect(refresh_snapshots_on_save, sender=source)
+for translation_model in TRANSLATION_SOURCES:
+    post_save.connect(refresh_snapshots_on_translation, sender=translation_model)
+    post_delete.connect(refresh_snapshots_on_translation, sender=translation_model)
+for through in (Hearing.labels.through, Hearing.contact_persons.through):
+    m2m_changed.connect(refresh_snapshots_on_m2m, sender=through)
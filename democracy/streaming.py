@@ -0,0 +1,232 @@
+"""
+Live comment and vote streams of hearings as Server-Sent Events.
+
+Every comment save is appended to the `CommentEvent` change log (see `democracy.models.events`).
+A broker delivers new log entries to the subscribed streams:
+
+* `DatabasePollingBroker` (the default) polls the change log from one thread per process,
+  so that events written by other processes are delivered too.
+* `LocalBroker` delivers events published by the current process only, without polling the
+  database. Suitable for development and single-process deployments.
+
+The broker is chosen with the `DEMOCRACY_STREAM_BROKER` setting. Clients resume a dropped stream
+by sending the id of the last event they received as the `Last-Event-ID` header.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BaseRenderer
+
+from democracy.models import CommentEvent
+from democracy.tenants import DEFAULT, find_hearing_database, get_databases
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER = "democracy.streaming.DatabasePollingBroker"
+BACKLOG_LIMIT = 1000
+
+
+class Subscription(object):
+    """
+    Events of one hearing for one stream, in id order and without duplicates.
+    """
+
+    def __init__(self, hearing_id, last_event_id=0):
+        self.hearing_id = hearing_id
+        self.last_event_id = last_event_id or 0
+        self.queue = queue.Queue()
+
+    def put(self, event):
+        self.queue.put(event)
+
+    def get(self, timeout):
+        """
+        Wait up to `timeout` seconds for events and return the undelivered ones.
+        """
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        delivered = []
+        for event in sorted(events, key=lambda event: event.id):
+            if event.id > self.last_event_id:
+                delivered.append(event)
+                self.last_event_id = event.id
+        return delivered
+
+
+class BaseBroker(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, hearing_id, last_event_id=None):
+        """
+        :rtype: Subscription
+        """
+        subscription = Subscription(hearing_id, last_event_id)
+        with self.lock:
+            self.subscriptions[hearing_id].add(subscription)
+        self.subscribed(subscription)
+        if last_event_id is not None:
+            # Replay what was missed; events also delivered live are deduplicated by the subscription
+            events = CommentEvent.objects.using(find_hearing_database(hearing_id) or DEFAULT)
+            backlog = events.filter(hearing_id=hearing_id, id__gt=last_event_id)
+            for event in backlog[:BACKLOG_LIMIT]:
+                subscription.put(event)
+        return subscription
+
+    def subscribed(self, subscription):
+        pass
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.hearing_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.hearing_id]
+
+    def dispatch(self, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(event.hearing_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def publish(self, event):
+        """
+        Called with every event written by this process. Subclasses deliver it to `dispatch`, now or later.
+        """
+        pass
+
+
+class LocalBroker(BaseBroker):
+    """
+    Deliver events published in this process immediately. The change log is only read to resume streams.
+    """
+
+    def publish(self, event):
+        self.dispatch(event)
+
+
+class DatabasePollingBroker(BaseBroker):
+    """
+    Deliver events from the change logs of all databases, polled by a single thread shared by all
+    streams of the process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.last_ids = {}  # Database alias to the id of the last event seen in it
+        self.thread = None
+
+    def subscribed(self, subscription):
+        self.ensure_polling()
+
+    def publish(self, event):
+        # The poller picks the event up from the database
+        pass
+
+    def ensure_polling(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if not self.last_ids:
+                self.last_ids = {
+                    alias: CommentEvent.objects.using(alias).order_by("-id").values_list("id", flat=True).first() or 0
+                    for alias in get_databases()
+                }
+            self.thread = threading.Thread(target=self.run, name="democracy-stream-poller", daemon=True)
+            self.thread.start()
+
+    def poll(self):
+        for alias, last_id in list(self.last_ids.items()):
+            for event in CommentEvent.objects.using(alias).filter(id__gt=last_id)[:BACKLOG_LIMIT]:
+                self.last_ids[alias] = event.id
+                self.dispatch(event)
+
+    def run(self):
+        interval = getattr(settings, "DEMOCRACY_STREAM_POLL_INTERVAL", 1)
+        while True:
+            with self.lock:
+                if not self.subscriptions:
+                    # Whoever subscribes next starts from the events logged from then on
+                    self.thread = None
+                    self.last_ids = {}
+                    break
+            try:
+                self.poll()
+            except Exception:  # pragma: no cover
+                logger.exception("Polling comment events failed")
+            finally:
+                close_old_connections()
+            time.sleep(interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, "DEMOCRACY_STREAM_BROKER", DEFAULT_BROKER))()
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    _broker = None
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses; the stream itself is a StreamingHttpResponse
+        return ("event: error\ndata: %s\n\n" % data).encode(self.charset)
+
+
+def format_event(event):
+    return "id: %d\nevent: %s\ndata: %s\n\n" % (event.id, event.type, event.payload)
+
+
+def event_stream(hearing_id, last_event_id=None, include_unpublished=False):
+    """
+    Yield the Server-Sent Events of a hearing until `DEMOCRACY_STREAM_TIMEOUT` seconds have passed.
+    """
+    heartbeat = getattr(settings, "DEMOCRACY_STREAM_HEARTBEAT", 15)
+    timeout = getattr(settings, "DEMOCRACY_STREAM_TIMEOUT", 300)
+    broker = get_broker()
+    subscription = broker.subscribe(hearing_id, last_event_id)
+    deadline = time.monotonic() + timeout
+    try:
+        yield "retry: %d\n\n" % (getattr(settings, "DEMOCRACY_STREAM_RETRY", 3) * 1000)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            events = subscription.get(timeout=min(heartbeat, remaining))
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            for event in events:
+                if event.published or include_unpublished:
+                    yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
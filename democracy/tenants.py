@@ -0,0 +1,160 @@
+"""
+Per-organization database routing.
+
+`DEMOCRACY_TENANT_DATABASES` maps organization ids to database aliases. The hearings of those
+organizations are stored in the organization's database, together with everything that belongs to
+them (sections, images, comments, votes, documents, translations). The hearings of all other
+organizations stay in the default database. Big tenants can then be scaled and vacuumed on their own.
+
+The shared tables (users, organizations, labels, contact persons, section types) are only written to
+the default database. Queries of hearing data join them, so they must be replicated to the tenant
+databases, e.g. by PostgreSQL logical replication.
+
+A query of hearing data goes to the database of the instance it is made through (e.g.
+`hearing.sections.all()`, `comment.save()`). If there is no such instance, it goes to the tenant
+activated for the current request. That is the database of the hearing in the URL, or, for a new
+hearing, the database of its organization. Otherwise it goes to the default database. List and detail
+endpoints that span all hearings fan out to every database, see `democracy.views.tenants`.
+The management commands and the comment stream poller also go through every database.
+Comments and images have integer ids that every database allocates on its own, so with several
+databases their detail endpoints are only served at the routes of their hearing.
+
+Hearings are not moved between databases when their organization or this setting changes.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import Q
+
+from democracy.models import CommentEvent, Hearing, HearingDocument, Section, SectionComment, SectionImage
+from democracy.models.section import CommentImage
+
+DEFAULT = 'default'
+# The models stored in the tenant databases, in addition to their translations and many-to-many tables
+TENANT_MODELS = (Hearing, Section, SectionImage, SectionComment, CommentImage, HearingDocument, CommentEvent)
+HEARING_DATABASE_CACHE_TIMEOUT = 60 * 60
+
+_state = threading.local()
+_tenant_models = set()
+
+
+def get_tenant_databases():
+    return getattr(settings, 'DEMOCRACY_TENANT_DATABASES', {})
+
+
+def get_databases():
+    """
+    Get the aliases of all databases with hearing data, the default database first.
+    """
+    return [DEFAULT] + sorted(set(get_tenant_databases().values()) - {DEFAULT})
+
+
+def get_organization_database(organization_id):
+    return get_tenant_databases().get(organization_id, DEFAULT)
+
+
+def is_tenant_model(model):
+    if not _tenant_models:
+        models = set(TENANT_MODELS)
+        for tenant_model in TENANT_MODELS:
+            if hasattr(tenant_model, '_parler_meta'):
+                models.add(tenant_model._parler_meta.root_model)
+            models.update(field.remote_field.through for field in tenant_model._meta.many_to_many)
+        _tenant_models.update(models)
+    return model in _tenant_models
+
+
+def get_active_tenant():
+    return getattr(_state, 'alias', None)
+
+
+def activate_tenant(alias):
+    _state.alias = alias
+
+
+def deactivate_tenant(**kwargs):
+    _state.alias = None
+
+
+@contextmanager
+def using_tenant(alias):
+    previous = get_active_tenant()
+    activate_tenant(alias)
+    try:
+        yield
+    finally:
+        activate_tenant(previous)
+
+
+def get_instance_database(instance):
+    if isinstance(instance, Hearing) and instance._state.adding:
+        return get_organization_database(instance.organization_id)
+    return instance._state.db or get_active_tenant()  # Where it was loaded from or saved to
+
+
+def find_hearing_database(id_or_slug):
+    """
+    Get the alias of the database with the hearing with the given id or slug, or None if there is none.
+    """
+    cache_key = 'democracy:tenant:hearing:%s' % id_or_slug
+    alias = cache.get(cache_key)
+    if alias is not None:
+        return alias
+    for alias in get_databases():
+        hearings = Hearing.objects.everything().using(alias)
+        if hearings.filter(Q(pk=id_or_slug) | Q(slug=id_or_slug)).exists():
+            cache.set(cache_key, alias, HEARING_DATABASE_CACHE_TIMEOUT)
+            return alias
+    return None
+
+
+def find_section_database(section_id):
+    """
+    Get the alias of the database with the section with the given id, or None if there is none.
+    """
+    cache_key = 'democracy:tenant:section:%s' % section_id
+    alias = cache.get(cache_key)
+    if alias is not None:
+        return alias
+    for alias in get_databases():
+        if Section.objects.everything().using(alias).filter(pk=section_id).exists():
+            cache.set(cache_key, alias, HEARING_DATABASE_CACHE_TIMEOUT)
+            return alias
+    return None
+
+
+class TenantRouter(object):
+    """
+    Should come before the other routers, which then handle the shared tables.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not get_tenant_databases():
+            return None
+        instance = hints.get('instance')
+        if instance is not None and is_tenant_model(type(instance)):
+            # Also shared tables, which are joined to the tenant's hearing data in its database
+            return get_instance_database(instance)
+        if is_tenant_model(model):
+            return get_active_tenant()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints) if is_tenant_model(model) else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True if get_tenant_databases() else None
+
+
+def tenant_atomic():
+    """
+    A transaction in the database the current request writes hearing data to.
+    """
+    return transaction.atomic(using=get_active_tenant() or DEFAULT)
+
+
+request_finished.connect(deactivate_tenant)
@@ -8,6 +8,7 @@ from rest_framework.test import APIClient
 from democracy.enums import Commenting, InitialSectionType
 from democracy.factories.hearing import HearingFactory, LabelFactory
 from democracy.models import ContactPerson, Hearing, Label, Section, SectionType, Organization
+from democracy.nplusone import NPlusOneDetector
 from democracy.tests.utils import assert_ascending_sequence, create_default_images
 
 
@@ -176,3 +177,13 @@ def admin_api_client(admin_user):
 @pytest.fixture()
 def api_client():
     return APIClient()
+
+
+@pytest.fixture()
+def n_plus_one_detector():
+    """
+    Fail the test if it executes N+1 query patterns.
+    """
+    with NPlusOneDetector() as detector:
+        yield detector
+    detector.check()
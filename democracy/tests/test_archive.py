@@ -0,0 +1,68 @@
+import datetime
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.utils.timezone import now
+
+from democracy.archive import ArchivedRow, get_archive_model
+from democracy.models import Section, SectionComment
+from democracy.models.section import CommentImage
+
+
+def soft_delete(queryset, days_ago):
+    queryset.update(deleted=True, modified_at=now() - datetime.timedelta(days=days_ago))
+
+
+@pytest.mark.django_db
+def test_archive_deleted(default_hearing, john_doe):
+    old_section, recent_section, live_section = default_hearing.sections.order_by('ordering')
+    old_comment = old_section.comments.first()
+    old_comment.voters.add(john_doe)
+    soft_delete(SectionComment.objects.filter(pk=old_comment.pk), days_ago=100)
+    soft_delete(recent_section.comments.all(), days_ago=10)
+    # The section still has comments that are not deleted, so it must stay
+    soft_delete(Section.objects.filter(pk=old_section.pk), days_ago=100)
+
+    call_command('democracy_archive_deleted', days=90, batch_size=1)
+
+    assert not SectionComment.objects.everything(pk=old_comment.pk).exists()
+    assert not SectionComment.voters.through.objects.filter(sectioncomment_id=old_comment.pk).exists()
+    archived = SectionComment.objects.deleted(archived=True).get(pk=old_comment.pk)
+    assert archived.section_id == old_section.pk
+    assert archived.deleted
+    assert SectionComment.objects.archived().count() == 1
+    archived_votes = get_archive_model(SectionComment.voters.through).objects.filter(sectioncomment_id=old_comment.pk)
+    assert list(archived_votes.values_list('user_id', flat=True)) == [john_doe.pk]
+
+    rows = list(SectionComment.objects.everything(section_id=old_section.pk, archived=True))
+    assert len(rows) == SectionComment.objects.everything(section=old_section).count() + 1
+    assert [row.pk for row in rows if isinstance(row, ArchivedRow)] == [old_comment.pk]
+
+    assert SectionComment.objects.deleted(section=recent_section).count() == 3
+    assert live_section.comments.count() == 3
+    assert Section.objects.everything(pk=old_section.pk).exists()
+
+
+@pytest.mark.django_db
+def test_comment_images_are_archived_with_their_comment(default_hearing):
+    comment = default_hearing.get_main_section().comments.first()
+    comment_image = CommentImage.objects.create(comment=comment, image='test.jpg', width=10, height=20)
+    soft_delete(SectionComment.objects.filter(pk=comment.pk), days_ago=100)
+
+    call_command('democracy_archive_deleted', days=90)
+
+    assert not SectionComment.objects.everything(pk=comment.pk).exists()
+    assert not CommentImage.objects.everything(pk=comment_image.pk).exists()
+    assert CommentImage.objects.archived().get(pk=comment_image.pk).comment_id == comment.pk
+
+
+@pytest.mark.django_db
+def test_archiving_requires_migrated_archive_tables(default_hearing):
+    with connection.schema_editor() as schema_editor:
+        schema_editor.remove_field(
+            get_archive_model(CommentImage), get_archive_model(CommentImage)._meta.get_field('caption')
+        )
+    with pytest.raises(ImproperlyConfigured):
+        call_command('democracy_archive_deleted', days=90)
@@ -0,0 +1,81 @@
+import time
+
+import jwt
+import pytest
+from django.test.client import RequestFactory
+from helusers.jwt import JWTAuthentication
+
+from democracy.authentication import JWT_CACHE_REQUESTS, CachedJWTAuthentication, bump_user_version, token_cache
+
+
+@pytest.fixture
+def verifications(monkeypatch, john_doe):
+    token_cache.clear()
+    calls = []
+
+    def authenticate(self, request):
+        calls.append(request)
+        return (john_doe, self.get_jwt_value(request))
+
+    monkeypatch.setattr(JWTAuthentication, 'authenticate', authenticate)
+    yield calls
+    token_cache.clear()
+
+
+def make_token(expires_in):
+    token = jwt.encode({'sub': 'john', 'exp': int(time.time()) + expires_in}, 'secret')
+    return token.decode('ascii') if isinstance(token, bytes) else token
+
+
+def authenticate(token):
+    request = RequestFactory().get('/v1/', HTTP_AUTHORIZATION='JWT %s' % token)
+    return CachedJWTAuthentication().authenticate(request)
+
+
+@pytest.mark.django_db
+def test_verified_tokens_are_cached(verifications, john_doe):
+    token = make_token(60)
+    hits = JWT_CACHE_REQUESTS.get(result='hit')
+    first_user, _ = authenticate(token)
+    cached_user, _ = authenticate(token)
+    assert len(verifications) == 1
+    assert JWT_CACHE_REQUESTS.get(result='hit') == hits + 1
+    assert cached_user is not first_user
+    assert (cached_user.pk, cached_user.username) == (john_doe.pk, john_doe.username)
+
+    authenticate(make_token(120))
+    assert len(verifications) == 2
+
+
+@pytest.mark.django_db
+def test_user_changes_and_expiry_invalidate_tokens(verifications, john_doe):
+    token = make_token(60)
+    authenticate(token)
+    john_doe.is_active = False
+    john_doe.save()
+    authenticate(token)
+    assert len(verifications) == 2
+
+    expired = make_token(-1)
+    authenticate(expired)
+    authenticate(expired)
+    assert len(verifications) == 4
+
+
+@pytest.mark.django_db
+def test_changes_in_other_processes_invalidate_tokens(verifications, john_doe):
+    token = make_token(60)
+    authenticate(token)
+    bump_user_version(john_doe.pk)  # As saving the user in another process does, without touching this one's cache
+    authenticate(token)
+    assert len(verifications) == 2
+
+
+@pytest.mark.django_db
+def test_cached_users_keep_their_database(verifications, john_doe):
+    token = make_token(60)
+    john_doe._state.db = 'other'
+    authenticate(token)
+    cached_user, _ = authenticate(token)
+    assert len(verifications) == 1
+    assert cached_user._state.db == 'other'
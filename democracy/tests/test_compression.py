@@ -0,0 +1,61 @@
+import gzip
+import json
+
+import pytest
+
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+from democracy.utils.compression import choose_encoding
+from democracy.views.hearing_document import render_stale_documents
+from democracy.views.response_cache import get_version
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('', None),
+    ('gzip', 'gzip'),
+    ('gzip, br', 'br'),
+    ('br;q=0.5, gzip', 'gzip'),
+    ('gzip;q=0, br;q=0', None),
+    ('*', 'br'),
+    ('identity', None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header, ['br', 'gzip']) == expected
+
+
+@pytest.mark.django_db
+def test_hearing_document_is_served_compressed(api_client, default_hearing):
+    url = get_hearing_detail_url(default_hearing.id)
+    api_client.get(url)
+    assert render_stale_documents() == 1
+
+    response = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['X-Hearing-Document'] == 'hit'
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response['Vary']
+    assert json.loads(gzip.decompress(response.content).decode('utf-8')) == get_data_from_response(api_client.get(url))
+
+    assert not api_client.get(url).has_header('Content-Encoding')
+
+
+@pytest.mark.django_db
+def test_map_is_cached_compressed(api_client, default_hearing):
+    url = '/v1/hearing/map/'
+    data = get_data_from_response(api_client.get(url))
+    response = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.content).decode('utf-8')) == data
+
+    default_hearing.title = 'Changed'
+    default_hearing.save()
+    assert get_data_from_response(api_client.get(url))['results'][0]['title']['en'] == 'Changed'
+
+
+@pytest.mark.django_db
+def test_map_cache_survives_counter_updates(default_hearing):
+    version = get_version()
+    default_hearing.n_comments += 1
+    default_hearing.save(update_fields=("n_comments",))
+    assert get_version() == version
+
+    default_hearing.save()
+    assert get_version() != version
@@ -1,8 +1,10 @@
 import pytest
+from django.db import transaction
 from django.db.models import Sum
 from django.utils.timezone import now
 
-from democracy.models import Hearing, Label
+from democracy.factories.synthetic import ID_BLOCK_SIZE, SYNTHETIC_EPOCH, SyntheticDataGenerator
+from democracy.models import Hearing, Label, Section, SectionComment, SectionImage
 
 
 @pytest.mark.django_db
@@ -12,3 +14,60 @@ def test_hearing_factory(random_label, random_hearing):
     assert random_hearing.close_at > now()
     assert random_hearing.n_comments == random_hearing.sections.all().aggregate(Sum('n_comments'))['n_comments__sum']
     assert random_hearing.sections.count()
+
+
+@pytest.mark.django_db
+def test_synthetic_data_generator():
+    generator = SyntheticDataGenerator(
+        seed=42, hearings=3, sections=2, comments=4, votes=2, images=1, located=0.5, users=10, batch_size=50
+    )
+    hearing_ids = generator.generate()
+    hearings = Hearing.objects.filter(pk__in=hearing_ids)
+    assert hearings.count() == 3
+    assert Section.objects.filter(hearing__in=hearings).count() == 6
+    assert SectionImage.objects.filter(section__hearing__in=hearings).count() == 6
+    for hearing in hearings:
+        assert hearing.get_main_section()
+        assert hearing.n_comments == SectionComment.objects.filter(section__hearing=hearing).count()
+        for section in hearing.sections.all():
+            assert section.n_comments == section.comments.count()
+            assert section.translations.count() == 3
+    for comment in SectionComment.objects.filter(section__hearing__in=hearings):
+        assert comment.n_votes == comment.voters.count() + comment.n_unregistered_votes
+
+    # the same seed would generate the same primary keys again
+    with pytest.raises(ValueError):
+        SyntheticDataGenerator(seed=42, hearings=1, users=10).generate()
+
+
+def get_synthetic_snapshot(hearing_ids):
+    comments = SectionComment.objects.filter(section__hearing__in=hearing_ids).order_by('pk')
+    return (
+        list(Hearing.objects.filter(pk__in=hearing_ids).order_by('pk').values_list('pk', 'open_at', 'close_at')),
+        list(comments.values_list('pk', 'created_at', 'created_by_id', 'label_id')),
+    )
+
+
+class Rollback(Exception):
+    pass
+
+
+@pytest.mark.django_db
+def test_synthetic_data_does_not_depend_on_clock_or_existing_data(default_label):
+    def generate():
+        generator = SyntheticDataGenerator(seed=5, hearings=2, sections=2, comments=3, votes=1, users=5)
+        try:
+            with transaction.atomic():
+                snapshot = get_synthetic_snapshot(generator.generate())
+                raise Rollback()
+        except Rollback:
+            return snapshot
+
+    first = generate()
+    Label.objects.create(label='another label')
+    assert generate() == first
+    hearings, comments = first
+    assert all(open_at <= SYNTHETIC_EPOCH for (pk, open_at, close_at) in hearings)
+    for (pk, created_at, user_id, label_id) in comments:
+        assert 6 * ID_BLOCK_SIZE <= pk < 7 * ID_BLOCK_SIZE
+        assert user_id is None or 6 * ID_BLOCK_SIZE <= user_id < 7 * ID_BLOCK_SIZE
@@ -0,0 +1,114 @@
+import json
+import time
+from collections import OrderedDict
+
+import pytest
+
+from democracy.factories.synthetic import SyntheticDataGenerator
+from democracy.models import SectionComment
+from democracy.models.section import CommentImage
+from democracy.tests.utils import benchmark, get_hearing_detail_url, write_benchmark
+from democracy.views.section_comment import SectionCommentViewSet
+
+EQUIVALENCE_REQUESTS = [
+    ('/v1/hearing/', {}),
+    ('/v1/hearing/', {'lang': 'fi'}),
+    ('/v1/hearing/', {'include': 'geojson', 'ordering': 'close_at'}),
+    ('/v1/hearing/', {'fields': 'id,title,abstract,main_image'}),
+    ('/v1/comment/', {}),
+    ('/v1/comment/', {'limit': 2, 'offset': 1, 'ordering': '-n_votes'}),
+    ('/v1/comment/', {'include': 'plugin_data', 'omit': 'images'}),
+    ('SECTION_COMMENTS', {}),
+]
+
+
+@pytest.fixture
+def varied_hearing(default_hearing, default_label, john_doe):
+    default_hearing.labels.add(default_label)
+    default_hearing.set_current_language('fi')
+    default_hearing.title = 'Oletuskuuleminen'
+    default_hearing.save()
+    section = default_hearing.sections.first()
+    comment = SectionComment.objects.create(
+        section=section, content='Labeled', label=default_label, plugin_data='{"x": 1}',
+        geojson={'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [24.9, 60.1]}},
+    )
+    CommentImage.objects.create(comment=comment, image='test.jpg', title='Image', width=10, height=20)
+    SectionComment.objects.create(section=section, content='Anonymous', author_name='Someone')
+    return default_hearing
+
+
+def get_contents(client, settings, url, params):
+    contents = []
+    for fast in (False, True):
+        settings.DEMOCRACY_FAST_SERIALIZERS = fast
+        response = client.get(url, params)
+        assert response.status_code == 200, response.content
+        contents.append(response.content)
+    return contents
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('client_fixture', ['api_client', 'john_doe_api_client', 'admin_api_client'])
+@pytest.mark.parametrize('url, params', EQUIVALENCE_REQUESTS)
+def test_fast_serializers_render_identical_json(request, settings, varied_hearing, client_fixture, url, params):
+    client = request.getfixturevalue(client_fixture)
+    if url == 'SECTION_COMMENTS':
+        url = get_hearing_detail_url(varied_hearing.id, 'sections/%s/comments' % varied_hearing.sections.first().id)
+    slow, fast = get_contents(client, settings, url, params)
+    assert json.loads(fast.decode('utf-8'))
+    assert fast == slow
+
+
+@pytest.mark.django_db
+def test_fast_serializer_falls_back_without_translations_cache(api_client, settings, varied_hearing):
+    type(varied_hearing).objects.filter(pk=varied_hearing.pk).update(translations_cache=None)
+    slow, fast = get_contents(api_client, settings, '/v1/hearing/', {})
+    assert fast == slow
+    assert b'Oletuskuuleminen' in fast
+
+
+def time_request(client, settings, fast, url, rounds=3):
+    settings.DEMOCRACY_FAST_SERIALIZERS = fast
+    client.get(url)  # warm up
+    start = time.perf_counter()
+    for x in range(rounds):
+        client.get(url)
+    return (time.perf_counter() - start) / rounds
+
+
+@benchmark
+@pytest.mark.django_db
+def test_fast_serializers_are_faster(api_client, settings):
+    SyntheticDataGenerator(seed=7, hearings=20, sections=2, comments=25, votes=1, users=10, located=0.5).generate()
+    results = OrderedDict()
+    for url in ('/v1/hearing/?limit=100', '/v1/comment/?limit=500'):
+        results[url] = {
+            'drf_seconds': round(time_request(api_client, settings, False, url), 6),
+            'fast_seconds': round(time_request(api_client, settings, True, url), 6),
+        }
+
+    write_benchmark('fast_serializers', {'results': results})
+
+    slower = {url: result for (url, result) in results.items() if result['fast_seconds'] >= result['drf_seconds']}
+    assert not slower, 'Fast serializers are not faster: %s' % slower
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast', [True, False])
+def test_long_unpaginated_lists_are_streamed(api_client, settings, monkeypatch, varied_hearing, fast):
+    monkeypatch.setattr(SectionCommentViewSet, 'stream_chunk_size', 2)
+    settings.DEMOCRACY_FAST_SERIALIZERS = fast
+    url = get_hearing_detail_url(varied_hearing.id, 'sections/%s/comments' % varied_hearing.sections.first().id)
+    settings.DEMOCRACY_STREAM_LISTS = False
+    whole = api_client.get(url).content
+
+    settings.DEMOCRACY_STREAM_LISTS = True
+    response = api_client.get(url)
+    assert response.streaming
+    assert response['Content-Type'] == 'application/json'
+    streamed = b''.join(response.streaming_content)
+    assert streamed == whole
+    assert len(json.loads(streamed.decode('utf-8'))) == 5
+
+    assert not api_client.get(url, {'format': 'api'}).streaming
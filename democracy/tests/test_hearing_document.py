@@ -0,0 +1,103 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.timezone import now
+
+from democracy.models import HearingDocument
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+from democracy.views.hearing_document import render_stale_documents
+
+
+def get_detail(client, hearing):
+    response = client.get(get_hearing_detail_url(hearing.id))
+    return response.has_header('X-Hearing-Document'), get_data_from_response(response)
+
+
+@pytest.fixture
+def rendered_hearing(api_client, default_hearing):
+    get_detail(api_client, default_hearing)
+    assert render_stale_documents() == 1
+    return default_hearing
+
+
+@pytest.mark.django_db
+def test_document_is_queued_rendered_and_served(api_client, default_hearing):
+    from_document, live = get_detail(api_client, default_hearing)
+    assert not from_document
+    assert HearingDocument.objects.stale().count() == 1
+
+    assert render_stale_documents() == 1
+    from_document, data = get_detail(api_client, default_hearing)
+    assert from_document
+    assert data == live
+    # By slug, too
+    response = api_client.get(get_hearing_detail_url(default_hearing.slug))
+    assert response.has_header('X-Hearing-Document')
+
+
+@pytest.mark.django_db
+def test_changes_invalidate_document(api_client, rendered_hearing, default_label):
+    rendered_hearing.title = 'Changed'
+    rendered_hearing.save()
+    from_document, data = get_detail(api_client, rendered_hearing)
+    assert not from_document
+    assert data['title']['en'] == 'Changed'
+    render_stale_documents()
+
+    rendered_hearing.labels.add(default_label)
+    assert not get_detail(api_client, rendered_hearing)[0]
+    render_stale_documents()
+
+    image = rendered_hearing.sections.first().images.first()
+    image.caption = 'New caption'
+    image.save()
+    assert not get_detail(api_client, rendered_hearing)[0]
+    render_stale_documents()
+    assert get_detail(api_client, rendered_hearing)[0]
+
+
+@pytest.mark.django_db
+def test_document_not_used_for_other_requests(api_client, john_doe_api_client, rendered_hearing):
+    assert not john_doe_api_client.get(get_hearing_detail_url(rendered_hearing.id)).has_header('X-Hearing-Document')
+    response = api_client.get(get_hearing_detail_url(rendered_hearing.id), {'lang': 'en'})
+    assert not response.has_header('X-Hearing-Document')
+
+
+@pytest.mark.django_db
+def test_unpublished_hearing_document_is_dropped(api_client, rendered_hearing):
+    rendered_hearing.published = False
+    rendered_hearing.save()
+    assert api_client.get(get_hearing_detail_url(rendered_hearing.id)).status_code == 404
+    assert render_stale_documents() == 0
+    assert not HearingDocument.objects.exists()
+
+
+@pytest.mark.django_db
+def test_consistency_check(rendered_hearing):
+    call_command('democracy_render_hearing_documents', check=True)
+
+    document = HearingDocument.objects.get()
+    content = json.loads(document.content)
+    content['n_comments'] += 1
+    HearingDocument.objects.filter(pk=document.pk).update(content=json.dumps(content))
+    with pytest.raises(CommandError):
+        call_command('democracy_render_hearing_documents', check=True)
+    assert HearingDocument.objects.stale().count() == 1
+
+
+@pytest.mark.django_db
+def test_comment_counts_expire_document(api_client, rendered_hearing, settings):
+    section = rendered_hearing.get_main_section()
+    section.comments.create(content='New comment')
+    # The document is still served, but not for longer than the counter delay
+    assert get_detail(api_client, rendered_hearing)[0]
+    assert HearingDocument.objects.get().valid_until <= now() + timedelta(seconds=60)
+    settings.DEMOCRACY_HEARING_DOCUMENT_COUNTER_DELAY = 0
+    section.comments.create(content='Another comment')
+    assert not get_detail(api_client, rendered_hearing)[0]
+    assert render_stale_documents() == 1
+    rendered_hearing.refresh_from_db()
+    assert get_detail(api_client, rendered_hearing)[1]['n_comments'] == rendered_hearing.n_comments
@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from democracy.enums import Commenting, InitialSectionType
+from democracy.models import Section, SectionComment, SectionType
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+
+EXPAND = 'comments(limit=2,ordering=-n_votes),user_votes'
+
+
+@pytest.mark.django_db
+def test_expand_comments_and_user_votes(john_doe_api_client, john_doe, default_hearing):
+    for section in default_hearing.sections.all():
+        for n_votes, comment in enumerate(section.comments.order_by('pk')):
+            # Saving a comment would recache its vote count from its voters
+            SectionComment.objects.filter(pk=comment.pk).update(n_votes=n_votes)
+    voted = SectionComment.objects.filter(section__hearing=default_hearing).first()
+    voted.voters.add(john_doe)
+
+    data = get_data_from_response(
+        john_doe_api_client.get(get_hearing_detail_url(default_hearing.id), {'expand': EXPAND})
+    )
+    for section in data['sections']:
+        expected = list(SectionComment.objects.filter(section_id=section['id']).order_by('-n_votes', 'pk')[:2])
+        assert [comment['id'] for comment in section['comments']] == [comment.pk for comment in expected]
+        assert section['comments'][0]['n_votes'] == 2
+    assert data['user_votes'] == [voted.pk]
+
+
+@pytest.mark.django_db
+def test_expand_anonymous_user_votes(api_client, default_hearing):
+    data = get_data_from_response(api_client.get(get_hearing_detail_url(default_hearing.id), {'expand': 'user_votes'}))
+    assert data['user_votes'] == []
+    assert 'comments' not in data['sections'][0]
+
+
+@pytest.mark.django_db
+def test_expand_hides_unpublished_comments(api_client, default_hearing):
+    SectionComment.objects.filter(section__hearing=default_hearing).update(published=False)
+    data = get_data_from_response(api_client.get(get_hearing_detail_url(default_hearing.id), {'expand': 'comments'}))
+    assert all(section['comments'] == [] for section in data['sections'])
+
+
+@pytest.mark.django_db
+def test_expand_query_count_is_constant(api_client, default_hearing):
+    url = get_hearing_detail_url(default_hearing.id)
+
+    def expansion_queries():
+        # The first requests after a change fill the translations caches of the new rows
+        api_client.get(url)
+        api_client.get(url, {'expand': 'comments'})
+        with CaptureQueriesContext(connection) as plain:
+            api_client.get(url)
+        with CaptureQueriesContext(connection) as expanded:
+            api_client.get(url, {'expand': 'comments'})
+        return len(expanded.captured_queries) - len(plain.captured_queries)
+
+    before = expansion_queries()
+    for x in range(3):
+        section = Section.objects.create(
+            hearing=default_hearing, type=SectionType.objects.get(identifier=InitialSectionType.SCENARIO),
+            commenting=Commenting.OPEN
+        )
+        section.comments.create(content='comment')
+    assert expansion_queries() == before
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('expand', [
+    'nonexistent', 'comments(limit=x)', 'comments(limit=0)', 'comments(ordering=content)', 'comments(foo=1)',
+    'comments(limit=1'
+])
+def test_invalid_expand(api_client, default_hearing, expand):
+    response = api_client.get(get_hearing_detail_url(default_hearing.id), {'expand': expand})
+    assert response.status_code == 400
@@ -0,0 +1,85 @@
+import re
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.client import RequestFactory
+
+from democracy.enums import InitialSectionType
+from democracy.factories.synthetic import SyntheticDataGenerator
+from democracy.models import Hearing, Section, SectionComment
+from democracy.models.section import get_section_type_id
+from democracy.views.utils import filter_by_hearing_visible
+
+
+def get_visible_hearings():
+    request = RequestFactory().get('/v1/hearing/')
+    request.user = AnonymousUser()
+    return filter_by_hearing_visible(Hearing.objects.with_unpublished(), request, hearing_lookup='')
+
+
+def get_section_id():
+    return Section.objects.values_list('pk', flat=True).first()
+
+
+# (description, index expected to be used or None for any index, table that must not be scanned, queryset)
+HOT_QUERIES = [
+    ('visible hearings', 'democracy_hearing_live_visible', 'democracy_hearing', get_visible_hearings),
+    ('hearing by id or slug', None, 'democracy_hearing',
+     lambda: Hearing.objects.with_unpublished().filter_by_id_or_slug('some-hearing')),
+    ('main sections', 'democracy_section_live_hearing_type', 'democracy_section',
+     lambda: Section.objects.filter(
+         hearing__in=list(Hearing.objects.values_list('pk', flat=True)[:5]),
+         type_id=get_section_type_id(InitialSectionType.MAIN)
+     )),
+    ('newest comments', 'democracy_sectioncomment_live_section_created', 'democracy_sectioncomment',
+     lambda: SectionComment.objects.public(section=get_section_id())),
+    ('most voted comments', 'democracy_sectioncomment_live_section_votes', 'democracy_sectioncomment',
+     lambda: SectionComment.objects.public(section=get_section_id()).order_by('-n_votes')),
+    ('comments by authorization code', 'democracy_sectioncomment_live_authorization_code', 'democracy_sectioncomment',
+     lambda: SectionComment.objects.public(authorization_code='abc')),
+]
+
+
+def explain(queryset, table, index):
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # The test data is small enough for sequential scans and any other index to win; only check that
+            # the index is usable. The dropped indexes come back when the test's transaction is rolled back.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            if index:
+                cursor.execute(
+                    'SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname != %s '
+                    'AND indexname NOT IN (SELECT conname FROM pg_constraint)', [table, index]
+                )
+                for (name,) in cursor.fetchall():
+                    cursor.execute('DROP INDEX %s' % connection.ops.quote_name(name))
+            cursor.execute('EXPLAIN ' + sql, params)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def get_full_scan_re(table):
+    if connection.vendor == 'postgresql':
+        return re.compile(r'Seq Scan on %s\b' % table)
+    return re.compile(r'\bSCAN (TABLE )?%s\b(?! USING)' % table)
+
+
+@pytest.fixture
+def populated_db(db):
+    SyntheticDataGenerator(seed=3, hearings=10, sections=2, comments=20, votes=1, users=10, located=0.5).generate()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+@pytest.mark.parametrize('description, index, table, get_queryset', HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_queries_use_indexes(populated_db, description, index, table, get_queryset):
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        pytest.skip('No EXPLAIN parser for %s' % connection.vendor)
+    plan = explain(get_queryset(), table, index)
+    if index:
+        assert index in plan, plan
+    assert not get_full_scan_re(table).search(plan), plan
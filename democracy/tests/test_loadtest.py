@@ -0,0 +1,56 @@
+import pytest
+
+from democracy.loadtest import InProcessTransport, LoadTest, Scenario
+from democracy.models import SectionType
+from democracy.models.initial_data import INITIAL_SECTION_TYPE_DATA
+from democracy.models.section import section_types
+
+
+@pytest.fixture
+def restore_initial_data(django_db_blocker):
+    """
+    Recreate the rows the data migrations added after a transactional test has flushed the tables.
+
+    Must be requested before `transactional_db`, so that it is torn down after the flush.
+    """
+    yield
+    with django_db_blocker.unblock():
+        # `save()` refuses to write the initial section types
+        SectionType.objects.bulk_create([SectionType(**data) for data in INITIAL_SECTION_TYPE_DATA])
+    section_types.clear()
+
+
+def test_in_process_load_test(restore_initial_data, transactional_db, default_hearing, john_doe):
+    from kerrokantasi.wsgi import application
+    # One client, as the SQLite test database locks its tables against concurrent writes
+    report = LoadTest(InProcessTransport(application), concurrency=1, duration=None, requests=30, seed=1).run()
+    assert report['total']['requests'] == 30
+    assert report['total']['errors'] == 0
+    assert report['total']['queries_per_request'] > 0
+    assert set(name.split(' ')[0] for name in report['scenarios']) <= {
+        'hearing-list', 'hearing-detail', 'map', 'comment-post', 'vote'
+    }
+
+
+class RecordingTransport(object):
+    def __init__(self):
+        self.paths = []
+
+    def request(self, method, path, body, headers):
+        self.paths.append(path)
+        return 200, None
+
+    def close(self):
+        pass
+
+
+@pytest.mark.django_db
+def test_skipped_scenarios_do_not_count_as_requests():
+    transport = RecordingTransport()
+    scenarios = [
+        Scenario('skipped', 1, lambda targets, authenticated: None),
+        Scenario('sent', 1, lambda targets, authenticated: ('GET', '/v1/', None)),
+    ]
+    report = LoadTest(transport, scenarios=scenarios, concurrency=1, duration=None, requests=10).run()
+    assert report['total']['requests'] == 10
+    assert transport.paths == ['/v1/'] * 10
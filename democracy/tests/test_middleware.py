@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+
+import pytest
+from django.http import HttpRequest
+from rest_framework.test import APIClient
+
+from democracy.authentication import CachedJWTAuthentication
+from democracy.middleware import JWTAuthenticationMiddleware, MiddlewareChain
+from democracy.tests.utils import benchmark, write_benchmark
+
+
+@pytest.mark.django_db
+def test_api_requests_run_the_api_middleware(api_client, default_hearing):
+    response = api_client.get('/v1/hearing/', HTTP_ORIGIN='http://example.com')
+    assert response.status_code == 200
+    assert response['Access-Control-Allow-Origin']
+    assert 'X-Frame-Options' not in response
+    assert not response.cookies
+
+    response = api_client.get('/admin/login/')
+    assert response.status_code == 200
+    assert response['X-Frame-Options'] == 'SAMEORIGIN'
+
+
+@pytest.mark.django_db
+def test_api_middleware_can_be_disabled(settings, default_hearing):
+    settings.DEMOCRACY_API_MIDDLEWARE_CLASSES = None
+    response = APIClient().get('/v1/hearing/')
+    assert response.status_code == 200
+    assert response['X-Frame-Options'] == 'SAMEORIGIN'
+
+
+@pytest.mark.django_db
+def test_jwt_authentication_middleware(monkeypatch, john_doe):
+    request = HttpRequest()
+    JWTAuthenticationMiddleware().process_request(request)
+    assert not request.user.is_authenticated()
+
+    monkeypatch.setattr(CachedJWTAuthentication, 'authenticate', lambda self, request: (john_doe, 'token'))
+    request = HttpRequest()
+    JWTAuthenticationMiddleware().process_request(request)
+    assert request.user.pk == john_doe.pk
+
+
+def count_hooks(chain):
+    return sum(len(hooks) for hooks in vars(chain).values())
+
+
+def time_requests(settings, api_middleware_classes, url, rounds=50):
+    settings.DEMOCRACY_API_MIDDLEWARE_CLASSES = api_middleware_classes
+    client = APIClient()
+    client.get(url)  # warm up
+    start = time.perf_counter()
+    for x in range(rounds):
+        client.get(url)
+    return (time.perf_counter() - start) / rounds
+
+
+@benchmark
+@pytest.mark.django_db
+def test_api_middleware_benchmark(settings, default_label):
+    site_chain = MiddlewareChain(settings.DEMOCRACY_SITE_MIDDLEWARE_CLASSES)
+    api_chain = MiddlewareChain(settings.DEMOCRACY_API_MIDDLEWARE_CLASSES)
+    assert count_hooks(api_chain) < count_hooks(site_chain)
+
+    api_middleware_classes = settings.DEMOCRACY_API_MIDDLEWARE_CLASSES
+    results = OrderedDict()
+    for url in ('/v1/label/', '/v1/hearing/'):
+        results[url] = {
+            'site_middleware_seconds': round(time_requests(settings, None, url), 6),
+            'api_middleware_seconds': round(time_requests(settings, api_middleware_classes, url), 6),
+        }
+
+    write_benchmark('middleware', {'results': results})
@@ -0,0 +1,49 @@
+import warnings
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.test import APIRequestFactory
+
+from democracy.models import Hearing, Section
+from democracy.nplusone import NPlusOneDetector, NPlusOneError, NPlusOneWarning
+from democracy.views.section import SectionSerializer
+
+
+def serialize_sections(queryset):
+    request = APIRequestFactory().get('/')
+    request.user = AnonymousUser()
+    return SectionSerializer(queryset, many=True, context={'request': request}).data
+
+
+@pytest.mark.django_db
+def test_detects_loop_outside_serializers(default_hearing):
+    for x in range(3):
+        Hearing.objects.create(title='Hearing %d' % x, slug='hearing-%d' % x)
+    with NPlusOneDetector(threshold=2) as detector:
+        for hearing in Hearing.objects.all():
+            list(hearing.sections.all())
+    findings = detector.findings
+    assert len(findings) == 1
+    assert findings[0].count == 4
+    assert findings[0].source is None
+    assert 'test_nplusone.py' in findings[0].hint
+    with pytest.raises(NPlusOneError):
+        detector.check()
+
+
+@pytest.mark.django_db
+def test_attributes_serializer_fields(default_hearing):
+    with NPlusOneDetector(threshold=2) as detector:
+        serialize_sections(Section.objects.filter(hearing=default_hearing))
+    sources = {site.source.name: site.hint for site in detector.findings if site.source}
+    assert "Add .prefetch_related('images') to the queryset." == sources['SectionSerializer.images']
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        detector.check('warn')
+    assert caught and issubclass(caught[0].category, NPlusOneWarning)
+
+
+@pytest.mark.django_db
+def test_fixture_passes_without_n_plus_one(default_hearing, n_plus_one_detector):
+    list(Section.objects.filter(hearing=default_hearing).prefetch_related('images'))
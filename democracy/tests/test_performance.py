@@ -0,0 +1,94 @@
+import json
+import logging
+
+import pytest
+from rest_framework.test import APIClient
+
+from democracy.middleware import DB_QUERIES, get_view_name
+from democracy.utils.metrics import Histogram
+from democracy.models import Hearing, Label
+from democracy.utils.sql import QueryStats, normalize_sql, top_repeated_queries
+from democracy.views import HearingViewSet
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT * FROM x WHERE id = 5 AND name = 'it''s'") == "SELECT * FROM x WHERE id = ? AND name = ?"
+    assert normalize_sql("SELECT * FROM x WHERE id IN (1, 2,\n 3)") == "SELECT * FROM x WHERE id IN (...)"
+    assert top_repeated_queries([
+        {"sql": "SELECT 1 FROM x WHERE id = %d" % id, "time": "0.001"} for id in range(3)
+    ] + [{"sql": "SELECT 2", "time": "0.001"}]) == [{"sql": "SELECT ? FROM x WHERE id = ?", "count": 3, "time": 0.003}]
+
+
+def test_histogram_exposition():
+    histogram = Histogram("test_seconds", "Test", ("view",), buckets=(0.1, 1))
+    histogram.observe(0.05, view="a")
+    histogram.observe(0.5, view="a")
+    histogram.observe(5, view="a")
+    assert histogram.expose() == [
+        '# HELP test_seconds Test',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{view="a",le="0.1"} 1',
+        'test_seconds_bucket{view="a",le="1"} 2',
+        'test_seconds_bucket{view="a",le="+Inf"} 3',
+        'test_seconds_sum{view="a"} 5.55',
+        'test_seconds_count{view="a"} 3',
+    ]
+
+
+def test_view_name():
+    assert get_view_name(HearingViewSet.as_view({'get': 'list'}), 'GET') == 'HearingViewSet.list'
+    assert get_view_name(HearingViewSet.as_view({'get': 'retrieve'}), 'GET') == 'HearingViewSet.retrieve'
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(api_client, admin_user, settings, default_hearing):
+    settings.DEMOCRACY_METRICS_TOKEN = 'sekrit'
+    before = (DB_QUERIES.get(view='HearingViewSet.list', method='GET') or {'count': 0})['count']
+    assert api_client.get('/v1/hearing/').status_code == 200
+    assert DB_QUERIES.get(view='HearingViewSet.list', method='GET')['count'] == before + 1
+
+    assert api_client.get('/metrics/').status_code == 403
+    assert api_client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+    response = api_client.get('/metrics/', HTTP_AUTHORIZATION='Bearer sekrit')
+    assert response.status_code == 200
+    assert 'democracy_request_db_queries_count{view="HearingViewSet.list",method="GET"}' in response.content.decode()
+
+    client = APIClient()
+    client.force_login(admin_user)
+    assert client.get('/metrics/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_slow_request_log(api_client, settings, default_hearing):
+    settings.DEMOCRACY_SLOW_REQUEST_SECONDS = 0
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger('democracy.performance')
+    logger.addHandler(handler)
+    try:
+        api_client.get('/v1/hearing/%s/' % default_hearing.pk)
+    finally:
+        logger.removeHandler(handler)
+    entry = json.loads(records[-1].getMessage())
+    assert entry['view'] == 'HearingViewSet.retrieve'
+    assert entry['status'] == 200
+    assert entry['db_queries'] > 0
+    # Neither profiled nor sampled
+    assert isinstance(entry['top_queries'], list)
+
+
+@pytest.mark.django_db
+def test_query_stats(default_hearing):
+    stats = QueryStats()
+    stats.activate()
+    try:
+        list(Hearing.objects.filter(pk=default_hearing.pk))
+        list(Hearing.objects.filter(pk='other'))
+        list(Label.objects.all())
+    finally:
+        stats.deactivate()
+    list(Hearing.objects.all())
+    assert stats.count == 3
+    assert stats.seconds > 0
+    assert [(query['count'], 'democracy_hearing' in query['sql']) for query in stats.top_repeated()] == [(2, True)]
@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+from rest_framework.test import APIClient
+
+from democracy.profiling import AGGREGATE_STACKS
+
+
+@pytest.fixture()
+def superuser_client(admin_user):
+    client = APIClient()
+    client.force_login(admin_user)  # For the site views
+    client.force_authenticate(user=admin_user)  # The API does not use sessions
+    return client
+
+
+@pytest.mark.django_db
+def test_profile_inline(superuser_client, john_doe_api_client, default_hearing):
+    response = superuser_client.get('/v1/hearing/?profile=inline')
+    assert response['Content-Type'].startswith('text/plain')
+    assert 'function calls' in response.content.decode()
+
+    # Only superusers may profile
+    response = john_doe_api_client.get('/v1/hearing/?profile=inline')
+    assert response['Content-Type'] == 'application/json'
+    assert 'X-Profile-Id' not in response
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode,extension', [('cprofile', '.prof'), ('sample', '.folded')])
+def test_profile_artifact(superuser_client, settings, tmpdir, default_hearing, mode, extension):
+    settings.DEMOCRACY_PROFILE_DIR = str(tmpdir)
+    response = superuser_client.get('/v1/hearing/%s/' % default_hearing.pk, HTTP_X_DEMOCRACY_PROFILE=mode)
+    assert response.status_code == 200
+    assert json.loads(response.content.decode())['id'] == default_hearing.pk
+    profile_id = response['X-Profile-Id']
+    assert os.path.isfile(os.path.join(str(tmpdir), profile_id + extension))
+    with open(os.path.join(str(tmpdir), profile_id + '.queries.json')) as inf:
+        assert json.load(inf)['count'] > 0
+
+    assert superuser_client.get('/profiles/').json()['artifacts']
+    assert superuser_client.get('/profiles/%s%s' % (profile_id, extension)).status_code == 200
+    assert APIClient().get('/profiles/%s%s' % (profile_id, extension)).status_code == 302
+
+
+@pytest.mark.django_db
+def test_sampled_aggregate(api_client, superuser_client, settings, default_hearing):
+    settings.DEMOCRACY_PROFILE_SAMPLE_RATE = 1
+    settings.DEMOCRACY_PROFILE_SAMPLE_INTERVAL = 0.0001
+    AGGREGATE_STACKS.clear()
+    assert api_client.get('/v1/hearing/').status_code == 200
+    assert 'HearingViewSet.list' in AGGREGATE_STACKS
+    response = superuser_client.get('/profiles/aggregate/HearingViewSet.list/')
+    assert response.status_code == 200
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Query count budgets for the v1 API.
+
+Every router endpoint is requested as an anonymous user, an authenticated user, an organization admin
+and a superuser, first against a realistic fixture and then after the fixture has doubled in size.
+Each endpoint must stay within its query budget, and its query count must not grow with the fixture.
+The endpoints that still execute queries per row are listed in `KNOWN_N_PLUS_ONE` and expected to fail.
+
+With `DEMOCRACY_BENCHMARK_DIR` set, per-endpoint query counts and wall times are written as JSON to
+`query_budget.json` in it, so trends can be compared across commits.
+"""
+import json
+import random
+import time
+from collections import OrderedDict
+
+import factory.fuzzy
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from democracy.enums import Commenting, InitialSectionType
+from democracy.factories.hearing import HearingFactory, LabelFactory, SectionCommentFactory, SectionFactory
+from democracy.factories.user import UserFactory
+from democracy.models import Hearing, Section, SectionComment, SectionImage
+from democracy.tests.utils import create_default_images, write_benchmark
+
+# Maximum number of queries per endpoint for the base fixture, with warm caches, as measured for the
+# most expensive role. Lower them whenever an endpoint gets cheaper.
+QUERY_BUDGETS = {
+    'api-root': 0,
+    'hearing-list': 9,
+    'hearing-detail': 20,
+    'hearing-map': 2,
+    'hearing-report': 40,
+    'hearing-sections-list': 11,
+    'hearing-sections-detail': 5,
+    'section-comments-list': 3,
+    'section-comments-detail': 5,
+    'comment-list': 4,
+    'comment-detail': 5,
+    'section-list': 16,
+    'section-detail': 3,
+    'image-list': 32,
+    'image-detail': 2,
+    'label-list': 2,
+    'label-detail': 1,
+    'contact-person-list': 2,
+    'contact-person-detail': 1,
+    'users-list': 4,
+    'users-detail': 4,
+}
+
+ROLES = ('anonymous', 'authenticated', 'organization_admin', 'superuser')
+
+# Endpoints whose query count still grows with the number of rows, by role. Remove them as they get fixed.
+KNOWN_N_PLUS_ONE = {
+    'hearing-detail': ROLES,
+    'hearing-report': ROLES,
+    'hearing-sections-list': ROLES,
+    'section-list': ROLES,
+    'image-list': ROLES,
+}
+
+BENCHMARK_RESULTS = OrderedDict()
+
+
+@pytest.fixture(scope='module', autouse=True)
+def benchmark_report():
+    yield BENCHMARK_RESULTS
+    if BENCHMARK_RESULTS:
+        write_benchmark('query_budget', {'database': connection.vendor, 'results': BENCHMARK_RESULTS})
+
+
+def populate(scale, organization, contact_person, author=None, n_hearings=2):
+    """
+    Add `n_hearings` hearings, each with `scale` extra sections and `scale` extra comments per section.
+
+    All sections get the default images, and every call adds five more labels. The first new comment of
+    each section is written by `author`, if given.
+    """
+    random.seed(scale)
+    factory.fuzzy.reseed_random(scale)
+    while get_user_model().objects.count() < 10:
+        UserFactory()
+    users = list(get_user_model().objects.order_by('pk'))
+    for x in range(5):
+        LabelFactory()
+    for x in range(n_hearings):
+        hearing = HearingFactory(organization=organization, open_at=now())
+        hearing.contact_persons.add(contact_person)
+        for y in range(scale):
+            SectionFactory(hearing=hearing, commenting=Commenting.OPEN)
+        for section in hearing.sections.all():
+            create_default_images(section)
+            for y in range(scale):
+                SectionCommentFactory(section=section, created_by=(y == 0 and author) or random.choice(users))
+            section.recache_n_comments()
+
+
+def get_endpoints(user):
+    # The newest hearing is the one with the most sections and comments
+    hearing = Hearing.objects.order_by('-created_at').first()
+    section = hearing.sections.exclude(type__identifier=InitialSectionType.CLOSURE_INFO).first()
+    # Own comments are serialized with more queries, so one is requested whenever there is a user
+    comments = SectionComment.objects.filter(section=section).order_by('pk')
+    comment = (comments.filter(created_by=user) if user else comments).first()
+    image = SectionImage.objects.filter(section=section).first()
+    label = hearing.labels.first() or LabelFactory()
+    contact_person = hearing.contact_persons.first()
+    hearing_url = '/v1/hearing/%s/' % hearing.pk
+    section_url = '%ssections/%s/' % (hearing_url, section.pk)
+    endpoints = OrderedDict([
+        ('api-root', '/v1/'),
+        ('hearing-list', '/v1/hearing/'),
+        ('hearing-detail', hearing_url),
+        ('hearing-map', '/v1/hearing/map/'),
+        ('hearing-report', hearing_url + 'report/'),
+        ('hearing-sections-list', hearing_url + 'sections/'),
+        ('hearing-sections-detail', section_url),
+        ('section-comments-list', section_url + 'comments/'),
+        ('section-comments-detail', '%scomments/%s/' % (section_url, comment.pk)),
+        ('comment-list', '/v1/comment/'),
+        ('comment-detail', '/v1/comment/%s/' % comment.pk),
+        ('section-list', '/v1/section/'),
+        ('section-detail', '/v1/section/%s/' % section.pk),
+        ('image-list', '/v1/image/'),
+        ('image-detail', '/v1/image/%s/' % image.pk),
+        ('label-list', '/v1/label/'),
+        ('label-detail', '/v1/label/%s/' % label.pk),
+        ('contact-person-list', '/v1/contact_person/'),
+        ('contact-person-detail', '/v1/contact_person/%s/' % contact_person.pk),
+        ('users-list', '/v1/users/'),
+    ])
+    if user:
+        endpoints['users-detail'] = '/v1/users/%s/' % user.uuid
+    return endpoints
+
+
+def count_objects(data):
+    if isinstance(data, dict):
+        return ('id' in data) + sum(count_objects(value) for value in data.values())
+    if isinstance(data, list):
+        return sum(count_objects(value) for value in data)
+    return 0
+
+
+def count_rows(response):
+    """
+    Count the serialized objects at any depth of a JSON response.
+
+    Other responses (the XLSX report) are assumed to contain every section and comment.
+    """
+    if response['Content-Type'].startswith('application/json'):
+        return count_objects(json.loads(response.content.decode('utf-8')))
+    return Section.objects.count() + SectionComment.objects.count()
+
+
+def measure(client, endpoints):
+    results = OrderedDict()
+    for name, url in endpoints.items():
+        client.get(url)  # Measure with warm caches
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            duration = time.perf_counter() - start
+        results[name] = {
+            'url': url,
+            'status': response.status_code,
+            'queries': len(context.captured_queries),
+            'rows': count_rows(response),
+            'seconds': round(duration, 6),
+        }
+    return results
+
+
+ROLE_CLIENT_FIXTURES = {
+    'anonymous': 'api_client',
+    'authenticated': 'john_doe_api_client',
+    'organization_admin': 'john_smith_api_client',
+    'superuser': 'admin_api_client',
+}
+
+
+def get_measurements(request, role):
+    """
+    Measure every endpoint as `role` for the base and the doubled fixture, once per role.
+    """
+    if role not in BENCHMARK_RESULTS:
+        client = request.getfixturevalue(ROLE_CLIENT_FIXTURES[role])
+        user = getattr(client, 'user', None)
+        organization = request.getfixturevalue('default_organization')
+        contact_person = request.getfixturevalue('contact_person')
+        # The second round doubles the number of hearings, labels, sections per hearing and comments per section
+        populate(1, organization, contact_person, author=user)
+        base = measure(client, get_endpoints(user))
+        populate(2, organization, contact_person, author=user)
+        doubled = measure(client, get_endpoints(user))
+        BENCHMARK_RESULTS[role] = OrderedDict(
+            (name, {'base': base[name], 'doubled': doubled[name]}) for name in base
+        )
+    return BENCHMARK_RESULTS[role]
+
+
+def get_budget_params():
+    for role in ROLES:
+        for name in QUERY_BUDGETS:
+            if name == 'users-detail' and role == 'anonymous':
+                continue
+            if role in KNOWN_N_PLUS_ONE.get(name, ()):
+                yield pytest.mark.xfail(reason='N+1 queries', strict=True)((role, name))
+            else:
+                yield (role, name)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('role,name', get_budget_params())
+def test_query_budgets(request, role, name):
+    result = get_measurements(request, role)[name]
+    assert result['base']['queries'] <= QUERY_BUDGETS[name]
+    assert result['doubled']['queries'] == result['base']['queries'], (
+        'The query count grows with the fixture (N+1), as rows go from %d to %d' % (
+            result['base']['rows'], result['doubled']['rows']
+        )
+    )
@@ -0,0 +1,100 @@
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+
+from democracy import routers
+from democracy.models import Hearing
+from democracy.routers import (
+    STICKY_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, get_read_alias, get_sticky_cache_key,
+    reading_from_replicas
+)
+from democracy.tests.utils import get_hearing_detail_url
+
+
+@pytest.fixture
+def replica(settings, monkeypatch):
+    settings.DEMOCRACY_REPLICA_DATABASES = ['replica']
+    monkeypatch.setattr(routers, 'get_replication_lag', lambda connection: 0)
+    monkeypatch.setattr(routers, 'connections', {'replica': FakeConnection()})
+    routers.reset_health()
+    yield 'replica'
+    routers.reset_health()
+
+
+class FakeConnection(object):
+    def ensure_connection(self):
+        pass
+
+
+def test_reads_go_to_replicas_only_when_asked(replica):
+    router = ReplicaRouter()
+    assert router.db_for_read(Hearing) is None
+    with reading_from_replicas():
+        assert router.db_for_read(Hearing) == replica
+        assert router.db_for_write(Hearing) == 'default'
+    assert router.db_for_read(Hearing) is None
+    assert not router.allow_migrate(replica, 'democracy')
+
+
+def test_unusable_replicas_are_skipped(replica, settings, monkeypatch):
+    monkeypatch.setattr(routers, 'get_replication_lag', lambda connection: 60)
+    with reading_from_replicas():
+        assert get_read_alias() is None
+
+    # The result is remembered until the next check
+    monkeypatch.setattr(routers, 'get_replication_lag', lambda connection: 0)
+    with reading_from_replicas():
+        assert get_read_alias() is None
+    settings.DEMOCRACY_REPLICA_CHECK_INTERVAL = 0
+    with reading_from_replicas():
+        assert get_read_alias() == replica
+
+    def fail(connection):
+        raise ConnectionError()
+    monkeypatch.setattr(routers, 'get_replication_lag', fail)
+    with reading_from_replicas():
+        assert get_read_alias() is None
+
+
+@pytest.mark.django_db
+def test_writers_stick_to_the_primary(replica, john_doe):
+    middleware = ReplicaRoutingMiddleware()
+    factory = RequestFactory()
+
+    def get_alias(request, status=200):
+        request.user = john_doe
+        middleware.process_request(request)
+        alias = get_read_alias()
+        return alias, middleware.process_response(request, HttpResponse(status=status))
+
+    cache.delete(get_sticky_cache_key(john_doe.pk))
+    assert get_alias(factory.get('/v1/hearing/'))[0] == replica
+    alias, response = get_alias(factory.post('/v1/hearing/'), status=400)
+    assert alias is None
+    assert STICKY_COOKIE not in response.cookies
+    assert get_alias(factory.get('/v1/hearing/'))[0] == replica
+
+    alias, response = get_alias(factory.post('/v1/hearing/'), status=201)
+    assert alias is None
+    assert response.cookies[STICKY_COOKIE]['max-age'] == 10
+    assert get_alias(factory.get('/v1/hearing/'))[0] is None
+    cache.delete(get_sticky_cache_key(john_doe.pk))
+
+    request = factory.get('/v1/hearing/')
+    request.COOKIES[STICKY_COOKIE] = '1'
+    assert get_alias(request)[0] is None
+    assert get_read_alias() is None
+
+
+@pytest.mark.django_db
+def test_api_writes_set_stickiness(settings, john_doe, john_doe_api_client, default_hearing):
+    settings.DEMOCRACY_REPLICA_DATABASES = ['default']
+    cache.delete(get_sticky_cache_key(john_doe.pk))
+    section = default_hearing.sections.first()
+    url = get_hearing_detail_url(default_hearing.id, 'sections/%s/comments' % section.id)
+    assert john_doe_api_client.get(url).status_code == 200
+    response = john_doe_api_client.post(url, data={'content': 'Hello', 'section': section.pk})
+    assert response.status_code == 201
+    assert response.cookies[STICKY_COOKIE]
+    assert cache.get(get_sticky_cache_key(john_doe.pk))
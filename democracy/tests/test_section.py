@@ -1,12 +1,14 @@
 import datetime
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.encoding import force_text
 from django.utils.timezone import now
 
 from democracy.enums import InitialSectionType
 from democracy.models import Organization, Section, SectionType
-from democracy.models.section import CLOSURE_INFO_ORDERING
+from democracy.models.section import CLOSURE_INFO_ORDERING, get_section_type_id, section_types
 from democracy.tests.conftest import default_lang_code
 from democracy.tests.utils import assert_id_in_results, get_data_from_response, get_hearing_detail_url
 from democracy.views.section import SectionSerializer
@@ -408,3 +410,26 @@ def test_hearing_visibility(john_smith_api_client, default_hearing):
     response = john_smith_api_client.get('/v1/image/')
     response_data = get_results_from_response(response)
     assert len(response_data) > 1
+
+
+@pytest.mark.django_db
+def test_section_type_ids_are_cached(default_hearing):
+    section_types.clear()
+    main_id = SectionType.objects.get(identifier=InitialSectionType.MAIN).pk
+    assert get_section_type_id(InitialSectionType.MAIN) == main_id
+    with CaptureQueriesContext(connection) as context:
+        assert get_section_type_id(InitialSectionType.MAIN) == main_id
+        assert default_hearing.get_main_section().type_id == main_id
+    assert len(context.captured_queries) == 1
+    assert 'democracy_sectiontype' not in context.captured_queries[0]['sql']
+
+    with pytest.raises(SectionType.DoesNotExist):
+        get_section_type_id('no-such-type')
+
+
+@pytest.mark.django_db
+def test_section_type_ids_are_refreshed_on_save(new_section_type):
+    get_section_type_id(InitialSectionType.MAIN)
+    assert section_types.ids is not None
+    new_section_type.save()
+    assert section_types.ids is None
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+
+
+@pytest.fixture
+def translated_hearing(default_hearing):
+    default_hearing.set_current_language('fi')
+    default_hearing.title = 'Suomeksi'
+    default_hearing.save()
+    main_section = default_hearing.get_main_section()
+    main_section.set_current_language('sv')
+    main_section.abstract = 'Svenska'
+    main_section.title = 'Svensk titel'
+    main_section.save()
+    return default_hearing
+
+
+@pytest.mark.django_db
+def test_lang_returns_flat_strings(api_client, translated_hearing):
+    data = get_data_from_response(api_client.get(get_hearing_detail_url(translated_hearing.id), {'lang': 'fi'}))
+    assert data['title'] == 'Suomeksi'
+    # No Finnish abstract; falls back to English
+    assert data['abstract'] == 'Section 1 abstract'
+    main_section = [section for section in data['sections'] if section['type'] == 'main'][0]
+    assert main_section['title'] == 'Svensk titel'
+    assert isinstance(data['labels'], list)
+
+
+@pytest.mark.django_db
+def test_lang_fallback_order(api_client, translated_hearing):
+    data = get_data_from_response(api_client.get(get_hearing_detail_url(translated_hearing.id), {'lang': 'sv'}))
+    assert data['abstract'] == 'Svenska'
+    # sv falls back to fi before en
+    assert data['title'] == 'Suomeksi'
+
+
+@pytest.mark.django_db
+def test_lang_without_fallback_fetches_one_translation(api_client, translated_hearing, settings):
+    settings.DEMOCRACY_TRANSLATIONS_CACHE = False
+    with CaptureQueriesContext(connection) as context:
+        api_client.get('/v1/hearing/', {'lang': 'fi', 'fields': 'id,title'})
+    translation_queries = [query['sql'] for query in context.captured_queries if 'translation' in query['sql']]
+    assert translation_queries
+    # The Finnish title exists, so neither the other languages nor the fallbacks are fetched
+    assert not any('"language_code" IN' in sql for sql in translation_queries)
+
+
+@pytest.mark.django_db
+def test_invalid_lang(api_client, default_hearing):
+    response = api_client.get('/v1/hearing/', {'lang': 'xx'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_report_ignores_lang(admin_api_client, default_hearing):
+    response = admin_api_client.get(get_hearing_detail_url(default_hearing.id, 'report'), {'lang': 'fi'})
+    assert response.status_code == 200
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+from django.core.management import call_command
+
+from democracy.snapshots import get_comment_page_name, get_snapshot_root, has_snapshot, is_stale, publish_snapshot
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+from democracy.views import SectionCommentViewSet
+
+
+@pytest.fixture
+def snapshots(settings, tmpdir):
+    settings.MEDIA_ROOT = str(tmpdir)
+    settings.DEMOCRACY_SNAPSHOT_BASE_URL = 'http://testserver'
+
+
+@pytest.fixture
+def closed_hearing(snapshots, default_hearing):  # Images are written to the MEDIA_ROOT of `snapshots`
+    default_hearing.force_closed = True
+    default_hearing.save()
+    publish_snapshot(default_hearing)
+    return default_hearing
+
+
+@pytest.mark.django_db
+def test_snapshot_files_are_written(closed_hearing):
+    directory = os.path.join(get_snapshot_root(), closed_hearing.pk)
+    section = closed_hearing.sections.first()
+    for name in ('hearing.json', 'hearing.json.gz', 'sections.json', 'report.xlsx',
+                 'sections/%s/comments.json' % section.pk, 'sections/%s/comments/0.json' % section.pk):
+        assert os.path.isfile(os.path.join(directory, name)), name
+    assert not os.path.exists(os.path.join(directory, 'report.xlsx.gz'))
+
+
+@pytest.mark.django_db
+def test_anonymous_requests_are_redirected_to_snapshot(api_client, john_doe_api_client, closed_hearing):
+    url = get_hearing_detail_url(closed_hearing.id)
+    assert john_doe_api_client.get(url).status_code == 200
+    for id_or_slug in (closed_hearing.id, closed_hearing.slug):
+        response = api_client.get(get_hearing_detail_url(id_or_slug))
+        assert response.status_code == 302
+        assert response['Location'].endswith('/media/snapshots/%s/hearing.json' % closed_hearing.pk)
+
+    path = os.path.join(get_snapshot_root(), closed_hearing.pk, 'hearing.json')
+    with open(path, 'rb') as snapshot:
+        assert json.loads(snapshot.read().decode('utf-8'))['id'] == closed_hearing.id
+
+    response = api_client.get(get_hearing_detail_url(closed_hearing.id, 'sections'))
+    assert response['Location'].endswith('/sections.json')
+    assert api_client.get(url, {'format': 'api'}).status_code == 200
+
+
+@pytest.mark.django_db
+def test_changes_mark_snapshot_stale(api_client, closed_hearing):
+    section = closed_hearing.sections.first()
+    section.title = 'Changed'
+    section.save()
+    assert has_snapshot(closed_hearing.pk)
+    assert is_stale(closed_hearing.pk)
+    data = get_data_from_response(api_client.get(get_hearing_detail_url(closed_hearing.id, 'sections')))
+    assert 'Changed' in json.dumps(data)
+
+    call_command('democracy_publish_snapshots')
+    assert not is_stale(closed_hearing.pk)
+    assert api_client.get(get_hearing_detail_url(closed_hearing.id, 'sections')).status_code == 302
+
+
+@pytest.mark.django_db
+def test_republishing_replaces_snapshot_and_slugs(closed_hearing):
+    old_slug = closed_hearing.slug
+    closed_hearing.slug = 'renamed-hearing'
+    closed_hearing.save()
+    publish_snapshot(closed_hearing)
+    root = get_snapshot_root()
+    assert sorted(os.listdir(os.path.join(root, 'slugs'))) == ['renamed-hearing']
+    assert old_slug != 'renamed-hearing'
+    assert not [name for name in os.listdir(root) if name.startswith('.')]
+    assert has_snapshot(closed_hearing.pk)
+
+
+@pytest.mark.django_db
+def test_reopened_hearing_snapshot_is_removed(closed_hearing):
+    closed_hearing.force_closed = False
+    closed_hearing.save()
+    call_command('democracy_publish_snapshots')
+    assert not has_snapshot(closed_hearing.pk)
+
+
+@pytest.mark.django_db
+def test_publish_command(snapshots, default_hearing):
+    call_command('democracy_publish_snapshots')
+    assert not has_snapshot(default_hearing.pk)
+    default_hearing.force_closed = True
+    default_hearing.save()
+    call_command('democracy_publish_snapshots')
+    assert has_snapshot(default_hearing.pk)
+
+
+@pytest.mark.django_db
+def test_streamed_comment_lists_are_written(monkeypatch, snapshots, default_hearing):
+    monkeypatch.setattr(SectionCommentViewSet, 'stream_chunk_size', 2)
+    default_hearing.force_closed = True
+    default_hearing.save()
+    call_command('democracy_publish_snapshots')
+    section = default_hearing.sections.first()
+    path = os.path.join(get_snapshot_root(), default_hearing.pk, 'sections/%s/comments.json' % section.pk)
+    with open(path, 'rb') as snapshot:
+        comments = json.loads(snapshot.read().decode('utf-8'))
+    assert len(comments) == section.comments.count() > 2
+
+
+def test_comment_page_names():
+    assert get_comment_page_name('abc', {}) == 'sections/abc/comments.json'
+    assert get_comment_page_name('abc', {'limit': '50', 'offset': '100'}) == 'sections/abc/comments/100.json'
+    assert get_comment_page_name('abc', {'limit': '50'}) == 'sections/abc/comments/0.json'
+    assert get_comment_page_name('abc', {'limit': '20'}) is None
+    assert get_comment_page_name('abc', {'limit': '50', 'offset': '10'}) is None
+    assert get_comment_page_name('abc', {'ordering': 'n_votes'}) is None
+    assert get_comment_page_name('../abc', {}) is None
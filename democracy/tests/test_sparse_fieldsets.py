@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+
+
+@pytest.mark.django_db
+def test_hearing_list_fields(api_client, default_hearing):
+    data = get_data_from_response(api_client.get('/v1/hearing/', {'fields': 'id,title'}))
+    assert set(data['results'][0].keys()) == {'id', 'title'}
+    assert data['results'][0]['title']['en'] == default_hearing.title
+
+
+@pytest.mark.django_db
+def test_hearing_list_omit(api_client, default_hearing):
+    data = get_data_from_response(api_client.get('/v1/hearing/', {'omit': 'main_image,abstract,title'}))
+    hearing = data['results'][0]
+    assert 'main_image' not in hearing
+    assert 'abstract' not in hearing
+    assert 'title' not in hearing
+    assert hearing['id'] == default_hearing.id
+
+
+@pytest.mark.django_db
+def test_sparse_hearing_list_is_cheaper(api_client, default_hearing):
+    with CaptureQueriesContext(connection) as full:
+        api_client.get('/v1/hearing/')
+    with CaptureQueriesContext(connection) as sparse:
+        api_client.get('/v1/hearing/', {'fields': 'id,slug,n_comments'})
+    assert len(sparse.captured_queries) < len(full.captured_queries)
+    # Neither the main section prefetch nor translations are needed
+    assert not any('translation' in query['sql'] for query in sparse.captured_queries)
+
+
+@pytest.mark.django_db
+def test_nested_serializers_are_not_sparse(api_client, default_hearing):
+    data = get_data_from_response(api_client.get(get_hearing_detail_url(default_hearing.id), {'fields': 'id,sections'}))
+    assert set(data.keys()) == {'id', 'sections'}
+    assert 'images' in data['sections'][0]
+    assert 'title' in data['sections'][0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_template', [
+    '/v1/hearing/{hearing}/sections/',
+    '/v1/section/',
+    '/v1/image/',
+    '/v1/comment/',
+    '/v1/hearing/{hearing}/sections/{section}/comments/',
+    '/v1/label/',
+])
+def test_fields_on_other_endpoints(api_client, default_hearing, default_label, url_template):
+    section = default_hearing.sections.first()
+    url = url_template.format(hearing=default_hearing.id, section=section.id)
+    data = get_data_from_response(api_client.get(url, {'fields': 'id'}))
+    results = data['results'] if isinstance(data, dict) else data
+    assert results
+    assert all(set(item.keys()) == {'id'} for item in results)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast', [False, True])
+def test_sparse_hearing_list_skips_unrequested_relations(api_client, settings, default_hearing, default_label, fast):
+    settings.DEMOCRACY_FAST_SERIALIZERS = fast
+    default_hearing.labels.add(default_label)
+    with CaptureQueriesContext(connection) as sparse:
+        api_client.get('/v1/hearing/', {'fields': 'id,slug'})
+    tables = ('democracy_label', 'democracy_contactperson', 'democracy_sectionimage', 'democracy_section"')
+    assert not any(table in query['sql'] for query in sparse.captured_queries for table in tables)
+
+
+@pytest.mark.django_db
+def test_report_ignores_fields(api_client, default_hearing):
+    response = api_client.get(get_hearing_detail_url(default_hearing.id, 'report'), {'fields': 'id'})
+    assert response.status_code == 200
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from democracy.models import CommentEvent, SectionComment
+from democracy.streaming import DatabasePollingBroker, LocalBroker, Subscription, event_stream, reset_broker
+from democracy.tests.utils import get_hearing_detail_url
+
+
+@pytest.fixture
+def local_broker(settings):
+    settings.DEMOCRACY_STREAM_BROKER = 'democracy.streaming.LocalBroker'
+    settings.DEMOCRACY_STREAM_HEARTBEAT = 0.05
+    settings.DEMOCRACY_STREAM_TIMEOUT = 0.2
+    reset_broker()
+    yield
+    reset_broker()
+
+
+def parse_events(content):
+    events = []
+    for block in content.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':') and ': ' in line)
+        if 'id' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@pytest.mark.django_db
+def test_comment_changes_are_logged(default_hearing, local_broker):
+    section = default_hearing.sections.first()
+    start = CommentEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    comment = SectionComment.objects.create(section=section, content='Hello')
+    comment.content = 'Hello again'
+    comment.save()
+    comment.n_unregistered_votes += 1
+    comment.recache_n_votes()
+    comment.soft_delete()
+
+    events = CommentEvent.objects.filter(id__gt=start)
+    assert [event.type for event in events] == [
+        CommentEvent.CREATED, CommentEvent.EDITED, CommentEvent.VOTES, CommentEvent.DELETED,
+    ]
+    assert all(event.hearing_id == default_hearing.id and event.comment_id == comment.id for event in events)
+    assert json.loads(events[2].payload)['n_votes'] == 1
+    assert json.loads(events[3].payload) == {'id': comment.id, 'section': section.id, 'deleted': True}
+
+
+@pytest.mark.django_db
+def test_stream_resumes_from_last_event_id(api_client, default_hearing, local_broker):
+    section = default_hearing.sections.first()
+    first = SectionComment.objects.create(section=section, content='First')
+    last_event_id = CommentEvent.objects.get(comment_id=first.id).id
+    second = SectionComment.objects.create(section=section, content='Second')
+    SectionComment.objects.create(section=section, content='Hidden', published=False)
+
+    response = api_client.get(
+        get_hearing_detail_url(default_hearing.id, 'stream'), HTTP_LAST_EVENT_ID=str(last_event_id)
+    )
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/event-stream')
+    content = b''.join(response.streaming_content).decode('utf-8')
+    assert content.startswith('retry: ')
+    events = parse_events(content)
+    assert [(event_type, data['id']) for (_, event_type, data) in events] == [(CommentEvent.CREATED, second.id)]
+
+
+@pytest.mark.django_db
+def test_local_broker_delivers_published_events(default_hearing, local_broker):
+    broker = LocalBroker()
+    subscription = broker.subscribe(default_hearing.id)
+    other = broker.subscribe('other-hearing')
+    event = CommentEvent.objects.create(hearing=default_hearing, type=CommentEvent.EDITED, comment_id=1, payload='{}')
+    broker.publish(event)
+    broker.publish(event)
+    assert subscription.get(timeout=0.1) == [event]
+    assert subscription.get(timeout=0.01) == []
+    assert other.get(timeout=0.01) == []
+    broker.unsubscribe(subscription)
+    broker.unsubscribe(other)
+    assert not broker.subscriptions
+
+
+@pytest.mark.django_db
+def test_stream_sends_heartbeats(default_hearing, local_broker):
+    content = ''.join(event_stream(default_hearing.id))
+    assert ': heartbeat' in content
+    assert parse_events(content) == []
+
+
+def test_polling_broker_forgets_its_position_when_idle():
+    broker = DatabasePollingBroker()
+    broker.last_ids = {'default': 42}
+    broker.run()  # Returns right away without subscribers
+    assert broker.thread is None
+    assert broker.last_ids == {}
+
+
+@pytest.mark.django_db
+def test_polling_broker_keeps_a_position_per_database(default_hearing):
+    broker = DatabasePollingBroker()
+    subscription = Subscription(default_hearing.id)
+    broker.subscriptions[default_hearing.id].add(subscription)
+    event = CommentEvent.objects.create(hearing=default_hearing, type=CommentEvent.EDITED, comment_id=1, payload='{}')
+    broker.last_ids = {'default': event.id - 1}
+    broker.poll()
+    assert subscription.get(timeout=0.1) == [event]
+    assert broker.last_ids == {'default': event.id}
@@ -0,0 +1,148 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.utils.timezone import now
+
+from democracy.models import Hearing, Section, SectionComment
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+
+EPOCH = '2000-01-01T00:00:00Z'
+
+
+def sync(client, url, modified_since, **params):
+    params['modified_since'] = modified_since
+    response = client.get(url, params)
+    data = get_data_from_response(response)
+    assert response['X-Sync-Token'] == data['sync_token']
+    return data
+
+
+@pytest.mark.django_db
+def test_soft_delete_updates_modified_at(default_hearing):
+    before = default_hearing.modified_at
+    default_hearing.soft_delete()
+    assert Hearing.objects.everything().get(pk=default_hearing.pk).modified_at > before
+
+
+@pytest.mark.django_db
+def test_hearing_sync(api_client, default_hearing):
+    data = sync(api_client, '/v1/hearing/', EPOCH)
+    assert [hearing['id'] for hearing in data['results']] == [default_hearing.id]
+    assert not data['more']
+
+    # Nothing changed since
+    token = data['sync_token']
+    data = sync(api_client, '/v1/hearing/', token)
+    assert data['results'] == []
+    assert data['sync_token'] == token
+
+    default_hearing.borough = 'Kallio'
+    default_hearing.save()
+    data = sync(api_client, '/v1/hearing/', token)
+    assert [hearing['id'] for hearing in data['results']] == [default_hearing.id]
+
+    default_hearing.soft_delete()
+    data = sync(api_client, '/v1/hearing/', data['sync_token'])
+    assert data['results'] == [{'id': default_hearing.id, 'deleted': True, 'modified_at': data['results'][0]['modified_at']}]
+
+
+@pytest.mark.django_db
+def test_section_tombstones(api_client, default_hearing):
+    url = get_hearing_detail_url(default_hearing.id, 'sections')
+    data = sync(api_client, url, EPOCH)
+    assert len(data['results']) == 3
+    section = default_hearing.sections.last()
+    section.soft_delete()
+    data = sync(api_client, url, data['sync_token'])
+    assert data['results'][0]['id'] == section.id
+    assert data['results'][0]['deleted'] is True
+
+
+@pytest.mark.django_db
+def test_comment_sync_pages(api_client, default_hearing):
+    comments = SectionComment.objects.filter(section__hearing=default_hearing)
+    seen = []
+    token = (now() - datetime.timedelta(days=1)).isoformat()
+    while True:
+        data = sync(api_client, '/v1/comment/', token, limit=2)
+        assert len(data['results']) <= 2
+        seen.extend(comment['id'] for comment in data['results'])
+        token = data['sync_token']
+        if not data['more']:
+            break
+    assert sorted(seen) == sorted(comments.values_list('id', flat=True))
+
+    comment = comments.first()
+    comment.n_unregistered_votes += 1
+    comment.save()
+    data = sync(api_client, '/v1/comment/', token)
+    assert [c['id'] for c in data['results']] == [comment.id]
+    assert data['results'][0]['n_votes'] == 1
+
+
+@pytest.mark.django_db
+def test_image_sync_unpublished_is_tombstone(api_client, default_hearing):
+    data = sync(api_client, '/v1/image/', EPOCH)
+    assert len(data['results']) == 9
+    image = default_hearing.sections.first().images.first()
+    image.published = False
+    image.save()
+    data = sync(api_client, '/v1/image/', data['sync_token'])
+    assert data['results'] == [{'id': image.id, 'deleted': True, 'modified_at': data['results'][0]['modified_at']}]
+
+
+@pytest.mark.django_db
+def test_invalid_modified_since(api_client):
+    assert api_client.get('/v1/hearing/', {'modified_since': 'yesterday'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_tombstones_of_invisible_hearings_are_hidden(api_client, default_hearing):
+    token = sync(api_client, '/v1/comment/', EPOCH)['sync_token']
+    default_hearing.published = False
+    default_hearing.save()
+    comment = SectionComment.objects.filter(section__hearing=default_hearing).first()
+    comment.soft_delete()
+    for url in ('/v1/comment/', '/v1/section/', '/v1/image/'):
+        data = sync(api_client, url, EPOCH)
+        assert data['results'] == []
+    data = sync(api_client, '/v1/comment/', token)
+    assert data['results'] == []
+
+
+@pytest.mark.django_db
+def test_rows_are_synced_when_their_hearing_opens(api_client, default_hearing):
+    Hearing.objects.filter(pk=default_hearing.pk).update(open_at=now() + datetime.timedelta(hours=1))
+    assert sync(api_client, '/v1/section/', EPOCH)['results'] == []
+    token = now().isoformat()
+
+    Hearing.objects.filter(pk=default_hearing.pk).update(open_at=now())
+    call_command('democracy_touch_opened_hearings')
+    data = sync(api_client, '/v1/section/', token)
+    assert len(data['results']) == 3
+    data = sync(api_client, '/v1/hearing/', token)
+    assert [hearing['id'] for hearing in data['results']] == [default_hearing.id]
+
+    # Only once
+    token = data['sync_token']
+    call_command('democracy_touch_opened_hearings')
+    assert sync(api_client, '/v1/hearing/', token)['results'] == []
+
+
+@pytest.mark.django_db
+def test_counter_updates_are_not_modifications(default_hearing):
+    Section.objects.filter(hearing=default_hearing).update(n_comments=0)
+    section = default_hearing.get_main_section()
+    before = section.modified_at
+    section.recache_n_comments()
+    section = Section.objects.get(pk=section.pk)
+    assert section.n_comments > 0
+    assert section.modified_at == before
+
+
+@pytest.mark.django_db
+def test_unpublished_hearings_are_hidden_from_anonymous_tombstones(api_client, admin_api_client, default_hearing):
+    Hearing.objects.filter(pk=default_hearing.pk).update(published=False)
+    assert sync(api_client, '/v1/hearing/', EPOCH)['results'] == []
+    assert sync(admin_api_client, '/v1/hearing/', EPOCH)['results'][0]['id'] == default_hearing.id
@@ -0,0 +1,117 @@
+import json
+from collections import namedtuple
+
+import pytest
+from django.core.signals import request_finished
+
+from democracy import tenants
+from democracy.models import Hearing, Label, Section, SectionComment
+from democracy.tenants import (
+    TenantRouter, find_section_database, get_active_tenant, is_tenant_model, using_tenant
+)
+from democracy.tests.utils import get_hearing_detail_url
+from democracy.views import section_comment as section_comment_views
+from democracy.views import tenants as tenant_views
+from democracy.views.tenants import FanOutList, sort_merged
+
+
+@pytest.fixture
+def tenant_settings(settings, default_organization):
+    settings.DEMOCRACY_TENANT_DATABASES = {default_organization.pk: 'tenant'}
+    return settings
+
+
+def test_tenant_models():
+    assert is_tenant_model(Hearing)
+    assert is_tenant_model(Hearing._parler_meta.root_model)
+    assert is_tenant_model(Hearing.labels.through)
+    assert is_tenant_model(SectionComment)
+    assert not is_tenant_model(Label)
+
+
+@pytest.mark.django_db
+def test_new_hearing_data_is_routed_by_organization(tenant_settings, default_organization):
+    router = TenantRouter()
+    hearing = Hearing(organization=default_organization)
+    assert router.db_for_write(Hearing, instance=hearing) == 'tenant'
+    section = Section(hearing=hearing)
+    assert section._state.db == 'tenant'
+    assert router.db_for_write(Section, instance=section) == 'tenant'
+    # Shared tables are read from the tenant database when joined to its data, but never written there
+    assert router.db_for_read(Label, instance=section) == 'tenant'
+    assert router.db_for_write(Label, instance=section) is None
+    assert router.db_for_read(Label) is None
+
+    assert router.db_for_write(Hearing, instance=Hearing()) == 'default'
+
+
+@pytest.mark.django_db
+def test_queries_without_instances_go_to_the_active_tenant(tenant_settings):
+    router = TenantRouter()
+    assert router.db_for_read(SectionComment) is None
+    with using_tenant('tenant'):
+        assert router.db_for_read(SectionComment) == 'tenant'
+        assert router.db_for_read(Label) is None
+    tenants.activate_tenant('tenant')
+    request_finished.send(sender=None)
+    assert get_active_tenant() is None
+
+
+def test_sort_merged():
+    Row = namedtuple('Row', ('n', 'created_at'))
+    rows = [Row(1, 'b'), Row(None, 'a'), Row(2, 'a'), Row(1, 'a')]
+    sort_merged(rows, ['-n', 'created_at'])
+    assert rows == [Row(None, 'a'), Row(2, 'a'), Row(1, 'a'), Row(1, 'b')]
+
+
+@pytest.mark.django_db
+def test_fan_out_list_merges_databases(monkeypatch, default_hearing):
+    # Every database having the same rows shows the merging
+    monkeypatch.setattr(tenant_views, 'get_databases', lambda: ['default', 'default'])
+    objects = FanOutList(Section.objects.order_by('-ordering'))
+    sections = list(Section.objects.order_by('-ordering'))
+    assert len(objects) == 2 * len(sections)
+    assert [section.pk for section in objects[1:4]] == [sections[0].pk, sections[1].pk, sections[1].pk]
+    assert objects[0].pk == sections[0].pk
+
+
+@pytest.mark.django_db
+def test_endpoints_with_tenants(api_client, settings, default_hearing, default_organization):
+    url = '/v1/hearing/'
+    section = default_hearing.sections.first()
+    comments_url = get_hearing_detail_url(default_hearing.id, 'sections/%s/comments' % section.id)
+    responses = []
+    for tenant_databases in ({}, {default_organization.pk: 'default'}):
+        settings.DEMOCRACY_TENANT_DATABASES = tenant_databases
+        responses.append([
+            json.loads(api_client.get(path).content.decode('utf-8'))
+            for path in (url, url + default_hearing.pk + '/', url + 'map/', comments_url, '/v1/comment/')
+        ])
+    assert responses[0] == responses[1]
+    assert responses[1][0]['count'] == 1
+
+
+@pytest.mark.django_db
+def test_root_comment_is_written_to_the_database_of_its_section(
+    monkeypatch, john_doe_api_client, settings, default_hearing, default_organization
+):
+    settings.DEMOCRACY_TENANT_DATABASES = {default_organization.pk: 'default'}
+    activated = []
+    monkeypatch.setattr(section_comment_views, 'activate_tenant', activated.append)
+    section = default_hearing.sections.first()
+    data = {'content': 'Hello', 'section': section.pk}
+    response = john_doe_api_client.post('/v1/comment/', data=data)
+    assert response.status_code == 201, response.content
+    assert activated == ['default']
+    assert find_section_database('nonexistent') is None
+
+
+@pytest.mark.django_db
+def test_integer_ids_are_not_looked_up_across_databases(monkeypatch, api_client, settings, default_hearing,
+                                                         default_organization):
+    settings.DEMOCRACY_TENANT_DATABASES = {default_organization.pk: 'default'}
+    monkeypatch.setattr(tenant_views, 'get_databases', lambda: ['default', 'other'])
+    comment = SectionComment.objects.first()
+    assert api_client.get('/v1/comment/%s/' % comment.pk).status_code == 404
+    url = get_hearing_detail_url(default_hearing.id, 'sections/%s/comments/%s' % (comment.section_id, comment.pk))
+    assert api_client.get(url).status_code == 200
@@ -0,0 +1,65 @@
+import re
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from democracy.models import Hearing, Label
+from democracy.models.utils import copy_hearing
+from democracy.tests.utils import get_data_from_response, get_hearing_detail_url
+
+TRANSLATION_TABLE_RE = re.compile(r'FROM "\w+_translation"')
+
+
+def get_translation_queries(context):
+    return [query['sql'] for query in context.captured_queries if TRANSLATION_TABLE_RE.search(query['sql'])]
+
+
+@pytest.mark.django_db
+def test_cache_follows_saved_translations(default_hearing):
+    assert default_hearing.translations_cache['title'] == {'en': 'Default test hearing One'}
+
+    default_hearing.set_current_language('fi')
+    default_hearing.title = 'Suomeksi'
+    default_hearing.save()
+    hearing = Hearing.objects.get(pk=default_hearing.pk)
+    assert hearing.translations_cache['title'] == {'en': 'Default test hearing One', 'fi': 'Suomeksi'}
+    assert hearing.get_cached_translation('title', 'fi') == 'Suomeksi'
+
+    hearing.delete_translation('fi')
+    assert Hearing.objects.get(pk=default_hearing.pk).translations_cache['title'] == {
+        'en': 'Default test hearing One'
+    }
+
+
+@pytest.mark.django_db
+def test_cached_and_uncached_responses_match(api_client, default_hearing, settings):
+    url = get_hearing_detail_url(default_hearing.id)
+    with CaptureQueriesContext(connection) as context:
+        cached = get_data_from_response(api_client.get(url))
+    assert not get_translation_queries(context)
+
+    settings.DEMOCRACY_TRANSLATIONS_CACHE = False
+    uncached = get_data_from_response(api_client.get(url))
+    assert cached == uncached
+
+
+@pytest.mark.django_db
+def test_copied_hearing_has_cache(default_hearing):
+    new_hearing = Hearing.objects.get(pk=copy_hearing(default_hearing).pk)
+    assert new_hearing.translations_cache == default_hearing.translations_cache
+    section = new_hearing.sections.first()
+    assert section.translations_cache['title']['en'] == section.title
+
+
+@pytest.mark.django_db
+def test_rebuild_command(api_client, default_label):
+    Label.objects.update(translations_cache=None)
+    with CaptureQueriesContext(connection) as context:
+        data = get_data_from_response(api_client.get('/v1/label/%d/' % default_label.pk))
+    assert data['label'] == {'en': 'The Label'}
+    assert get_translation_queries(context)
+
+    call_command('democracy_rebuild_translations_cache', missing=True)
+    assert Label.objects.get(pk=default_label.pk).translations_cache == {'label': {'en': 'The Label'}}
@@ -0,0 +1,59 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from democracy.models import Hearing, Organization
+from democracy.visibility import ANONYMOUS, get_cache_key, get_visibility_context
+
+
+@pytest.mark.django_db
+def test_visibility_context_is_computed_once(john_smith, default_organization):
+    with CaptureQueriesContext(connection) as context:
+        for x in range(3):
+            assert get_visibility_context(john_smith).organization_id == default_organization.pk
+    assert len(context.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_visibility_context_follows_admin_changes(john_doe, default_organization):
+    assert get_visibility_context(john_doe).organization_id is None
+    default_organization.admin_users.add(john_doe)
+    assert get_visibility_context(john_doe).organization_id == default_organization.pk
+    john_doe.admin_organizations.clear()
+    assert get_visibility_context(john_doe).organization_id is None
+
+
+@pytest.mark.django_db
+def test_visibility_context_cache(settings, john_smith, default_organization):
+    settings.DEMOCRACY_VISIBILITY_CACHE_TTL = 60
+    assert get_visibility_context(john_smith).organization_id == default_organization.pk
+    other_object = get_user_model().objects.get(pk=john_smith.pk)
+    with CaptureQueriesContext(connection) as context:
+        assert get_visibility_context(other_object).organization_id == default_organization.pk
+    assert not context.captured_queries
+
+    # Other processes find the context by the same key in the shared cache, and the change retires the key
+    stale_key = get_cache_key(john_smith.pk)
+    default_organization.admin_users.remove(john_smith)
+    assert get_cache_key(john_smith.pk) != stale_key
+    assert get_visibility_context(get_user_model().objects.get(pk=john_smith.pk)).organization_id is None
+
+
+@pytest.mark.django_db
+def test_visibility_context_in_hearing_checks(default_hearing, john_smith, default_organization):
+    default_hearing.published = False
+    default_hearing.save()
+    assert not default_hearing.is_visible_for(john_smith)
+    Hearing.objects.filter(pk=default_hearing.pk).update(organization=default_organization)
+    default_hearing.refresh_from_db()
+    assert default_hearing.is_visible_for(john_smith)
+    other = Organization.objects.create(name='Other')
+    other.admin_users.add(john_smith)
+    john_smith.admin_organizations.remove(default_organization)
+    assert not default_hearing.is_visible_for(john_smith)
+
+
+def test_anonymous_visibility_context():
+    from django.contrib.auth.models import AnonymousUser
+    assert get_visibility_context(AnonymousUser()) == ANONYMOUS
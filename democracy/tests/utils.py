@@ -4,7 +4,9 @@ import json
 import os
 from io import BytesIO
 
+import pytest
 from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
 from PIL import Image
 
 from democracy.models.images import BaseImage
@@ -126,3 +128,24 @@ def assert_common_keys_equal(dict1, dict2):
             'v1': dict1[key],
             'v2': dict2[key],
         }
+
+
+def get_benchmark_dir():
+    return os.environ.get('DEMOCRACY_BENCHMARK_DIR')
+
+
+#: Marks wall-clock comparisons, which only run with `DEMOCRACY_BENCHMARK_DIR` set
+benchmark = pytest.mark.skipif(not get_benchmark_dir(), reason='set DEMOCRACY_BENCHMARK_DIR to run benchmarks')
+
+
+def write_benchmark(name, data):
+    """
+    Write benchmark results as `<name>.json` into `DEMOCRACY_BENCHMARK_DIR`, if it is set.
+    """
+    directory = get_benchmark_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    data = dict(data, generated_at=now().isoformat())
+    with open(os.path.join(directory, '%s.json' % name), 'w') as outf:
+        json.dump(data, outf, indent=2)
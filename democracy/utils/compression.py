@@ -0,0 +1,99 @@
+import gzip
+from collections import OrderedDict
+
+import brotli
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+# File name suffixes of the precompressed variants, as expected by e.g. nginx's gzip_static and brotli_static
+ENCODING_SUFFIXES = OrderedDict([
+    ("br", ".br"),
+    ("gzip", ".gz"),
+])
+
+
+def compress(content, encoding):
+    """
+    :type content: bytes
+    :rtype: bytes
+    """
+    if encoding == "br":
+        return brotli.compress(content)
+    if encoding == "gzip":
+        return gzip.compress(content, compresslevel=9)
+    raise ValueError("Unsupported encoding %r" % encoding)
+
+
+def compress_variants(content):
+    """
+    Compress `content` with every encoding, strongest compression first.
+
+    :return: dict of encoding to compressed bytes
+    """
+    return OrderedDict((encoding, compress(content, encoding)) for encoding in ENCODING_SUFFIXES)
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header.
+
+    :return: dict of lowercased coding to quality
+    """
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(header, encodings):
+    """
+    Choose the best of `encodings` (in order of preference) allowed by an Accept-Encoding header.
+
+    :return: the encoding, or None for the uncompressed content
+    """
+    qualities = parse_accept_encoding(header or "")
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def get_precompressed_response(request, content, variants, content_type, vary=("Accept",)):
+    """
+    Build a response with the variant of `content` the request accepts.
+
+    :param content: the uncompressed content
+    :param variants: dict of encoding to compressed content, e.g. from `compress_variants`
+    """
+    encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING"), [e for e in variants if variants[e]])
+    response = HttpResponse(bytes(variants[encoding]) if encoding else content, content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response.precompressed = True
+    patch_vary_headers(response, tuple(vary) + ("Accept-Encoding",))
+    return response
+
+
+def patch_precompressed_vary(response):
+    """
+    Restore Accept-Encoding to the Vary header of a precompressed response.
+
+    DRF's `finalize_response` replaces the Vary header of every response returned by a view.
+    """
+    if getattr(response, "precompressed", False):
+        patch_vary_headers(response, ("Accept-Encoding",))
+    return response
@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+_stats = threading.local()
+
+
+class QueryStats(object):
+    """
+    Count and time the queries executed on this thread while active, on all connections.
+
+    The queries are also counted and timed per SQL template, i.e. the statement as passed to the cursor
+    without its parameters, which only costs a dictionary update per query.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.template_counts = Counter()
+        self.template_seconds = defaultdict(float)
+
+    def add(self, sql, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.template_counts[sql] += 1
+        self.template_seconds[sql] += seconds
+
+    def top_repeated(self, limit=5):
+        """
+        Group the counted templates by normalized SQL, most repeated first, see `top_repeated_queries`.
+        """
+        return group_repeated(
+            ((sql, count, self.template_seconds[sql]) for (sql, count) in self.template_counts.items()), limit
+        )
+
+    def activate(self):
+        for conn in connections.all():
+            install_query_stats(conn)
+        _stats.active = self
+
+    def deactivate(self):
+        if getattr(_stats, "active", None) is self:
+            _stats.active = None
+
+
+class StatsCursorMixin(object):
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, param_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, param_list)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+
+class StatsCursorWrapper(StatsCursorMixin, CursorWrapper):
+    pass
+
+
+class StatsCursorDebugWrapper(StatsCursorMixin, CursorDebugWrapper):
+    pass
+
+
+def record_query(sql, seconds):
+    stats = getattr(_stats, "active", None)
+    if stats is not None:
+        stats.add(sql, seconds)
+
+
+def install_query_stats(conn):
+    """
+    Make the cursors of a connection report to the active `QueryStats`.
+    """
+    # Leaves cursors installed by others (e.g. the N+1 detector, whose cursors report too) alone
+    if "make_cursor" not in conn.__dict__:
+        conn.make_cursor = lambda cursor: StatsCursorWrapper(cursor, conn)
+    if "make_debug_cursor" not in conn.__dict__:
+        conn.make_debug_cursor = lambda cursor: StatsCursorDebugWrapper(cursor, conn)
+
+
+def normalize_sql(sql):
+    """
+    Reduce an executed SQL statement to its template by replacing literals with placeholders.
+
+    Statements that only differ by their parameters (e.g. the queries of an N+1 loop) normalize
+    to the same string.
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def group_repeated(queries, limit):
+    """
+    :param queries: iterable of (sql, count, seconds)
+    """
+    counts = Counter()
+    times = defaultdict(float)
+    for sql, count, seconds in queries:
+        sql = normalize_sql(sql)
+        counts[sql] += count
+        times[sql] += seconds
+    return [
+        {"sql": sql, "count": count, "time": round(times[sql], 6)}
+        for (sql, count) in counts.most_common(limit)
+        if count > 1
+    ]
+
+
+def top_repeated_queries(queries, limit=5):
+    """
+    Group Django query log entries by normalized SQL, most repeated first.
+
+    :param queries: `connection.queries`-style dicts with `sql` and `time` keys
+    :return: list of dicts with `sql`, `count` and `time` (total seconds)
+    """
+    return group_repeated(((query["sql"], 1, float(query["time"])) for query in queries), limit)
+
+
+def supports_window_functions(connection):
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        import sqlite3
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return False
+
+
+def get_top_ids_per_group(queryset, group_field, ordering, limit):
+    """
+    Get the primary keys of the first `limit` rows of `queryset` for each value of `group_field`, in one query.
+
+    Uses `ROW_NUMBER() OVER (PARTITION BY ...)` where the database supports window functions,
+    and a correlated LIMIT subquery elsewhere.
+
+    :param ordering: field names, optionally prefixed with "-" for descending order
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    table = quote(opts.db_table)
+    pk = quote(opts.pk.column)
+    group = quote(opts.get_field(group_field).column)
+    order_by = ", ".join(
+        "%%(alias)s.%s %s" % (quote(opts.get_field(name.lstrip("-")).column), "DESC" if name.startswith("-") else "ASC")
+        for name in list(ordering) + [opts.pk.name]
+    )
+    inner_sql, inner_params = queryset.order_by().values("pk").query.sql_with_params()
+
+    if supports_window_functions(connection):
+        sql = (
+            "SELECT ranked.id FROM ("
+            "SELECT t.{pk} AS id, ROW_NUMBER() OVER (PARTITION BY t.{group} ORDER BY {order_by}) AS group_rank "
+            "FROM {table} t WHERE t.{pk} IN ({inner})"
+            ") ranked WHERE ranked.group_rank <= %s"
+        ).format(pk=pk, group=group, order_by=order_by % {"alias": "t"}, table=table, inner=inner_sql)
+        params = tuple(inner_params) + (limit,)
+    else:
+        sql = (
+            "SELECT t.{pk} FROM {table} t WHERE t.{pk} IN ({inner}) AND t.{pk} IN ("
+            "SELECT u.{pk} FROM {table} u WHERE u.{group} = t.{group} AND u.{pk} IN ({inner}) "
+            "ORDER BY {order_by} LIMIT %s)"
+        ).format(pk=pk, group=group, order_by=order_by % {"alias": "u"}, table=table, inner=inner_sql)
+        params = tuple(inner_params) * 2 + (limit,)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -1,10 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.utils.timezone import now
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
 from democracy.models.base import BaseModel
 from democracy.models.images import BaseImage
-from democracy.views.utils import AbstractSerializerMixin
+from democracy.views.utils import (
+    AbstractSerializerMixin, encode_sync_token, filter_by_hearing_visible, parse_sync_token, SparseFieldsetMixin
+)
+from democracy.visibility import get_visibility_context
 
 
 class UserFieldSerializer(serializers.ModelSerializer):
@@ -25,7 +32,7 @@ class CreatedBySerializer(serializers.ModelSerializer):
     created_by = UserFieldSerializer()
 
 
-class BaseImageSerializer(AbstractSerializerMixin, serializers.ModelSerializer):
+class BaseImageSerializer(SparseFieldsetMixin, AbstractSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Image objects.
     """
@@ -70,3 +77,83 @@ class AdminsSeeUnpublishedMixin(object):
     def _get_user_from_request_or_context(self):
         if hasattr(self, "request"):  # pragma: no branch
             return getattr(self.request, "user", None)
+
+
+class ModifiedSinceMixin(object):
+    """
+    Incremental sync for list endpoints with `?modified_since=<ISO 8601 timestamp or sync token>`.
+
+    Rows modified after the given position are returned in `(modified_at, id)` order, at most `limit`
+    (default `sync_page_size`) at a time. Rows that have been deleted or unpublished since are returned
+    as tombstones (`{"id": ..., "deleted": true, "modified_at": ...}`), if their hearing is visible to
+    the requester. Rows that become visible when their hearing opens are marked modified by
+    `democracy_touch_opened_hearings`. The response's `sync_token` (also in the `X-Sync-Token` header)
+    is the position to continue from; `more` tells whether there are further changes to fetch right away.
+    """
+    sync_page_size = 100
+    sync_max_page_size = 1000
+    #: Lookup from the model to its hearing, '' for hearings
+    sync_hearing_lookup = 'hearing'
+
+    def get_tombstone_queryset(self):
+        """
+        Get the rows that may be reported as deleted; narrowed down in nested endpoints.
+        """
+        queryset = self.model.objects.everything(Q(deleted=True) | Q(published=False))
+        if self.sync_hearing_lookup:
+            return filter_by_hearing_visible(queryset, self.request, self.sync_hearing_lookup)
+        # The tombstones are the hearings themselves. Those of hearings that were never public stay hidden
+        # from anonymous users, which only get told about public hearings that have been deleted.
+        context = get_visibility_context(self.request.user)
+        if context.is_superuser:
+            return queryset
+        if context.organization_id:
+            return queryset.filter(organization=context.organization_id)
+        return queryset.filter(published=True, open_at__lte=now())
+
+    def _get_sync_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.sync_page_size))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer'})
+        return max(1, min(limit, self.sync_max_page_size))
+
+    def list(self, request, *args, **kwargs):
+        if 'modified_since' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        modified_since, last_pk = parse_sync_token(request.query_params['modified_since'])
+        limit = self._get_sync_limit()
+
+        if last_pk is None:
+            window = Q(modified_at__gt=modified_since)
+        else:
+            window = Q(modified_at__gt=modified_since) | Q(modified_at=modified_since, pk__gt=last_pk)
+        live = self.filter_queryset(self.get_queryset())
+        rows = list(live.filter(window).order_by('modified_at', 'pk')[:limit + 1])
+        tombstones = list(
+            self.get_tombstone_queryset().filter(window).exclude(
+                pk__in=live.values('pk')
+            ).order_by('modified_at', 'pk').values('pk', 'modified_at')[:limit + 1]
+        )
+
+        changes = sorted(
+            [(row.modified_at, row.pk, row) for row in rows] +
+            [(tombstone['modified_at'], tombstone['pk'], None) for tombstone in tombstones],
+            key=lambda change: change[:2]
+        )
+        more = len(changes) > limit
+        changes = changes[:limit]
+
+        serialized = self.get_serializer([change[2] for change in changes if change[2] is not None], many=True).data
+        serialized = iter(serialized)
+        results = [
+            next(serialized) if change[2] is not None else {'id': change[1], 'deleted': True, 'modified_at': change[0]}
+            for change in changes
+        ]
+        if changes:
+            sync_token = encode_sync_token(*changes[-1][:2])
+        else:
+            sync_token = request.query_params['modified_since']
+        response = Response({'results': results, 'sync_token': sync_token, 'more': more})
+        response['X-Sync-Token'] = sync_token
+        return response
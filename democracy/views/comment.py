@@ -8,14 +8,17 @@ from rest_framework.decorators import detail_route
 from reversion import revisions
 
 from democracy.models.comment import BaseComment
-from democracy.views.base import AdminsSeeUnpublishedMixin, CreatedBySerializer
-from democracy.views.utils import AbstractSerializerMixin
+from democracy.views.base import AdminsSeeUnpublishedMixin, CreatedBySerializer, ModifiedSinceMixin
+from democracy.views.fast import FastListMixin
+from democracy.views.tenants import TenantMixin
+from democracy.views.utils import AbstractSerializerMixin, SparseFieldsetMixin
 
 COMMENT_FIELDS = ['id', 'content', 'author_name', 'n_votes', 'created_at', 'is_registered', 'can_edit',
                   'geojson', 'images', 'label']
 
 
-class BaseCommentSerializer(AbstractSerializerMixin, CreatedBySerializer, serializers.ModelSerializer):
+class BaseCommentSerializer(SparseFieldsetMixin, AbstractSerializerMixin, CreatedBySerializer,
+                            serializers.ModelSerializer):
     is_registered = serializers.SerializerMethodField()
     can_edit = serializers.SerializerMethodField()
 
@@ -23,7 +26,7 @@ class BaseCommentSerializer(AbstractSerializerMixin, CreatedBySerializer, serial
         r = super().to_representation(instance)
         request = self.context.get('request', None)
         if request:
-            if request.GET.get('include', None) == 'plugin_data':
+            if request.GET.get('include', None) == 'plugin_data' and self.is_field_requested('plugin_data'):
                 r['plugin_data'] = instance.plugin_data
         return r
 
@@ -49,7 +52,9 @@ class BaseCommentFilter(django_filters.FilterSet):
         fields = ['authorization_code', ]
 
 
-class BaseCommentViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
+class BaseCommentViewSet(
+    AdminsSeeUnpublishedMixin, ModifiedSinceMixin, TenantMixin, FastListMixin, viewsets.ModelViewSet
+):
     """
     Base viewset for comments.
     """
@@ -87,6 +92,13 @@ class BaseCommentViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
         queryset = super().get_queryset()
         return queryset.filter(**{queryset.model.parent_field: self.get_comment_parent_id()})
 
+    def get_tombstone_queryset(self):
+        queryset = super().get_tombstone_queryset()
+        parent_id = self.get_comment_parent_id()
+        if parent_id:
+            queryset = queryset.filter(**{queryset.model.parent_field: parent_id})
+        return queryset
+
     def _check_may_comment(self, request):
         parent = self.get_comment_parent()
         try:
@@ -2,9 +2,10 @@ from rest_framework import serializers, viewsets
 
 from democracy.models import ContactPerson
 from democracy.pagination import DefaultLimitPagination
+from democracy.views.utils import SparseFieldsetMixin
 
 
-class ContactPersonSerializer(serializers.ModelSerializer):
+class ContactPersonSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     organization = serializers.SlugRelatedField('name', read_only=True)
 
     class Meta:
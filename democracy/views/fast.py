@@ -0,0 +1,293 @@
+"""
+Fast read-only serialization for hot list endpoints.
+
+A `FastSerializer` renders the same output as the DRF serializer it mirrors, but from `values()` rows
+instead of model instances. The per-field work is compiled once per request into a tuple of
+`(field name, extractor)` pairs: plain columns go straight through the DRF field's own
+`to_representation`, and everything else is an `extract_<field name>` method reading data that
+`prepare()` batch-loads for the whole page.
+
+Rows whose output cannot be reproduced exactly from the rows (e.g. without a translations cache) raise
+`Fallback` and are rendered by the DRF serializer instead.
+"""
+import json
+import uuid
+from collections import OrderedDict
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.http import StreamingHttpResponse
+from django.utils.translation import get_language
+from parler import appsettings as parler_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from democracy.views.utils import get_translated_values, get_translations, get_translations_cache
+
+
+class Fallback(Exception):
+    """
+    Raised by an extractor when a row has to be rendered by the DRF serializer.
+    """
+
+
+class TranslationsRecord(object):
+    """
+    Stand-in for a translatable instance in the translation helpers of `democracy.views.utils`.
+    """
+    __slots__ = ('translations_cache',)
+
+    def __init__(self, translations_cache):
+        self.translations_cache = translations_cache
+
+
+def make_value_extractor(field, lookup):
+    to_representation = field.to_representation
+
+    def extract(row):
+        value = row[lookup]
+        return None if value is None else to_representation(value)
+    return extract
+
+
+def load_json(model, field_name, value):
+    # `values()` returns the text of `jsonfield.JSONField` columns as is
+    if isinstance(value, str):
+        return json.loads(value, **model._meta.get_field(field_name).load_kwargs)
+    return value
+
+
+class FastSerializer(object):
+    #: The DRF serializer whose output is reproduced
+    serializer_class = None
+    #: Output field name to `values()` lookup, for fields rendered by the DRF field from a single column
+    value_fields = {}
+    #: Further `values()` lookups needed by the extractors
+    extra_lookups = ()
+    #: Lookups of JSON columns
+    json_lookups = ()
+
+    def __init__(self, queryset, context):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.context = context
+        self.request = context.get('request')
+        self.serializer = self.serializer_class(context=context)
+        self.translated_fields = (
+            self.serializer.get_translated_fields() if hasattr(self.serializer, 'get_translated_fields') else []
+        )
+        self.extractors = self.compile()
+
+    def compile(self):
+        extractors = []
+        for field in self.serializer._readable_fields:
+            name = field.field_name
+            extract = getattr(self, 'extract_%s' % name, None)
+            if extract is None and name in self.translated_fields:
+                extract = self.extract_translated
+            if extract is None and name in self.value_fields:
+                extract = make_value_extractor(field, self.value_fields[name])
+            if extract is None:
+                raise ImproperlyConfigured('%s has no extractor for %s' % (type(self).__name__, name))
+            extractors.append((name, extract))
+        return tuple(extractors)
+
+    def get_lookups(self):
+        lookups = set(self.value_fields.values()) | set(self.extra_lookups) | set(self.json_lookups)
+        if self.translated_fields:
+            lookups.add('translations_cache')
+        return ['pk'] + sorted(lookups - {'pk'})
+
+    def get_rows(self):
+        """
+        Get the `values()` queryset to paginate and pass to `serialize`.
+        """
+        return self.queryset.prefetch_related(None).values(*self.get_lookups())
+
+    def prepare(self, rows):
+        """
+        Batch load the related data of a page of rows.
+        """
+
+    def serialize(self, rows):
+        rows = list(rows)
+        for row in rows:
+            for lookup in self.json_lookups + (('translations_cache',) if self.translated_fields else ()):
+                row[lookup] = load_json(self.model, lookup.split('__')[0], row[lookup])
+        self.prepare(rows)
+        data = []
+        fallbacks = {}
+        for index, row in enumerate(rows):
+            try:
+                data.append(self.render(row))
+            except Fallback:
+                data.append(None)
+                fallbacks[row['pk']] = index
+        if fallbacks:
+            for instance in self.get_fallback_queryset(fallbacks):
+                data[fallbacks[instance.pk]] = self.serializer_class(instance, context=self.context).data
+        return data
+
+    def get_fallback_queryset(self, pks):
+        queryset = self.queryset if self.queryset.query.can_filter() else self.model._base_manager.all()
+        return queryset.filter(pk__in=list(pks))
+
+    def render(self, row):
+        ret = OrderedDict()
+        for name, extract in self.extractors:
+            ret[name] = extract(row)
+        if self.translated_fields:
+            self.render_translations(ret, row)
+        return ret
+
+    def extract_translated(self, row):
+        # Replaced by `render_translations`; the DRF serializer renders a placeholder at this position too
+        return None
+
+    def render_translations(self, ret, row):
+        """
+        Fill in the translated fields the way `TranslatableSerializer.to_representation` does.
+        """
+        record = TranslationsRecord(row['translations_cache'])
+        if get_translations_cache(record) is None:
+            raise Fallback()  # The helpers would read the translation table
+        active_languages = parler_settings.PARLER_LANGUAGES.get_active_choices(get_language())
+        for field in self.translated_fields:
+            # Without a translation in the active languages, the placeholder field would be left out
+            if not any(language in record.translations_cache.get(field, {}) for language in active_languages):
+                raise Fallback()
+        language = self.serializer.get_response_language()
+        if language:
+            values = get_translated_values(record, self.translated_fields, language)
+            if len(values) < len(self.translated_fields):
+                raise Fallback()  # The placeholder value would be left in
+            ret.update(values)
+            return
+        translations = get_translations(record, self.translated_fields, self.serializer.Meta.translation_lang)
+        for field, values in translations.items():
+            if not values:
+                raise Fallback()
+            for lang_code, value in values.items():
+                self.serializer._update_lang(ret, field, value, lang_code)
+
+
+def iter_chunks(iterator, size):
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_pk_chunks(queryset, size):
+    """
+    Yield the primary keys of `queryset` in order, in chunks of `size`, holding one chunk in memory at a time.
+
+    psycopg2 buffers the whole result of a regular cursor on the client, so on PostgreSQL
+    the keys are read from a server-side cursor instead.
+    """
+    pks = queryset.values_list('pk', flat=True)
+    connection = connections[pks.db]
+    if connection.vendor != 'postgresql':
+        yield from iter_chunks(pks.iterator(), size)
+        return
+    try:
+        sql, params = pks.query.get_compiler(using=pks.db).as_sql()
+    except EmptyResultSet:
+        return
+    connection.ensure_connection()
+    # `withhold` keeps the cursor open past the end of the request's transaction, while the response streams
+    cursor = connection.connection.cursor(name='democracy_stream_%s' % uuid.uuid4().hex, withhold=True)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield [row[0] for row in rows]
+    finally:
+        cursor.close()
+
+
+def stream_json_list(renderer, chunks, accepted_media_type, renderer_context):
+    """
+    Render a list given in chunks as the same bytes `renderer` would render the whole list as.
+
+    Only valid for renderers without indentation, where a list is `[` + comma separated items + `]`.
+    """
+    yield b'['
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not first:
+            yield b','
+        yield renderer.render(chunk, accepted_media_type, renderer_context)[1:-1]
+        first = False
+    yield b']'
+
+
+class FastListMixin(object):
+    """
+    Render list responses with `fast_serializer_class` when it mirrors the serializer of the request.
+
+    Unpaginated lists longer than `stream_chunk_size` are serialized and sent in chunks of that size,
+    so that neither the rows nor the response are ever held in memory as a whole. After the first
+    chunk, the primary keys of the rest of the list are read in chunks (see `iter_pk_chunks`) and
+    each chunk of rows is loaded by its keys.
+    """
+    fast_serializer_class = None
+    stream_chunk_size = 500
+
+    def get_fast_serializer(self, queryset):
+        fast_serializer_class = self.fast_serializer_class
+        if not (fast_serializer_class and getattr(settings, 'DEMOCRACY_FAST_SERIALIZERS', True)):
+            return None
+        if fast_serializer_class.serializer_class is not self.get_serializer_class():
+            return None
+        return fast_serializer_class(queryset, self.get_serializer_context())
+
+    def is_streamable(self):
+        renderer = self.request.accepted_renderer
+        return (
+            getattr(settings, 'DEMOCRACY_STREAM_LISTS', True) and
+            type(renderer) is JSONRenderer and
+            renderer.get_indent(self.request.accepted_media_type, self.get_renderer_context()) is None
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fast_serializer = self.get_fast_serializer(queryset)
+        if fast_serializer is None:
+            rows = queryset
+
+            def serialize(chunk):
+                return self.get_serializer(chunk, many=True).data
+        else:
+            rows = fast_serializer.get_rows()
+            serialize = fast_serializer.serialize
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+        if not (rows.query.can_filter() and self.is_streamable()):
+            return Response(serialize(rows))
+        first_chunk = list(rows[:self.stream_chunk_size])
+        if len(first_chunk) < self.stream_chunk_size:
+            return Response(serialize(first_chunk))
+        # The chunks are loaded with the ordering of `rows`, so each comes back in the order of its keys
+        pk_chunks = iter_pk_chunks(rows[self.stream_chunk_size:], self.stream_chunk_size)
+        rest = (rows.filter(pk__in=pks) for pks in pk_chunks)
+        return self.get_streaming_response(serialize(chunk) for chunk in chain([first_chunk], rest))
+
+    def get_streaming_response(self, chunks):
+        renderer = self.request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:  # pragma: no cover
+            content_type += '; charset=%s' % renderer.charset
+        return StreamingHttpResponse(
+            stream_json_list(renderer, chunks, self.request.accepted_media_type, self.get_renderer_context()),
+            content_type=content_type,
+        )
@@ -3,23 +3,38 @@ import django_filters
 import datetime
 
 from django.conf import settings
-from django.db import transaction
 from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework import filters, permissions, response, serializers, status, viewsets
 from rest_framework.decorators import detail_route, list_route
 from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.fields import JSONField
 
 from democracy.enums import InitialSectionType
-from democracy.models import ContactPerson, Hearing, Label, Section, SectionImage
+from democracy.models import ContactPerson, Hearing, Label, Section, SectionComment, SectionImage
+from democracy.models.section import get_section_type_id
 from democracy.pagination import DefaultLimitPagination
-from democracy.views.base import AdminsSeeUnpublishedMixin
+from democracy.snapshots import get_snapshot_redirect
+from democracy.streaming import EventStreamRenderer, event_stream
+from democracy.tenants import activate_tenant, get_organization_database, get_tenant_databases, tenant_atomic
+from democracy.visibility import get_visibility_context
+from democracy.views.base import AdminsSeeUnpublishedMixin, ModifiedSinceMixin
 from democracy.views.contact_person import ContactPersonSerializer
+from democracy.views.fast import Fallback, FastListMixin, FastSerializer, TranslationsRecord, load_json
+from democracy.views.hearing_document import get_document_response, is_document_request, queue_document
 from democracy.views.label import LabelSerializer
+from democracy.views.response_cache import cache_response, get_cached_response, is_cacheable_request
+from democracy.utils.compression import patch_precompressed_vary
+from democracy.utils.sql import get_top_ids_per_group
 from democracy.views.section import (
     SectionCreateUpdateSerializer, SectionFieldSerializer, SectionImageSerializer, SectionSerializer
 )
-from democracy.views.utils import TranslatableSerializer
+from democracy.views.section_comment import SectionCommentSerializer
+from democracy.views.tenants import FanOutList, TenantMixin
+from democracy.views.utils import (
+    get_translated_values, get_translations, get_translations_cache, is_field_requested, parse_expand,
+    SparseFieldsetMixin, TranslatableSerializer
+)
 from .hearing_report import HearingReport
 from .utils import NestedPKRelatedField, filter_by_hearing_visible
 
@@ -115,16 +130,19 @@ class HearingCreateUpdateSerializer(serializers.ModelSerializer, TranslatableSer
             sections.add(section)
         return sections
 
-    @transaction.atomic()
     def create(self, validated_data):
-        sections_data = validated_data.pop('sections')
-        validated_data['organization'] = self.context['request'].user.get_default_organization()
-        hearing = super().create(validated_data)
-        self._create_or_update_sections(hearing, sections_data, force_create=True)
-        return hearing
+        with tenant_atomic():
+            sections_data = validated_data.pop('sections')
+            validated_data['organization'] = self.context['request'].user.get_default_organization()
+            hearing = super().create(validated_data)
+            self._create_or_update_sections(hearing, sections_data, force_create=True)
+            return hearing
 
-    @transaction.atomic()
     def update(self, instance, validated_data):
+        with tenant_atomic():
+            return self._update(instance, validated_data)
+
+    def _update(self, instance, validated_data):
         """
         Handle Hearing update and it's sections create/update/delete.
 
@@ -133,7 +151,7 @@ class HearingCreateUpdateSerializer(serializers.ModelSerializer, TranslatableSer
           * If a section with given id exists, update it.
           * Old sections whose ids aren't matched are (soft) deleted.
         """
-        if instance.organization != self.context['request'].user.get_default_organization():
+        if instance.organization_id != get_visibility_context(self.context['request'].user).organization_id:
             raise PermissionDenied('User cannot update hearings from different organizations.')
 
         if self.partial:
@@ -181,7 +199,7 @@ class HearingCreateUpdateSerializer(serializers.ModelSerializer, TranslatableSer
         return data
 
 
-class HearingSerializer(serializers.ModelSerializer, TranslatableSerializer):
+class HearingSerializer(SparseFieldsetMixin, serializers.ModelSerializer, TranslatableSerializer):
     labels = LabelSerializer(many=True, read_only=True)
     sections = serializers.SerializerMethodField()
     geojson = JSONField()
@@ -202,20 +220,16 @@ class HearingSerializer(serializers.ModelSerializer, TranslatableSerializer):
         main_section = self._get_main_section(hearing)
         if not main_section:
             return ''
-        translations = {
-            t.language_code: t.abstract for t in
-            main_section.translations.filter(language_code__in=self.Meta.translation_lang)
-        }
-        abstract = {}
-        for lang_code, translation in translations.items():
-            if translation:
-                abstract[lang_code] = translation
-        return abstract
+        language = self.get_response_language()
+        if language:
+            return get_translated_values(main_section, ['abstract'], language).get('abstract', '')
+        translations = get_translations(main_section, ['abstract'], self.Meta.translation_lang)['abstract']
+        return {lang_code: abstract for (lang_code, abstract) in translations.items() if abstract}
 
     def get_sections(self, hearing):
         queryset = hearing.sections.all()
         if not hearing.closed:
-            queryset = queryset.exclude(type__identifier=InitialSectionType.CLOSURE_INFO)
+            queryset = queryset.exclude(type_id=get_section_type_id(InitialSectionType.CLOSURE_INFO))
 
         serializer = SectionFieldSerializer(many=True, read_only=True)
         serializer.bind('sections', self)  # this is needed to get context in the serializer
@@ -224,7 +238,7 @@ class HearingSerializer(serializers.ModelSerializer, TranslatableSerializer):
     def get_main_image(self, hearing):
         main_image = SectionImage.objects.filter(
             section__hearing=hearing,
-            section__type__identifier='main'
+            section__type_id=get_section_type_id(InitialSectionType.MAIN)
         ).first()
 
         if not main_image:
@@ -263,6 +277,146 @@ class HearingListSerializer(HearingSerializer):
         return fields
 
 
+class HearingRecord(object):
+    """
+    The parts of a hearing used by the `HearingSerializer` methods, for `FastHearingListSerializer`.
+    """
+    __slots__ = ('force_closed', 'open_at', 'close_at', 'main_section_list')
+    closed = Hearing.closed
+
+    def __init__(self, row, main_section):
+        self.force_closed = row['force_closed']
+        self.open_at = row['open_at']
+        self.close_at = row['close_at']
+        self.main_section_list = [main_section] if main_section else []
+
+    def get_main_section(self):
+        return None  # The main sections of the page are all loaded by `prepare`
+
+
+class SectionRecord(TranslationsRecord):
+    __slots__ = ('plugin_fullscreen',)
+
+    def __init__(self, row):
+        super().__init__(row['translations_cache'])
+        self.plugin_fullscreen = row['plugin_fullscreen']
+
+
+class FastHearingListSerializer(FastSerializer):
+    """
+    `HearingListSerializer` from `values()` rows.
+
+    The labels and contact persons of a hearing are listed in the order they were added, which is the
+    order the unordered relation queries of `HearingListSerializer` return them in.
+    """
+    serializer_class = HearingListSerializer
+    value_fields = {
+        'id': 'id',
+        'n_comments': 'n_comments',
+        'published': 'published',
+        'open_at': 'open_at',
+        'close_at': 'close_at',
+        'created_at': 'created_at',
+        'servicemap_url': 'servicemap_url',
+        'geojson': 'geojson',
+        'slug': 'slug',
+    }
+    extra_lookups = ('force_closed', 'organization__name')
+    json_lookups = ('geojson',)
+
+    def prepare(self, rows):
+        # Only load the data of the fields left in by `fields` and `omit`
+        names = {name for (name, extract) in self.extractors}
+        hearing_ids = [row['pk'] for row in rows]
+        self.main_sections = self.labels = self.contact_persons = self.main_images = {}
+        if names & {'abstract', 'default_to_fullscreen'}:
+            self.main_sections = self._get_main_sections(hearing_ids)
+        if 'labels' in names:
+            self.labels = self._get_related(
+                hearing_ids, Hearing.labels.through, 'label', Label._default_manager.all(), LabelSerializer
+            )
+        if 'contact_persons' in names:
+            self.contact_persons = self._get_related(
+                hearing_ids, Hearing.contact_persons.through, 'contactperson',
+                ContactPerson._default_manager.select_related('organization'), ContactPersonSerializer
+            )
+        if 'main_image' in names:
+            self.main_images = self._get_main_images(hearing_ids)
+
+    def _get_main_sections(self, hearing_ids):
+        main_sections = {}
+        for section in Section.objects.filter(
+            hearing__in=hearing_ids, type_id=get_section_type_id(InitialSectionType.MAIN)
+        ).values('hearing', 'translations_cache', 'plugin_fullscreen'):
+            section['translations_cache'] = load_json(Section, 'translations_cache', section['translations_cache'])
+            main_sections.setdefault(section['hearing'], SectionRecord(section))
+        return main_sections
+
+    def _get_related(self, hearing_ids, through, target, queryset, serializer_class):
+        """
+        Serialize a many-to-many relation of the hearings.
+
+        :return: dict of hearing id to a list of serialized objects
+        """
+        pairs = list(through.objects.filter(hearing__in=hearing_ids).order_by('pk').values_list('hearing', target))
+        objects = list(queryset.filter(pk__in={target_id for (_, target_id) in pairs}))
+        serialized = dict(zip(
+            [obj.pk for obj in objects], serializer_class(objects, many=True, context=self.context).data
+        ))
+        related = defaultdict(list)
+        for hearing_id, target_id in pairs:
+            if target_id in serialized:
+                related[hearing_id].append(serialized[target_id])
+        return related
+
+    def _get_main_images(self, hearing_ids):
+        """
+        Serialize the first image of each hearing's main section, like `HearingSerializer.get_main_image`.
+        """
+        first_image_ids = {}
+        for image_id, hearing_id in SectionImage.objects.filter(
+            section__hearing__in=hearing_ids, section__type_id=get_section_type_id(InitialSectionType.MAIN)
+        ).values_list('pk', 'section__hearing'):
+            first_image_ids.setdefault(hearing_id, image_id)
+        images = SectionImage.objects.in_bulk(list(first_image_ids.values()))
+        visible = [
+            image for image in images.values() if image.published or self.context['request'].user.is_superuser
+        ]
+        serialized = dict(zip(
+            [image.pk for image in visible], SectionImageSerializer(visible, many=True, context=self.context).data
+        ))
+        return {hearing_id: serialized.get(image_id) for (hearing_id, image_id) in first_image_ids.items()}
+
+    def get_record(self, row):
+        if '_record' not in row:
+            row['_record'] = HearingRecord(row, self.main_sections.get(row['pk']))
+        return row['_record']
+
+    def extract_abstract(self, row):
+        record = self.get_record(row)
+        if record.main_section_list and get_translations_cache(record.main_section_list[0]) is None:
+            raise Fallback()
+        return self.serializer.get_abstract(record)
+
+    def extract_closed(self, row):
+        return self.get_record(row).closed
+
+    def extract_organization(self, row):
+        return row['organization__name']
+
+    def extract_labels(self, row):
+        return self.labels.get(row['pk'], [])
+
+    def extract_contact_persons(self, row):
+        return self.contact_persons.get(row['pk'], [])
+
+    def extract_main_image(self, row):
+        return self.main_images.get(row['pk'])
+
+    def extract_default_to_fullscreen(self, row):
+        return self.serializer.get_default_to_fullscreen(self.get_record(row))
+
+
 class HearingMapSerializer(serializers.ModelSerializer, TranslatableSerializer):
     geojson = JSONField()
 
@@ -273,7 +427,16 @@ class HearingMapSerializer(serializers.ModelSerializer, TranslatableSerializer):
         ]
 
 
-class HearingViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
+HEARING_EXPANSIONS = {
+    'comments': {'limit', 'ordering'},
+    'user_votes': set(),
+}
+EXPANDED_COMMENTS_DEFAULT_LIMIT = 5
+EXPANDED_COMMENTS_MAX_LIMIT = 50
+EXPANDED_COMMENTS_ORDERING_FIELDS = ('created_at', 'n_votes')
+
+
+class HearingViewSet(AdminsSeeUnpublishedMixin, ModifiedSinceMixin, TenantMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint for hearings.
     """
@@ -282,10 +445,17 @@ class HearingViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     pagination_class = DefaultLimitPagination
     serializer_class = HearingListSerializer
+    fast_serializer_class = FastHearingListSerializer
 
     ordering_fields = ('created_at', 'close_at', 'open_at', 'n_comments')
     ordering = ('-created_at',)
     filter_class = HearingFilter
+    # Serve plain anonymous detail requests from pre-rendered documents, see `hearing_document`
+    use_hearing_documents = True
+    # Redirect anonymous requests for closed hearings to their static snapshots, see `democracy.snapshots`
+    use_snapshots = True
+    tenant_hearing_kwarg = 'pk'
+    sync_hearing_lookup = ''
 
     def get_serializer_class(self, *args, **kwargs):
         if self.action == 'list':
@@ -295,6 +465,10 @@ class HearingViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
 
         return HearingSerializer
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return patch_precompressed_vary(response)
+
     def filter_queryset(self, queryset):
         next_closing = self.request.query_params.get('next_closing', None)
         open = self.request.query_params.get('open', None)
@@ -312,28 +486,28 @@ class HearingViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
         queryset = super().filter_queryset(queryset)
         return queryset
 
-    def get_queryset(self):
-        queryset = filter_by_hearing_visible(Hearing.objects.with_unpublished(), self.request,
-                                             hearing_lookup='').prefetch_related(
+    def _prefetch_main_section(self, queryset):
+        # The main section is only needed for the fields derived from it
+        if self.action == 'map' or not any(
+            is_field_requested(self, field) for field in ('abstract', 'default_to_fullscreen')
+        ):
+            return queryset
+        return queryset.prefetch_related(
             Prefetch(
                 'sections',
-                queryset=Section.objects.filter(type__identifier='main'),
+                queryset=Section.objects.filter(type_id=get_section_type_id(InitialSectionType.MAIN)),
                 to_attr='main_section_list'
             )
         )
-        return queryset
+
+    def get_queryset(self):
+        queryset = filter_by_hearing_visible(Hearing.objects.with_unpublished(), self.request, hearing_lookup='')
+        return self._prefetch_main_section(queryset)
 
     def get_object(self):
         id_or_slug = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
 
-        queryset = self.filter_queryset(Hearing.objects.with_unpublished())
-        queryset = queryset.prefetch_related(
-            Prefetch(
-                'sections',
-                queryset=Section.objects.filter(type__identifier='main'),
-                to_attr='main_section_list'
-            )
-        )
+        queryset = self._prefetch_main_section(self.filter_queryset(Hearing.objects.with_unpublished()))
 
         try:
             obj = queryset.get_by_id_or_slug(id_or_slug)
@@ -355,6 +529,74 @@ class HearingViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
         self.check_object_permissions(self.request, obj)
         return obj
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Hearing detail, optionally expanded with
+        `?expand=comments(limit=<n>,ordering=<field>),user_votes`:
+
+        * `comments` adds the top comments of every section to the sections
+        * `user_votes` adds the ids of the hearing's comments the current user has voted for
+        """
+        id_or_slug = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if self.use_snapshots and not request.GET:
+            snapshot_response = get_snapshot_redirect(request, id_or_slug, 'hearing.json')
+            if snapshot_response is not None:
+                return snapshot_response
+        use_document = self.use_hearing_documents and is_document_request(request)
+        if use_document:
+            document_response = get_document_response(request, id_or_slug)
+            if document_response is not None:
+                return document_response
+        expand = parse_expand(request.GET.get('expand'), HEARING_EXPANSIONS)
+        hearing = self.get_object()
+        data = self.get_serializer(hearing).data
+        if use_document:
+            queue_document(request, hearing)
+        if 'comments' in expand and 'sections' in data:
+            self._expand_comments(data['sections'], **expand['comments'])
+        if 'user_votes' in expand:
+            data['user_votes'] = self._get_user_votes(hearing)
+        return response.Response(data)
+
+    def _get_visible_comments(self):
+        user = self.request.user
+        if user.is_authenticated() and user.is_superuser:
+            return SectionComment.objects.with_unpublished()
+        return SectionComment.objects.public()
+
+    def _expand_comments(self, sections, limit=EXPANDED_COMMENTS_DEFAULT_LIMIT, ordering='-n_votes'):
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({'expand': 'comments limit must be an integer'})
+        if not 0 < limit <= EXPANDED_COMMENTS_MAX_LIMIT:
+            raise ValidationError({'expand': 'comments limit must be between 1 and %d' % EXPANDED_COMMENTS_MAX_LIMIT})
+        if ordering.lstrip('-') not in EXPANDED_COMMENTS_ORDERING_FIELDS:
+            raise ValidationError({'expand': 'comments can be ordered by %s' % ', '.join(
+                EXPANDED_COMMENTS_ORDERING_FIELDS
+            )})
+
+        section_comments = self._get_visible_comments().filter(section__in=[section['id'] for section in sections])
+        top_ids = get_top_ids_per_group(section_comments, 'section', [ordering], limit)
+        comments = SectionComment.objects.filter(pk__in=top_ids).select_related(
+            'created_by', 'label'
+        ).prefetch_related('images').order_by(ordering, 'pk')
+        serialized = SectionCommentSerializer(comments, many=True, context=self.get_serializer_context()).data
+
+        comments_by_section = defaultdict(list)
+        for comment in serialized:
+            comments_by_section[comment['section']].append(comment)
+        for section in sections:
+            section['comments'] = comments_by_section[section['id']]
+
+    def _get_user_votes(self, hearing):
+        user = self.request.user
+        if not user.is_authenticated():
+            return []
+        return list(
+            self._get_visible_comments().filter(section__hearing=hearing, voters=user).values_list('pk', flat=True)
+        )
+
     @detail_route(methods=['post'])
     def follow(self, request, pk=None):
         hearing = self.get_object()
@@ -381,29 +623,62 @@ class HearingViewSet(AdminsSeeUnpublishedMixin, viewsets.ModelViewSet):
 
     @detail_route(methods=['get'])
     def report(self, request, pk=None):
-        report = HearingReport(HearingSerializer(self.get_object(), context=self.get_serializer_context()).data)
+        if self.use_snapshots:
+            snapshot_response = get_snapshot_redirect(request, pk, 'report.xlsx')
+            if snapshot_response is not None:
+                return snapshot_response
+        context = self.get_serializer_context()
+        context['lang'] = None  # The report has columns for all languages
+        report = HearingReport(HearingSerializer(self.get_object(), context=context).data)
         return report.get_response()
 
+    @detail_route(methods=['get'], renderer_classes=[EventStreamRenderer])
+    def stream(self, request, pk=None):
+        hearing = self.get_object()
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            raise ValidationError({'last_event_id': 'Must be an integer'})
+        resp = StreamingHttpResponse(
+            event_stream(hearing.pk, last_event_id, include_unpublished=request.user.is_superuser),
+            content_type='text/event-stream',
+        )
+        resp['Cache-Control'] = 'no-cache'
+        resp['X-Accel-Buffering'] = 'no'
+        return resp
+
     @list_route(methods=['get'])
     def map(self, request):
+        cacheable = is_cacheable_request(request)
+        if cacheable:
+            cached_response = get_cached_response(request, 'hearing-map')
+            if cached_response is not None:
+                return cached_response
         queryset = self.filter_queryset(self.get_queryset())
+        if self.is_cross_tenant():
+            queryset = FanOutList(queryset)
 
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = HearingMapSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = HearingMapSerializer(queryset, many=True)
-        return response.Response(serializer.data)
+            resp = self.get_paginated_response(serializer.data)
+        else:
+            serializer = HearingMapSerializer(queryset, many=True)
+            resp = response.Response(serializer.data)
+        return cache_response(request, 'hearing-map', resp) if cacheable else resp
 
     def create(self, request):
-        if not request.user or not request.user.get_default_organization():
+        organization_id = get_visibility_context(request.user).organization_id
+        if not organization_id:
             return response.Response({'status': 'User without organization cannot POST hearings.'},
                                      status=status.HTTP_403_FORBIDDEN)
+        if get_tenant_databases():
+            activate_tenant(get_organization_database(organization_id))
         return super().create(request)
 
     def update(self, request, pk=None, partial=False):
-        if not request.user or not request.user.get_default_organization():
+        if not get_visibility_context(request.user).organization_id:
             return response.Response({'status': 'User without organization cannot PUT hearings.'},
                                      status=status.HTTP_403_FORBIDDEN)
         return super().update(request, pk=pk, partial=partial)
@@ -0,0 +1,154 @@
+"""
+Serving hearing details from pre-rendered `HearingDocument`s.
+
+Plain anonymous JSON requests for a hearing detail are answered with the stored document when a
+fresh one exists. Otherwise the detail is rendered live as usual and a document is queued for the
+hearing; `democracy_render_hearing_documents` renders the queue and stores precompressed variants
+of each document, which are served according to the request's Accept-Encoding.
+"""
+import json
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils.timezone import now
+
+from democracy.models import Hearing, HearingDocument
+from democracy.models.documents import get_counter_delay
+from democracy.tenants import get_databases, tenant_atomic, using_tenant
+from democracy.utils.compression import compress_variants, get_precompressed_response
+from democracy.views.utils import render_anonymous_request
+
+logger = logging.getLogger(__name__)
+
+
+def get_base_url(request):
+    return request.build_absolute_uri('/').rstrip('/')
+
+
+def is_document_request(request):
+    """
+    Whether the response to the request may be served from and stored as a hearing document.
+    """
+    return (
+        getattr(settings, 'DEMOCRACY_HEARING_DOCUMENTS', True) and
+        request.method == 'GET' and
+        not request.GET and
+        not request.user.is_authenticated() and
+        request.accepted_renderer.format == 'json'
+    )
+
+
+def get_document_response(request, id_or_slug):
+    """
+    Get a response with the stored document of the hearing, or None if there is no fresh document.
+    """
+    document = HearingDocument.objects.fresh().filter(
+        Q(hearing_id=id_or_slug) | Q(hearing__slug=id_or_slug),
+        visibility=HearingDocument.ANONYMOUS,
+        base_url=get_base_url(request),
+    ).values('content', 'content_br', 'content_gzip').first()
+    if document is None:
+        return None
+    variants = OrderedDict([('br', document['content_br']), ('gzip', document['content_gzip'])])
+    response = get_precompressed_response(
+        request, document['content'].encode('utf-8'), variants, content_type='application/json'
+    )
+    response['X-Hearing-Document'] = 'hit'
+    return response
+
+
+def queue_document(request, hearing):
+    try:
+        with tenant_atomic():
+            HearingDocument.objects.get_or_create(
+                hearing=hearing, visibility=HearingDocument.ANONYMOUS, base_url=get_base_url(request)
+            )
+    except IntegrityError:  # pragma: no cover
+        pass  # Queued by a concurrent request
+
+
+def render_live(document):
+    """
+    Render the hearing detail of a document the way an anonymous request would get it.
+    """
+    from democracy.views.hearing import HearingViewSet
+
+    view = HearingViewSet.as_view({'get': 'retrieve'}, use_hearing_documents=False, use_snapshots=False)
+    return render_anonymous_request(
+        view, document.base_url, '/v1/hearing/%s/' % document.hearing_id, pk=document.hearing_id
+    )
+
+
+def get_valid_until(hearing_id):
+    hearing = Hearing.objects.everything().filter(pk=hearing_id).values('close_at', 'force_closed').first()
+    if hearing and not hearing['force_closed'] and hearing['close_at'] > now():
+        return hearing['close_at']  # The document lists the closure info section once the hearing closes
+    return None
+
+
+def render_document(document):
+    """
+    Render and store a document. Documents of hearings that are no longer public are deleted.
+
+    :return: whether the document was stored
+    """
+    generation = document.generation
+    response = render_live(document)
+    if response.status_code == 404:
+        document.delete()
+        return False
+    if response.status_code != 200:
+        logger.warning("Rendering %s document of hearing %s failed with status %d",
+                       document.base_url, document.hearing_id, response.status_code)
+        return False
+    variants = compress_variants(response.content)
+    # Changes made while rendering have bumped the generation, which keeps the document stale
+    HearingDocument.objects.filter(pk=document.pk).update(
+        content=response.content.decode('utf-8'),
+        content_br=variants.get('br'),
+        content_gzip=variants.get('gzip'),
+        rendered_generation=generation,
+        rendered_at=now(),
+        valid_until=get_valid_until(document.hearing_id),
+    )
+    return True
+
+
+def render_stale_documents(limit=None):
+    """
+    Render the stale documents of every database.
+
+    :return: number of documents rendered
+    """
+    n_rendered = 0
+    for alias in get_databases():
+        with using_tenant(alias):
+            documents = HearingDocument.objects.stale().order_by('pk')
+            if limit:
+                documents = documents[:limit - n_rendered]
+            n_rendered += sum(1 for document in documents if render_document(document))
+        if limit and n_rendered >= limit:
+            break
+    return n_rendered
+
+
+def find_inconsistent_documents():
+    """
+    Compare fresh documents with live renders and yield the ones that differ.
+
+    Documents that expire within the counter delay may show outdated comment counts, so they are skipped.
+    """
+    for alias in get_databases():
+        with using_tenant(alias):
+            documents = HearingDocument.objects.fresh().exclude(
+                valid_until__lte=now() + timedelta(seconds=get_counter_delay())
+            )
+            for document in documents.order_by('pk').iterator():
+                response = render_live(document)
+                live = json.loads(response.content.decode('utf-8')) if response.status_code == 200 else None
+                if json.loads(document.content) != live:
+                    yield document
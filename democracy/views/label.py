@@ -3,7 +3,7 @@ import django_filters
 
 from democracy.models import Label
 from democracy.pagination import DefaultLimitPagination
-from democracy.views.utils import TranslatableSerializer
+from democracy.views.utils import SparseFieldsetMixin, TranslatableSerializer
 
 
 class LabelFilter(django_filters.FilterSet):
@@ -14,7 +14,7 @@ class LabelFilter(django_filters.FilterSet):
         fields = ['label']
 
 
-class LabelSerializer(serializers.ModelSerializer, TranslatableSerializer):
+class LabelSerializer(SparseFieldsetMixin, serializers.ModelSerializer, TranslatableSerializer):
     class Meta:
         model = Label
         fields = ('id', 'label')
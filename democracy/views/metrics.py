@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from democracy.utils.metrics import REGISTRY
+
+
+def has_metrics_access(request):
+    if request.user.is_superuser:
+        return True
+    token = getattr(settings, 'DEMOCRACY_METRICS_TOKEN', None)
+    return bool(token) and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer %s' % token)
+
+
+@never_cache
+def metrics(request):
+    """
+    Expose the collected metrics in the Prometheus text format to superusers and `DEMOCRACY_METRICS_TOKEN` holders.
+    """
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
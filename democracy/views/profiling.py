@@ -0,0 +1,37 @@
+import os
+
+from django.contrib.auth.decorators import user_passes_test
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+
+from democracy.profiling import AGGREGATE_STACKS, get_aggregate_folded, get_profile_dir
+
+superuser_required = user_passes_test(lambda user: user.is_superuser, login_url='admin:login')
+
+
+@never_cache
+@superuser_required
+def profile_list(request):
+    directory = get_profile_dir()
+    files = sorted(os.listdir(directory), reverse=True) if os.path.isdir(directory) else []
+    return JsonResponse({'artifacts': files, 'aggregates': sorted(AGGREGATE_STACKS)})
+
+
+@never_cache
+@superuser_required
+def profile_artifact(request, filename):
+    path = os.path.join(get_profile_dir(), os.path.basename(filename))
+    if not os.path.isfile(path):
+        raise Http404('No such profile')
+    response = FileResponse(open(path, 'rb'), content_type='application/octet-stream')
+    response['Content-Disposition'] = 'attachment; filename="%s"' % os.path.basename(path)
+    return response
+
+
+@never_cache
+@superuser_required
+def profile_aggregate(request, view_name):
+    folded = get_aggregate_folded(view_name)
+    if folded is None:
+        raise Http404('No samples for this view')
+    return HttpResponse(folded, content_type='text/plain; charset=utf-8')
@@ -0,0 +1,87 @@
+"""
+Cache of anonymous API responses, stored with their precompressed variants.
+
+Entries are compressed once when the cache is filled and served according to the request's
+Accept-Encoding. Every change to a hearing or its translations bumps the cache version, which
+retires all entries. Recaching the comment and vote counters does not, so active hearings keep
+their entries; `DEMOCRACY_RESPONSE_CACHE_TIMEOUT` bounds how long counters and time-dependent
+data (e.g. hearings opening or closing) may be served from the cache.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from democracy.models import Hearing
+from democracy.models.base import is_counter_update
+from democracy.utils.compression import compress_variants, get_precompressed_response
+
+VERSION_KEY = 'democracy:response-cache:version'
+
+
+def get_timeout():
+    return getattr(settings, 'DEMOCRACY_RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def is_cacheable_request(request):
+    return (
+        get_timeout() > 0 and
+        request.method == 'GET' and
+        not request.GET and
+        not request.user.is_authenticated() and
+        request.accepted_renderer.format == 'json'
+    )
+
+
+def get_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def bump_version(sender=None, update_fields=None, **kwargs):
+    if is_counter_update(update_fields):
+        return
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:  # Not in the cache (anymore), so no entry refers to the old version either
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_cache_key(request, name):
+    base_url = request.build_absolute_uri('/')
+    return 'democracy:response-cache:%s:%s:%s' % (
+        name, get_version(), hashlib.md5(base_url.encode('utf-8')).hexdigest()
+    )
+
+
+def get_cached_response(request, name):
+    """
+    Get the cached response for a cacheable request, or None if it is not cached.
+    """
+    entry = cache.get(get_cache_key(request, name))
+    if entry is None:
+        return None
+    return get_precompressed_response(request, entry['content'], entry['variants'], entry['content_type'])
+
+
+def cache_response(request, name, response):
+    """
+    Store a DRF response in the cache once it has been rendered.
+    """
+    key = get_cache_key(request, name)
+
+    def store(rendered):
+        if rendered.status_code == 200:
+            cache.set(key, {
+                'content': rendered.content,
+                'variants': compress_variants(rendered.content),
+                'content_type': rendered['Content-Type'],
+            }, get_timeout())
+
+    response.add_post_render_callback(store)
+    return response
+
+
+post_save.connect(bump_version, sender=Hearing)
+post_save.connect(bump_version, sender=Hearing._parler_meta.root_model)
+post_delete.connect(bump_version, sender=Hearing._parler_meta.root_model)
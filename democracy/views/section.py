@@ -7,11 +7,14 @@ from rest_framework.exceptions import ValidationError
 
 from democracy.enums import Commenting, InitialSectionType
 from democracy.models import Hearing, Section, SectionImage, SectionType
+from democracy.models.section import get_section_type_id
 from democracy.pagination import DefaultLimitPagination
+from democracy.snapshots import get_snapshot_redirect
 from democracy.utils.drf_enum_field import EnumField
-from democracy.views.base import AdminsSeeUnpublishedMixin, BaseImageSerializer
+from democracy.views.base import AdminsSeeUnpublishedMixin, BaseImageSerializer, ModifiedSinceMixin
+from democracy.views.tenants import TenantMixin
 from democracy.views.utils import (
-    Base64ImageField, filter_by_hearing_visible, PublicFilteredImageField, TranslatableSerializer
+    Base64ImageField, filter_by_hearing_visible, PublicFilteredImageField, SparseFieldsetMixin, TranslatableSerializer
 )
 
 
@@ -36,7 +39,7 @@ class SectionImageCreateUpdateSerializer(BaseImageSerializer, TranslatableSerial
         fields = ['title', 'url', 'width', 'height', 'caption', 'image']
 
 
-class SectionSerializer(serializers.ModelSerializer, TranslatableSerializer):
+class SectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer, TranslatableSerializer):
     """
     Serializer for section instance.
     """
@@ -146,18 +149,30 @@ class SectionCreateUpdateSerializer(serializers.ModelSerializer, TranslatableSer
         return data
 
 
-class SectionViewSet(AdminsSeeUnpublishedMixin, viewsets.ReadOnlyModelViewSet):
+class SectionViewSet(AdminsSeeUnpublishedMixin, ModifiedSinceMixin, TenantMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = SectionSerializer
     model = Section
+    use_snapshots = True
+
+    def list(self, request, *args, **kwargs):
+        if self.use_snapshots and not request.GET:
+            snapshot_response = get_snapshot_redirect(request, kwargs['hearing_pk'], 'sections.json')
+            if snapshot_response is not None:
+                return snapshot_response
+        return super().list(request, *args, **kwargs)
 
     def get_queryset(self):
         id_or_slug = self.kwargs['hearing_pk']
         hearing = Hearing.objects.get_by_id_or_slug(id_or_slug)
         queryset = super().get_queryset().filter(hearing=hearing)
         if not hearing.closed:
-            queryset = queryset.exclude(type__identifier=InitialSectionType.CLOSURE_INFO)
+            queryset = queryset.exclude(type_id=get_section_type_id(InitialSectionType.CLOSURE_INFO))
         return queryset
 
+    def get_tombstone_queryset(self):
+        id_or_slug = self.kwargs['hearing_pk']
+        return super().get_tombstone_queryset().filter(Q(hearing_id=id_or_slug) | Q(hearing__slug=id_or_slug))
+
 
 class RootSectionImageSerializer(SectionImageSerializer):
     """
@@ -179,9 +194,10 @@ class ImageFilter(filters.FilterSet):
 
 
 # root level SectionImage endpoint
-class ImageViewSet(AdminsSeeUnpublishedMixin, viewsets.ReadOnlyModelViewSet):
+class ImageViewSet(AdminsSeeUnpublishedMixin, ModifiedSinceMixin, TenantMixin, viewsets.ReadOnlyModelViewSet):
     model = SectionImage
     serializer_class = RootSectionImageSerializer
+    sync_hearing_lookup = 'section__hearing'
     pagination_class = DefaultLimitPagination
     filter_class = ImageFilter
 
@@ -209,7 +225,7 @@ class SectionFilter(filters.FilterSet):
 
 
 # root level Section endpoint
-class RootSectionViewSet(AdminsSeeUnpublishedMixin, viewsets.ReadOnlyModelViewSet):
+class RootSectionViewSet(AdminsSeeUnpublishedMixin, ModifiedSinceMixin, TenantMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = RootSectionSerializer
     model = Section
     pagination_class = DefaultLimitPagination
@@ -221,6 +237,6 @@ class RootSectionViewSet(AdminsSeeUnpublishedMixin, viewsets.ReadOnlyModelViewSe
 
         n = now()
         open_hearings = Q(hearing__force_closed=False) & Q(hearing__open_at__lte=n) & Q(hearing__close_at__gt=n)
-        queryset = queryset.exclude(open_hearings, type__identifier=InitialSectionType.CLOSURE_INFO)
+        queryset = queryset.exclude(open_hearings, type_id=get_section_type_id(InitialSectionType.CLOSURE_INFO))
 
         return queryset
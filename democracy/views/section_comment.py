@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 import django_filters
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.transaction import atomic
@@ -13,7 +15,10 @@ from democracy.models.section import CommentImage
 from democracy.views.comment import COMMENT_FIELDS, BaseCommentViewSet, BaseCommentSerializer
 from democracy.views.label import LabelSerializer
 from democracy.pagination import DefaultLimitPagination
+from democracy.snapshots import get_comment_page_name, get_snapshot_redirect
+from democracy.tenants import activate_tenant, find_section_database, get_tenant_databases
 from democracy.views.comment_image import CommentImageCreateSerializer, CommentImageSerializer
+from democracy.views.fast import FastSerializer
 from democracy.views.utils import filter_by_hearing_visible, GeoJSONField, NestedPKRelatedField
 
 
@@ -83,10 +88,84 @@ class SectionCommentSerializer(BaseCommentSerializer):
         fields = ['section', 'language_code'] + COMMENT_FIELDS
 
 
+class FastSectionCommentSerializer(FastSerializer):
+    serializer_class = SectionCommentSerializer
+    value_fields = {
+        'language_code': 'language_code',
+        'id': 'id',
+        'content': 'content',
+        'author_name': 'author_name',
+        'n_votes': 'n_votes',
+        'created_at': 'created_at',
+        'geojson': 'geojson',
+    }
+    extra_lookups = ('section', 'created_by', 'label', 'plugin_data')
+    json_lookups = ('geojson',)
+
+    def prepare(self, rows):
+        comment_ids = [row['pk'] for row in rows]
+        label_ids = {row['label'] for row in rows if row['label'] is not None}
+        labels = list(Label._base_manager.filter(pk__in=label_ids))
+        self.labels = dict(zip(
+            [label.pk for label in labels], LabelSerializer(labels, many=True, context=self.context).data
+        ))
+        images = list(CommentImage.objects.filter(comment__in=comment_ids))
+        self.images = defaultdict(list)
+        for image, data in zip(images, CommentImageSerializer(images, many=True, context=self.context).data):
+            self.images[image.comment_id].append(data)
+        self.parents = {}
+        user = self.request.user if self.request else None
+        if user and user.is_authenticated():
+            section_ids = {row['section'] for row in rows if row['created_by'] == user.pk}
+            self.parents = Section._base_manager.select_related('hearing').in_bulk(section_ids)
+
+    def extract_section(self, row):
+        return row['section']
+
+    def extract_is_registered(self, row):
+        return row['created_by'] is not None
+
+    def extract_can_edit(self, row):
+        # `BaseComment.can_edit` without the instance
+        user = self.request.user if self.request else None
+        if not (user and user.is_authenticated() and row['created_by'] == user.pk):
+            return False
+        try:
+            self.parents[row['section']].check_commenting(self.request)
+        except DjangoValidationError:
+            return False
+        return True
+
+    def extract_images(self, row):
+        return self.images.get(row['pk'], [])
+
+    def extract_label(self, row):
+        return None if row['label'] is None else self.labels[row['label']]
+
+    def render(self, row):
+        ret = super().render(row)
+        if self.request and self.request.GET.get('include', None) == 'plugin_data' and \
+                self.serializer.is_field_requested('plugin_data'):
+            ret['plugin_data'] = row['plugin_data']
+        return ret
+
+
 class SectionCommentViewSet(BaseCommentViewSet):
     model = SectionComment
     serializer_class = SectionCommentSerializer
+    fast_serializer_class = FastSectionCommentSerializer
     create_serializer_class = SectionCommentCreateSerializer
+    use_snapshots = True
+    sync_hearing_lookup = 'section__hearing'
+
+    def list(self, request, *args, **kwargs):
+        if self.use_snapshots and 'hearing_pk' in kwargs:
+            snapshot_response = get_snapshot_redirect(
+                request, kwargs['hearing_pk'], get_comment_page_name(kwargs['comment_parent_pk'], request.GET)
+            )
+            if snapshot_response is not None:
+                return snapshot_response
+        return super().list(request, *args, **kwargs)
 
 
 class RootSectionCommentSerializer(SectionCommentSerializer):
@@ -107,9 +186,15 @@ class CommentFilter(filters.FilterSet):
         fields = ['authorization_code', 'section', 'hearing']
 
 
+class FastRootSectionCommentSerializer(FastSectionCommentSerializer):
+    serializer_class = RootSectionCommentSerializer
+    value_fields = dict(FastSectionCommentSerializer.value_fields, hearing='section__hearing')
+
+
 # root level SectionComment endpoint
 class CommentViewSet(SectionCommentViewSet):
     serializer_class = RootSectionCommentSerializer
+    fast_serializer_class = FastRootSectionCommentSerializer
     pagination_class = DefaultLimitPagination
     filter_backends = (filters.DjangoFilterBackend, filters.OrderingFilter)
     filter_class = CommentFilter
@@ -146,6 +231,13 @@ class CommentViewSet(SectionCommentViewSet):
         queryset = filter_by_hearing_visible(queryset, self.request, 'section__hearing')
         return queryset
 
+    def create(self, request, *args, **kwargs):
+        section_id = request.data.get('section')
+        if get_tenant_databases() and section_id:
+            # The comment is written to the database of its section
+            activate_tenant(find_section_database(section_id))
+        return super().create(request, *args, **kwargs)
+
     def _check_may_comment(self, request):
         parent = self.get_comment_parent()
         if not parent:
@@ -0,0 +1,118 @@
+"""
+Views over the hearing data of all tenant databases, see `democracy.tenants`.
+"""
+from django.db import models
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from democracy.tenants import (
+    activate_tenant, find_hearing_database, get_databases, get_tenant_databases, using_tenant
+)
+
+
+def get_sort_key(value):
+    # Like PostgreSQL, sort NULLs after everything else
+    return (1, 0) if value is None else (0, value)
+
+
+def get_sort_value(obj, path):
+    for name in path.split('__'):
+        obj = getattr(obj, name, None)
+        if obj is None:
+            break
+    return obj
+
+
+def sort_merged(objects, ordering):
+    """
+    Sort objects from several databases by a queryset ordering, e.g. `('-created_at', 'pk')`.
+
+    The sort is stable, so objects that tie on the whole ordering stay in the order they were given in,
+    i.e. in database order. That matters for the integer primary keys, which each database allocates on
+    its own, so that the same `pk` may come from several databases.
+    """
+    for field in reversed(ordering):
+        if not isinstance(field, str) or field == '?':
+            continue
+        name = field.lstrip('-')
+        objects.sort(key=lambda obj: get_sort_key(get_sort_value(obj, name)), reverse=field.startswith('-'))
+
+
+class FanOutList(object):
+    """
+    The rows of a queryset in all databases, merged by the queryset's ordering.
+
+    Supports what the paginators need: `len()` counts the rows in every database, and a slice
+    fetches its first `stop` rows from every database.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self.ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = sum(self.queryset.using(alias).count() for alias in get_databases())
+        return self._count
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        objects = []
+        for alias in get_databases():
+            queryset = self.queryset.using(alias)
+            objects.extend(queryset if item.stop is None else queryset[:item.stop])
+        sort_merged(objects, self.ordering)
+        return objects[item]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+class TenantMixin(object):
+    """
+    Route the queries of a request to the database of the hearing given by `tenant_hearing_kwarg`.
+
+    Without one, list and detail requests fan out to all databases.
+    """
+    tenant_hearing_kwarg = 'hearing_pk'
+
+    def is_cross_tenant(self):
+        return bool(get_tenant_databases()) and not self.kwargs.get(self.tenant_hearing_kwarg)
+
+    def initial(self, request, *args, **kwargs):
+        if get_tenant_databases():
+            id_or_slug = self.kwargs.get(self.tenant_hearing_kwarg)
+            activate_tenant(find_hearing_database(id_or_slug) if id_or_slug else None)
+        super().initial(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_cross_tenant():
+            return super().list(request, *args, **kwargs)
+        objects = FanOutList(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(objects)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(objects[:], many=True).data)
+
+    def get_object(self):
+        if not self.is_cross_tenant():
+            return super().get_object()
+        databases = get_databases()
+        if len(databases) > 1 and isinstance(self.get_queryset().model._meta.pk, models.AutoField):
+            # The same integer id may be in several databases, so it does not identify an object
+            raise NotFound(
+                'Comments and images are only available at the routes of their hearing when there are '
+                'several hearing databases.'
+            )
+        for alias in databases:
+            with using_tenant(alias):
+                try:
+                    obj = super().get_object()
+                except Http404:
+                    continue
+            activate_tenant(alias)  # For the rest of the request
+            return obj
+        raise Http404
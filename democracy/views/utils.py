@@ -2,21 +2,31 @@
 import base64
 from collections import OrderedDict
 from functools import lru_cache
+from io import BytesIO
 import json
+import re
+from urllib.parse import urlsplit
 
 from django.conf import settings
 from django.contrib.gis.geos import GEOSGeometry
 from django.contrib.gis.gdal.error import GDALException
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files.base import ContentFile
+from django.core.handlers.wsgi import WSGIRequest
 from django.db.models.query import QuerySet
+from django.http import HttpResponse
 from django.utils.crypto import get_random_string
-from django.utils.timezone import now
-from django.utils.translation import ugettext_lazy as _
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+from django.utils.timezone import is_naive, make_aware, now, utc
+from django.utils.translation import override, ugettext_lazy as _
+from parler import appsettings as parler_settings
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.relations import ManyRelatedField, MANY_RELATION_KWARGS, PrimaryKeyRelatedField
 
+from democracy.visibility import get_visibility_context
+
 
 class AbstractFieldSerializer(serializers.RelatedField):
     parent_serializer_class = serializers.ModelSerializer
@@ -100,6 +110,38 @@ class PublicFilteredImageField(serializers.Field):
         return serializer.to_representation(images)
 
 
+def render_anonymous_request(view, base_url, path, data=None, **kwargs):
+    """
+    Call a view with an anonymous JSON GET request, as if it had been made to `base_url`.
+
+    The view is rendered in the default language also outside the request cycle, e.g. in management commands.
+
+    :return: the rendered response, with any streamed content collected into `content`
+    """
+    scheme, host = urlsplit(base_url)[:2]
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': urlencode(data or {}),
+        'SERVER_NAME': host.split(':')[0],
+        'SERVER_PORT': '443' if scheme == 'https' else '80',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.url_scheme': scheme,
+        'wsgi.input': BytesIO(),
+    })
+    with override(settings.LANGUAGE_CODE):
+        response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.streaming:
+            response = HttpResponse(
+                b''.join(response.streaming_content), status=response.status_code, content_type=response['Content-Type']
+            )
+    return response
+
+
 def filter_by_hearing_visible(queryset, request, hearing_lookup='hearing'):
     if hearing_lookup:
         hearing_lookup = '%s__' % hearing_lookup
@@ -107,16 +149,14 @@ def filter_by_hearing_visible(queryset, request, hearing_lookup='hearing'):
     filters = {
         '%sdeleted' % hearing_lookup: False,
     }
-    user = request.user
+    context = get_visibility_context(request.user)
 
-    if user.is_superuser:
+    if context.is_superuser:
         return queryset.filter(**filters)
 
-    if user.is_authenticated():
-        organization = user.get_default_organization()
-        if organization:
-            filters['%sorganization' % hearing_lookup] = organization
-            return queryset.filter(**filters)
+    if context.organization_id:
+        filters['%sorganization' % hearing_lookup] = context.organization_id
+        return queryset.filter(**filters)
 
     filters['%spublished' % hearing_lookup] = True
     filters['%sopen_at__lte' % hearing_lookup] = now()
@@ -205,6 +245,202 @@ class Base64ImageField(serializers.ImageField):
         raise ValidationError(_('Invalid content. Expected "data:image"'))
 
 
+def encode_sync_token(modified_at, pk):
+    """
+    Encode the position of the last synced row into an opaque `modified_since` token.
+    """
+    return base64.urlsafe_b64encode(json.dumps([modified_at.isoformat(), pk]).encode('utf-8')).decode('ascii')
+
+
+def parse_sync_token(value):
+    """
+    Parse a `modified_since` value, either a token from `encode_sync_token` or an ISO 8601 timestamp.
+
+    :return: (timestamp, primary key or None)
+    """
+    pk = None
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError):
+        timestamp = value
+    try:
+        timestamp = parse_datetime(timestamp)
+    except (ValueError, TypeError):
+        timestamp = None
+    if timestamp is None:
+        raise ValidationError({'modified_since': _('Expected an ISO 8601 timestamp or a sync token')})
+    if is_naive(timestamp):
+        timestamp = make_aware(timestamp, utc)
+    return timestamp, pk
+
+
+EXPAND_RE = re.compile(r'\s*(\w+)(?:\(([^)]*)\))?\s*(?:,|$)')
+
+
+def parse_expand(value, allowed):
+    """
+    Parse an `expand` query parameter such as `comments(limit=5,ordering=-n_votes),user_votes`.
+
+    :param allowed: dict of allowed expansion names to the parameter names they accept
+    :return: dict of expansion name to a dict of its parameters
+    """
+    expansions = {}
+    position = 0
+    while value and position < len(value):
+        match = EXPAND_RE.match(value, position)
+        if not match or match.end() == position:
+            raise ValidationError({'expand': _('Malformed expand parameter')})
+        name, params = match.groups()
+        if name not in allowed:
+            raise ValidationError({'expand': _('Unknown expansion "%s"') % name})
+        expansions[name] = {}
+        for param in (params.split(',') if params else ()):
+            key, separator, param_value = param.partition('=')
+            if not separator or key.strip() not in allowed[name]:
+                raise ValidationError({'expand': _('Invalid parameter "%(param)s" for "%(name)s"') % {
+                    'param': param, 'name': name
+                }})
+            expansions[name][key.strip()] = param_value.strip()
+        position = match.end()
+    return expansions
+
+
+# The viewset actions whose serializer renders only the requested fields
+SPARSE_FIELDSET_ACTIONS = ('list', 'retrieve')
+
+
+def get_sparse_fieldset(request):
+    """
+    Parse the `fields` and `omit` query parameters (comma separated field names).
+
+    :return: a (fields, omit) tuple of sets, with None for parameters not given, or None if neither is given
+    """
+    fields, omit = (request.GET.get(param) for param in ('fields', 'omit'))
+    if not (fields or omit):
+        return None
+    return (
+        set(name.strip() for name in fields.split(',')) if fields else None,
+        set(name.strip() for name in omit.split(',')) if omit else set(),
+    )
+
+
+def field_in_fieldset(fieldset, field_name):
+    if fieldset is None:
+        return True
+    fields, omit = fieldset
+    return (fields is None or field_name in fields) and field_name not in omit
+
+
+def get_view_sparse_fieldset(view):
+    """
+    Get the sparse fieldset of the read serializer of a viewset, or None if all fields are rendered.
+    """
+    if getattr(view, 'action', None) not in SPARSE_FIELDSET_ACTIONS:
+        return None
+    return get_sparse_fieldset(view.request)
+
+
+def is_field_requested(view, field_name):
+    """
+    Check whether the `fields` and `omit` query parameters allow the given top level field in a viewset's response.
+    """
+    return field_in_fieldset(get_view_sparse_fieldset(view), field_name)
+
+
+def get_translations_cache(instance):
+    """
+    Get the denormalized translations of an instance, or None if they should be read from the translation table.
+    """
+    if not getattr(settings, 'DEMOCRACY_TRANSLATIONS_CACHE', True):
+        return None
+    return getattr(instance, 'translations_cache', None)
+
+
+def get_translations(instance, fields, languages):
+    """
+    Get the values of translated fields in the given languages, as `{field: {language: value}}`.
+
+    Languages the instance has no translation for are left out.
+    """
+    cache = get_translations_cache(instance)
+    if cache is not None:
+        return {
+            field: {lang: value for (lang, value) in cache.get(field, {}).items() if lang in languages}
+            for field in fields
+        }
+    translations = {field: {} for field in fields}
+    for translation in instance.translations.filter(language_code__in=languages):
+        for field in fields:
+            translations[field][translation.language_code] = getattr(translation, field)
+    return translations
+
+
+def get_translated_values(instance, fields, language):
+    """
+    Get the values of translated fields in a single language, using the parler fallback languages for missing values.
+
+    The fallback translations are only fetched if the requested language leaves some of the fields empty.
+
+    :return: dict of field name to value, without the fields that have no value in any language
+    """
+    languages = parler_settings.PARLER_LANGUAGES.get_active_choices(language)
+    cache = get_translations_cache(instance)
+    if cache is not None:
+        values = {}
+        for field in fields:
+            field_values = cache.get(field, {})
+            value = next((field_values[lang] for lang in languages if field_values.get(lang)), None)
+            if value:
+                values[field] = value
+        return values
+    # `values()` rather than `only()`: parler reads every field of a translation when it is instantiated,
+    # which would load each deferred field with a query of its own
+    values = {}
+    for translation in instance.translations.filter(language_code=language).values(*fields):
+        values.update((field, translation[field]) for field in fields if translation[field])
+    missing = [field for field in fields if field not in values]
+    if missing and len(languages) > 1:
+        fallbacks = sorted(
+            instance.translations.filter(language_code__in=languages[1:]).values('language_code', *missing),
+            key=lambda translation: languages.index(translation['language_code'])
+        )
+        for translation in fallbacks:
+            for field in missing:
+                if field not in values and translation[field]:
+                    values[field] = translation[field]
+    return values
+
+
+class SparseFieldsetMixin(object):
+    """
+    Render only the fields allowed by the `fields` and `omit` query parameters.
+
+    Applies only to the view's own serializer in the `list` and `retrieve` actions, not to serializers
+    nested in it or used by other actions (e.g. reports). Fields left out are never evaluated, so e.g.
+    unrequested SerializerMethodFields cost nothing.
+    """
+
+    def _get_sparse_fieldset(self):
+        if not hasattr(self, '_sparse_fieldset'):
+            view = self.context.get('view')
+            is_root = view is not None and type(self) is view.get_serializer_class()
+            self._sparse_fieldset = get_view_sparse_fieldset(view) if is_root else None
+        return self._sparse_fieldset
+
+    def is_field_requested(self, field_name):
+        return field_in_fieldset(self._get_sparse_fieldset(), field_name)
+
+    @property
+    def _readable_fields(self):
+        return [field for field in super()._readable_fields if self.is_field_requested(field.field_name)]
+
+    def get_translated_fields(self):
+        get_translated_fields = getattr(super(), 'get_translated_fields', None)
+        if get_translated_fields is None:  # Not a `TranslatableSerializer`
+            return []
+        return [field for field in get_translated_fields() if self.is_field_requested(field)]
+
+
 class TranslatableSerializer(serializers.Serializer):
     """
     A serializer for translated fields.
@@ -232,13 +468,36 @@ class TranslatableSerializer(serializers.Serializer):
             ret[field][lang_code] = value
         return ret
 
+    def get_translated_fields(self):
+        return self.Meta.translated_fields
+
+    def get_response_language(self):
+        """
+        Get the language requested with `?lang=` for a single-language response, or None for all languages.
+
+        A `lang` key in the serializer context overrides the query parameter.
+        """
+        if 'lang' in self.context:
+            return self.context['lang']
+        request = self.context.get('request')
+        language = request.GET.get('lang') if request else None
+        if language and language not in self.Meta.translation_lang:
+            raise ValidationError({'lang': _('Unsupported language "%s"') % language})
+        return language or None
+
     def to_representation(self, instance):
         ret = super(TranslatableSerializer, self).to_representation(instance)
-        translations = instance.translations.filter(language_code__in=self.Meta.translation_lang)
-
-        for translation in translations:
-            for field in self.Meta.translated_fields:
-                self._update_lang(ret, field, getattr(translation, field), translation.language_code)
+        translated_fields = self.get_translated_fields()
+        if not translated_fields:
+            return ret
+        language = self.get_response_language()
+        if language:
+            ret.update(get_translated_values(instance, translated_fields, language))
+            return ret
+        translations = get_translations(instance, translated_fields, self.Meta.translation_lang)
+        for field, values in translations.items():
+            for lang_code, value in values.items():
+                self._update_lang(ret, field, value, lang_code)
         return ret
 
     def _validate_translated_field(self, field, data):
@@ -0,0 +1,74 @@
+"""
+Visibility context of a user: what every hearing visibility check needs to know about the user.
+
+The context is computed once per user object, i.e. once per request, and reused by all visibility checks
+and queryset filters of the request. With `DEMOCRACY_VISIBILITY_CACHE_TTL` set, it is also cached across
+requests for that many seconds. Changes to `Organization.admin_users` invalidate both: the cached contexts
+are keyed by a generation kept in the shared cache, so a change retires them in every process.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+
+from democracy.models import Organization
+
+VisibilityContext = namedtuple('VisibilityContext', ('user_id', 'is_superuser', 'organization_id'))
+
+ANONYMOUS = VisibilityContext(user_id=None, is_superuser=False, organization_id=None)
+
+GENERATION_KEY = 'democracy:visibility:generation'
+
+# Bumped on every change of organization admins in this process, which retires the contexts memoized on
+# user objects. The memos only live as long as their request, so other processes need not see the bumps.
+_generation = [0]
+
+
+def get_shared_generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def get_cache_key(user_id):
+    return 'democracy:visibility:%s:%s' % (get_shared_generation(), user_id)
+
+
+def compute_visibility_context(user):
+    organization_id = user.admin_organizations.order_by('created_at').values_list('pk', flat=True).first()
+    return VisibilityContext(user_id=user.pk, is_superuser=user.is_superuser, organization_id=organization_id)
+
+
+def get_visibility_context(user):
+    """
+    :rtype: VisibilityContext
+    """
+    if user is None or not user.is_authenticated():
+        return ANONYMOUS
+    memo = getattr(user, '_visibility_context', None)
+    if memo is not None and memo[0] == _generation[0] and memo[1].is_superuser == user.is_superuser:
+        return memo[1]
+    generation = _generation[0]
+    ttl = getattr(settings, 'DEMOCRACY_VISIBILITY_CACHE_TTL', 0)
+    context = cache.get(get_cache_key(user.pk)) if ttl else None
+    if context is None or context.is_superuser != user.is_superuser:
+        context = compute_visibility_context(user)
+        if ttl:
+            cache.set(get_cache_key(user.pk), context, ttl)
+    user._visibility_context = (generation, context)
+    return context
+
+
+def invalidate_visibility_contexts():
+    _generation[0] += 1
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:  # Not in the cache (anymore), so no context is cached under the old generation either
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def invalidate_on_admin_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_visibility_contexts()
+
+
+m2m_changed.connect(invalidate_on_admin_change, sender=Organization.admin_users.through)
@@ -32,6 +32,15 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'democracy.middleware.PerformanceMiddleware',
+    'democracy.middleware.MiddlewareDispatcher',
+    'democracy.routers.ReplicaRoutingMiddleware',
+    'democracy.nplusone.NPlusOneMiddleware',
+    'democracy.middleware.ProfilingMiddleware',
+)
+
+# Middleware run by `MiddlewareDispatcher` for the admin and other non-API requests
+DEMOCRACY_SITE_MIDDLEWARE_CLASSES = (
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +52,15 @@ MIDDLEWARE_CLASSES = (
     'django.middleware.security.SecurityMiddleware',
 )
 
+# Middleware run by `MiddlewareDispatcher` for API requests, i.e. paths matching `CORS_URLS_REGEX`;
+# None runs the site middleware for them too
+DEMOCRACY_API_MIDDLEWARE_CLASSES = (
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'democracy.middleware.JWTAuthenticationMiddleware',
+)
+
 ROOT_URLCONF = 'kerrokantasi.urls'
 
 TEMPLATES = [
@@ -70,6 +88,7 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['democracy.tenants.TenantRouter', 'democracy.routers.ReplicaRouter']
 
 LANGUAGE_CODE = 'en'
 TIME_ZONE = 'UTC'
@@ -92,7 +111,7 @@ CORS_URLS_REGEX = r'^/[a-z-]*/?v1/.*$'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'helusers.jwt.JWTAuthentication',
+        'democracy.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ('rest_framework.filters.DjangoFilterBackend',),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
@@ -133,6 +152,55 @@ PARLER_LANGUAGES = {
 
 DETECT_LANGS_MIN_PROBA = 0.3
 
+# Requests slower than this are logged to the `democracy.performance` logger; None disables the log
+DEMOCRACY_SLOW_REQUEST_SECONDS = 1.0
+# Bearer token for scraping /metrics/ without a superuser session
+DEMOCRACY_METRICS_TOKEN = None
+# Superuser-requested profiles are stored here; see democracy.profiling
+DEMOCRACY_PROFILE_DIR = os.path.join(BASE_DIR, "var", "profiles")
+# Fraction of requests to stack-sample into per-view aggregate flame data
+DEMOCRACY_PROFILE_SAMPLE_RATE = 0
+# Detect N+1 query patterns in every request: None, "warn" or "raise". For development and CI only.
+DEMOCRACY_NPLUSONE = None
+DEMOCRACY_NPLUSONE_THRESHOLD = 5
+# Read translated fields from the denormalized translations cache columns instead of the translation tables
+DEMOCRACY_TRANSLATIONS_CACHE = True
+# Serve anonymous hearing details from documents rendered by democracy_render_hearing_documents
+DEMOCRACY_HEARING_DOCUMENTS = True
+# Seconds a hearing document may show outdated comment counts, so that hot hearings are not rerendered per comment
+DEMOCRACY_HEARING_DOCUMENT_COUNTER_DELAY = 60
+# Render hearing and comment lists from values() rows instead of through the DRF serializers
+DEMOCRACY_FAST_SERIALIZERS = True
+# Send long unpaginated lists in chunks instead of rendering them whole
+DEMOCRACY_STREAM_LISTS = True
+# Seconds a user's organization and superuser status are cached across requests; 0 computes them once per request
+DEMOCRACY_VISIBILITY_CACHE_TTL = 0
+# Number of verified JWTs remembered per process (0 disables), and the seconds one is remembered for at most
+DEMOCRACY_JWT_CACHE_SIZE = 1024
+DEMOCRACY_JWT_CACHE_MAX_AGE = 300
+# Aliases of read replicas of the default database (see `democracy.routers`), the seconds a writer's
+# requests keep reading from the primary, the replication lag beyond which a replica is skipped, and
+# the seconds between replica health checks
+DEMOCRACY_REPLICA_DATABASES = ()
+DEMOCRACY_REPLICA_STICKY_SECONDS = 10
+DEMOCRACY_REPLICA_MAX_LAG = 5
+DEMOCRACY_REPLICA_CHECK_INTERVAL = 10
+# Organization ids mapped to the aliases of the databases their hearings are stored in (see `democracy.tenants`)
+DEMOCRACY_TENANT_DATABASES = {}
+# Days after which soft-deleted comments, images and sections are moved into the archive tables
+# by `democracy_archive_deleted` (see `democracy.archive`)
+DEMOCRACY_ARCHIVE_AFTER_DAYS = 90
+# Seconds anonymous map responses are cached for, together with their precompressed variants; 0 disables
+DEMOCRACY_RESPONSE_CACHE_TIMEOUT = 60
+# Public base URL of the API (e.g. "https://api.example.com"); enables static snapshots of closed hearings
+DEMOCRACY_SNAPSHOT_BASE_URL = None
+# Broker of the live comment streams, see democracy.streaming. Times are in seconds.
+DEMOCRACY_STREAM_BROKER = "democracy.streaming.DatabasePollingBroker"
+DEMOCRACY_STREAM_POLL_INTERVAL = 1
+DEMOCRACY_STREAM_HEARTBEAT = 15
+DEMOCRACY_STREAM_TIMEOUT = 300
+DEMOCRACY_STREAM_RETRY = 3
+
 # CKEDITOR_CONFIGS is in __init__.py
 CKEDITOR_UPLOAD_PATH = 'uploads/'
 CKEDITOR_IMAGE_BACKEND = 'pillow'
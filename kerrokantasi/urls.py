@@ -6,6 +6,8 @@ from django.contrib import admin
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.cache import never_cache
 from democracy import urls_v1
+from democracy.views.metrics import metrics
+from democracy.views.profiling import profile_aggregate, profile_artifact, profile_list
 from democracy.views.upload import browse, upload
 
 urlpatterns = [
@@ -15,6 +17,10 @@ urlpatterns = [
     url(r'^ckeditor/', include('ckeditor_uploader.urls')),
     url(r'^upload/', staff_member_required(upload), name='ckeditor_upload'),
     url(r'^browse/', never_cache(staff_member_required(browse)), name='ckeditor_browse'),
+    url(r'^metrics/$', metrics, name='metrics'),
+    url(r'^profiles/$', profile_list, name='profile-list'),
+    url(r'^profiles/aggregate/(?P<view_name>[\w.]+)/$', profile_aggregate, name='profile-aggregate'),
+    url(r'^profiles/(?P<filename>[\w.-]+)$', profile_artifact, name='profile-artifact'),
 ]
 
 if settings.DEBUG: